@@ -2,6 +2,9 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests are resolved against config.asgi_urls, which serves the analytics
+endpoints and CRUD lists with async views; run it with an ASGI server, e.g.
+    uvicorn config.asgi:application --workers 2
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -9,8 +12,28 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+
+class AsyncRoutesASGIHandler(ASGIHandler):
+    """
+    Django's ASGIHandler, resolving URLs against config.asgi_urls (the
+    async views). Each request gets its own sync thread, as with the stock
+    handler, so a slow sync call (a bulk import, an export's row reads)
+    only holds up its own request; run with CONN_MAX_AGE=0 so those
+    threads do not keep connections open.
+    """
+    urlconf = "config.asgi_urls"
+
+    def create_request(self, scope, body_file):
+        request, error_response = super().create_request(scope, body_file)
+        if request is not None:
+            request.urlconf = self.urlconf
+        return request, error_response
+
+
+django.setup(set_prefix=False)
+application = AsyncRoutesASGIHandler()
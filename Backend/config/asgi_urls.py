@@ -0,0 +1,12 @@
+"""
+URLconf used under ASGI (see config.asgi): the async views of
+core.async_urls first, then everything in config.urls.
+"""
+from django.urls import include, path
+
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/', include('core.async_urls')),
+    *wsgi_urlpatterns,
+]
@@ -10,9 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+import sys
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
+from .database import database_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +53,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware.
+    "core.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -57,6 +63,8 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     'corsheaders.middleware.CorsMiddleware',
+    # Staff-only, per-request cProfile; see core.profiling.
+    "core.middleware.ProfilingMiddleware",
 ]
 
 REST_FRAMEWORK = {
@@ -66,10 +74,19 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # orjson-backed JSON with the stock renderer's exact output; the
+    # browsable API only in development.
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
+        'core.renderers.FastJSONRenderer',
+    ) + (('rest_framework.renderers.BrowsableAPIRenderer',) if DEBUG else ()),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ),
+    # Keyset pagination on each viewset's `keyset_field`; ?paginate=false
+    # returns the full list as before.
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
 }
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
@@ -99,12 +116,83 @@ WSGI_APPLICATION = "config.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL, DB_CONN_MAX_AGE and DB_CONN_HEALTH_CHECKS; see config/database.py.
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
+    "default": database_from_env(BASE_DIR),
 }
+if sys.argv[1:2] == ["test"] and DATABASES["default"]["ENGINE"] == "config.sqlite3":
+    # A file rather than SQLite's shared-cache memory database, where lock
+    # conflicts fail at once instead of waiting out busy_timeout.
+    DATABASES["default"]["TEST"] = {
+        "NAME": os.path.join(tempfile.gettempdir(), f"dashboard-test-{os.getpid()}.sqlite3"),
+    }
+
+# Applied to every new SQLite connection (core.signals). WAL lets readers
+# run while an order is being written; busy_timeout is how long a writer
+# waits for the lock. The wait only covers transactions that take the lock
+# in BEGIN, which is why config.database defaults SQLite to
+# transaction_mode=IMMEDIATE; a DEFERRED transaction that reads first still
+# fails with "database is locked". Set SQLITE_TUNING=False for SQLite's
+# default pragmas.
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,            # ms
+    "cache_size": -64000,            # KiB, i.e. 64 MB
+    "mmap_size": 256 * 1024 * 1024,  # bytes
+    "temp_store": "MEMORY",
+} if os.environ.get("SQLITE_TUNING", "True") == "True" else {}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set CACHE_LOCATION to a directory to share the
+# analytics cache between worker processes through the file backend.
+
+if os.environ.get("CACHE_LOCATION"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_LOCATION"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 1000},
+        }
+    }
+
+# Seconds a cached analytics response, and the data version its ETag is
+# built from, may live. A write bumps the version only in the cache it went
+# to: with the per-process LocMemCache, other workers serve stale analytics
+# (and 304s) until this runs out, so it stays short unless CACHE_LOCATION
+# gives the workers a shared cache.
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get(
+    "ANALYTICS_CACHE_TIMEOUT", 24 * 60 * 60 if os.environ.get("CACHE_LOCATION") else 30,
+))
+
+# Requests over either budget are logged to "core.performance" with their
+# most repeated SQL.
+PERF_SLOW_REQUEST_MS = int(os.environ.get("PERF_SLOW_REQUEST_MS", 500))
+PERF_SLOW_REQUEST_QUERIES = int(os.environ.get("PERF_SLOW_REQUEST_QUERIES", 50))
+if sys.argv[1:2] == ["test"]:
+    # Keep the test run's output readable; tests of the log lower these.
+    PERF_SLOW_REQUEST_MS = PERF_SLOW_REQUEST_QUERIES = 10 ** 9
+
+# On-demand request profiles (X-Profile: 1): where they are kept, how many,
+# and the minimum number of seconds between two profiles.
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "dashboard-profiles"))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 20))
+PROFILE_MIN_INTERVAL = int(os.environ.get("PROFILE_MIN_INTERVAL", 10))
+
+# Threads used to compute the /api/analytics/dashboard/ panels; 1 runs them inline.
+DASHBOARD_MAX_WORKERS = int(os.environ.get("DASHBOARD_MAX_WORKERS", 4))
+
+# CRUD lists built from values_list() rows by core.readers instead of the
+# serializers; same output, False falls back to the serializers.
+FAST_LIST_READS = os.environ.get("FAST_LIST_READS", "True") == "True"
 
 
 # Password validation
@@ -0,0 +1,30 @@
+"""
+SQLite backend that can start transactions with BEGIN IMMEDIATE.
+
+OPTIONS["transaction_mode"] ("DEFERRED", "IMMEDIATE" or "EXCLUSIVE") is
+used for the BEGIN that opens every atomic() block, as Django 5.1 does
+natively. Under SQLite's default DEFERRED mode a transaction that reads
+before it writes fails with "database is locked" as soon as another
+writer holds the lock, whatever busy_timeout says; an IMMEDIATE one takes
+the write lock up front and so waits for it instead.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        mode = params.pop('transaction_mode', None)
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of: {', '.join(TRANSACTION_MODES)}."
+            )
+        self.transaction_mode = mode.upper() if mode else None
+        return params
+
+    def _start_transaction_under_autocommit(self):
+        mode = getattr(self, 'transaction_mode', None)
+        self.cursor().execute(f"BEGIN {mode}" if mode else "BEGIN")
@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
 from .models import Product, Customer, Order, OrderItem, Expense
+from . import customer_stats, ledger, rollups
 
 
 @admin.register(Product)
@@ -8,6 +10,13 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ('category',)
     search_fields = ('name', 'sku')
 
+    def save_model(self, request, obj, form, change):
+        # Record stock edits in the stock ledger.
+        with transaction.atomic():
+            previous = ledger.locked_stock(obj.pk) if change else 0
+            super().save_model(request, obj, form, change)
+            ledger.record_change(obj, obj.stock - previous, note="Edited in admin")
+
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
@@ -22,10 +31,41 @@ class OrderItemInline(admin.TabularInline):
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'customer', 'order_date', 'payment_method', 'total_amount')
+    list_display = ('id', 'customer', 'order_date', 'payment_method', 'item_count', 'total_amount')
     list_filter = ('payment_method', 'order_date')
+    list_select_related = ('customer',)
     inlines = [OrderItemInline]
 
+    # Keep the daily rollups and customer stats in step with admin edits
+    # and deletes by recomputing every day and customer the order belonged
+    # to before and after.
+
+    def save_model(self, request, obj, form, change):
+        previous = Order.objects.filter(pk=obj.pk) if change else Order.objects.none()
+        obj._rollup_days = rollups.order_days(previous)
+        obj._stats_customers = set(previous.values_list('customer_id', flat=True))
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        order.refresh_totals()
+        rollups.refresh_days(order._rollup_days | {rollups.order_day(order.order_date)})
+        customer_stats.refresh_customers(order._stats_customers | {order.customer_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rollups.refresh_days({rollups.order_day(obj.order_date)})
+        customer_stats.refresh_customers({obj.customer_id})
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            days = rollups.order_days(queryset)
+            customers = set(queryset.values_list('customer_id', flat=True))
+            super().delete_queryset(request, queryset)
+            rollups.refresh_days(days)
+            customer_stats.refresh_customers(customers)
+
 
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
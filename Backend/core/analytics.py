@@ -0,0 +1,955 @@
+"""
+Database-side helpers shared by the analytics views.
+
+Each panel is built from a queryset function and a formatting function,
+so the async variants at the end of the module (used by core.async_views
+under ASGI) run the same SQL through Django's async ORM and return the
+same data.
+"""
+from bisect import bisect_right
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import (
+    Case, Count, DateField, DecimalField, ExpressionWrapper, F, FloatField, Q, Sum, When,
+)
+from django.db.models.functions import Cast, NullIf, Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import Customer, CustomerStats, Product, Expense, DailyPaymentSales, DailyProductSales
+
+# quantity * price_at_sale, evaluated by the database.
+LINE_TOTAL = ExpressionWrapper(
+    F('quantity') * F('price_at_sale'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+MAX_BUCKETS = 1000
+
+
+def start_of_day(day):
+    """Midnight of `day` in the current time zone (aware only if USE_TZ)."""
+    midnight = datetime.combine(day, time.min)
+    if settings.USE_TZ:
+        return timezone.make_aware(midnight)
+    return midnight
+
+
+def local_today():
+    """Today's date in the current time zone."""
+    if settings.USE_TZ:
+        return timezone.localdate()
+    return date.today()
+
+
+def one_year_before(day):
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:  # 29 February
+        return day.replace(year=day.year - 1, day=28)
+
+
+def parse_date_param(params, name, default=None):
+    """Read an optional YYYY-MM-DD query param, raising a 400 on bad input."""
+    value = params.get(name)
+    if not value:
+        return default
+    parsed = parse_date(value)
+    if parsed is None:
+        raise ValidationError({name: "Expected a date in YYYY-MM-DD format."})
+    return parsed
+
+
+def parse_limit(params, default=5, maximum=100):
+    """Read ?limit=, raising a 400 on bad input."""
+    try:
+        limit = int(params.get("limit", default))
+    except (TypeError, ValueError):
+        raise ValidationError({"limit": "Expected an integer."})
+    if limit < 1:
+        raise ValidationError({"limit": "Must be at least 1."})
+    return min(limit, maximum)
+
+
+# ============================
+# TIME BUCKETS
+# ============================
+
+def bucket_start(day, granularity):
+    """First day of the bucket that contains `day`."""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    # quarter
+    return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+
+
+def next_bucket(day, granularity):
+    """First day of the bucket following the one that starts on `day`."""
+    if granularity == 'day':
+        return day + timedelta(days=1)
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    months = 1 if granularity == 'month' else 3
+    month_index = day.month - 1 + months
+    return date(day.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def bucket_label(day, granularity):
+    if granularity == 'month':
+        return day.strftime("%Y-%m")
+    if granularity == 'quarter':
+        return f"{day.year}-Q{(day.month - 1) // 3 + 1}"
+    # day and week buckets are labelled by their first day
+    return day.isoformat()
+
+
+def previous_bucket(day, granularity):
+    """First day of the bucket before the one that starts on `day`."""
+    return bucket_start(day - timedelta(days=1), granularity)
+
+
+def iter_buckets(start, end, granularity):
+    """Yield the start date of every bucket overlapping [start, end]."""
+    current = bucket_start(start, granularity)
+    while current <= end:
+        yield current
+        current = next_bucket(current, granularity)
+
+
+def parse_series_params(params):
+    """
+    Validate ?granularity=, ?start= and ?end= for a time series.
+    Defaults to monthly buckets over the year ending today.
+    """
+    granularity = params.get("granularity", "month")
+    if granularity not in GRANULARITIES:
+        raise ValidationError(
+            {"granularity": f"Must be one of: {', '.join(GRANULARITIES)}."}
+        )
+
+    end = parse_date_param(params, "end", local_today())
+    start = parse_date_param(params, "start", one_year_before(end))
+    if start > end:
+        raise ValidationError({"start": "Must not be after end."})
+
+    n_buckets = sum(1 for _ in iter_buckets(start, end, granularity))
+    if n_buckets > MAX_BUCKETS:
+        raise ValidationError(
+            {"granularity": f"Range spans {n_buckets} buckets; the limit is {MAX_BUCKETS}."}
+        )
+    return granularity, start, end
+
+
+def _sales_series_query(granularity, start, end, payment_sales=None):
+    if payment_sales is None:
+        payment_sales = DailyPaymentSales.objects.all()
+    return (
+        payment_sales
+        .filter(day__gte=start, day__lte=end)
+        .annotate(bucket=Trunc('day', granularity, output_field=DateField()))
+        .values('bucket')
+        .annotate(total=Sum('revenue'))
+        .order_by()
+    )
+
+
+def _sales_series_rows(rows, granularity, start, end):
+    totals = {row['bucket']: row['total'] for row in rows}
+    return [
+        {
+            granularity: bucket_label(day, granularity),
+            "total_sales": float(totals.get(day) or 0),
+        }
+        for day in iter_buckets(start, end, granularity)
+    ]
+
+
+def sales_series(granularity, start, end, payment_sales=None):
+    """
+    Revenue per bucket between `start` and `end` (inclusive dates), as
+    [{"<granularity>": label, "total_sales": float}, ...].
+
+    Buckets are computed by one grouped query over the daily payment
+    rollups (already split by local day); empty buckets are filled with 0.
+    """
+    rows = _sales_series_query(granularity, start, end, payment_sales)
+    return _sales_series_rows(rows, granularity, start, end)
+
+
+# ============================
+# PANELS
+# ============================
+
+def _summary_aggregates():
+    today = local_today()
+    start_of_month = today.replace(day=1)
+    return dict(
+        total_revenue=Sum('revenue'),
+        today_sales=Sum('revenue', filter=Q(day=today)),
+        month_sales=Sum('revenue', filter=Q(day__gte=start_of_month)),
+        total_orders=Sum('order_count'),
+    )
+
+
+def _summary_result(sales, total_expense, total_customers):
+    total_revenue = sales['total_revenue'] or 0
+    total_expense = total_expense or 0
+    total_profit = total_revenue - total_expense
+
+    return {
+        "today_sales": float(sales['today_sales'] or 0),
+        "month_sales": float(sales['month_sales'] or 0),
+        "total_revenue": float(total_revenue),
+        "total_expense": float(total_expense),
+        "total_profit": float(total_profit),
+        "total_orders": sales['total_orders'] or 0,
+        "total_customers": total_customers,
+    }
+
+
+def sales_summary():
+    """Headline numbers for the dashboard, read from the daily rollups."""
+    return _summary_result(
+        DailyPaymentSales.objects.aggregate(**_summary_aggregates()),
+        Expense.objects.aggregate(total=Sum('amount'))['total'],
+        Customer.objects.count(),
+    )
+
+
+def _top_products_query(limit, product_sales=None):
+    if product_sales is None:
+        product_sales = DailyProductSales.objects.all()
+    return (
+        product_sales
+        .values('product_id')
+        .annotate(
+            name=F('product__name'),
+            sku=F('product__sku'),
+            category=F('product__category'),
+            total_quantity=Sum('quantity'),
+        )
+        .order_by('-total_quantity')[:limit]
+    )
+
+
+def _top_products_rows(rows):
+    return [
+        {
+            "product_id": p['product_id'],
+            "name": p['name'],
+            "sku": p['sku'],
+            "category": p['category'],
+            "total_quantity": int(p['total_quantity'] or 0),
+        }
+        for p in rows
+    ]
+
+
+def top_products(limit, product_sales=None):
+    """Top `limit` products by quantity sold, from DailyProductSales rows."""
+    return _top_products_rows(_top_products_query(limit, product_sales))
+
+
+def expenses_between(start=None, end=None):
+    """
+    Expenses dated from `start` to `end` (either may be None). An open
+    window is closed with date.min / date.max: with both bounds SQLite reads
+    it as a range of expense_day_category_idx rather than scanning every
+    expense in category order.
+    """
+    expenses = Expense.objects.all()
+    if start or end:
+        expenses = expenses.filter(date__range=(start or date.min, end or date.max))
+    return expenses
+
+
+def _expenses_query(expenses=None):
+    if expenses is None:
+        expenses = Expense.objects.all()
+    return (
+        expenses.values("category")
+        .annotate(total_amount=Sum("amount"))
+        .order_by("-total_amount")
+    )
+
+
+def expenses_by_category(expenses=None):
+    return list(_expenses_query(expenses))
+
+
+def _low_stock_query(limit=20):
+    return (
+        Product.objects
+        .filter(stock__lte=F('low_stock_threshold'))
+        .order_by('stock', 'id')
+        .values('id', 'name', 'sku', 'category', 'stock', 'low_stock_threshold')[:limit]
+    )
+
+
+def low_stock_products(limit=20):
+    """Products at or below their low-stock threshold, lowest stock first."""
+    return list(_low_stock_query(limit))
+
+
+# ============================
+# PROFITABILITY
+# ============================
+
+# ?order_by= value -> annotation ranked descending
+PROFIT_RANKINGS = {
+    'quantity': 'total_quantity',
+    'revenue': 'total_revenue',
+    'profit': 'profit',
+    'margin': 'margin_pct',
+}
+
+# Revenue and cost come from the rollups, which carry each item's
+# cost_at_sale, so margins are historical rather than today's buy_price.
+PROFIT_TOTALS = dict(
+    total_revenue=Sum('revenue'),
+    total_cost=Sum('cost'),
+    total_quantity=Sum('quantity'),
+)
+PROFIT = F('total_revenue') - F('total_cost')
+MARGIN_PCT = ExpressionWrapper(
+    Cast(PROFIT, FloatField()) * 100.0
+    / NullIf(Cast(F('total_revenue'), FloatField()), 0.0),
+    output_field=FloatField(),
+)
+
+
+def parse_profit_params(params):
+    """
+    Validate ?start=, ?end=, ?category= (repeatable or comma-separated),
+    ?order_by= and ?limit= for the profitability endpoints.
+    """
+    start = parse_date_param(params, "start")
+    end = parse_date_param(params, "end")
+    if start and end and start > end:
+        raise ValidationError({"start": "Must not be after end."})
+
+    categories = [
+        category.strip()
+        for value in params.getlist("category")
+        for category in value.split(",")
+        if category.strip()
+    ]
+
+    order_by = params.get("order_by", "profit")
+    if order_by not in PROFIT_RANKINGS:
+        raise ValidationError(
+            {"order_by": f"Must be one of: {', '.join(PROFIT_RANKINGS)}."}
+        )
+    return {
+        "start": start,
+        "end": end,
+        "categories": categories,
+        "order_by": order_by,
+        "limit": parse_limit(params, default=20, maximum=1000),
+    }
+
+
+def _product_sales(start=None, end=None, categories=()):
+    qs = DailyProductSales.objects.all()
+    if start:
+        qs = qs.filter(day__gte=start)
+    if end:
+        qs = qs.filter(day__lte=end)
+    if categories:
+        qs = qs.filter(product__category__in=categories)
+    return qs
+
+
+def _profit_numbers(row):
+    margin = row['margin_pct']
+    return {
+        "quantity": int(row['total_quantity'] or 0),
+        "revenue": float(row['total_revenue'] or 0),
+        "cost": float(row['total_cost'] or 0),
+        "profit": float(row['profit'] or 0),
+        "margin_pct": round(margin, 2) if margin is not None else None,
+    }
+
+
+def _ranked(qs, order_by, limit):
+    ranking = PROFIT_RANKINGS[order_by]
+    return qs.order_by(F(ranking).desc(nulls_last=True))[:limit]
+
+
+def _product_profit_query(start=None, end=None, categories=(), order_by='profit', limit=20):
+    return _ranked(
+        _product_sales(start, end, categories)
+        .values('product_id')
+        .annotate(
+            name=F('product__name'),
+            sku=F('product__sku'),
+            category=F('product__category'),
+            **PROFIT_TOTALS,
+        )
+        .annotate(profit=PROFIT, margin_pct=MARGIN_PCT),
+        order_by, limit,
+    )
+
+
+def _product_profit_rows(rows):
+    return [
+        {
+            "product_id": row['product_id'],
+            "name": row['name'],
+            "sku": row['sku'],
+            "category": row['category'],
+            **_profit_numbers(row),
+        }
+        for row in rows
+    ]
+
+
+def product_profit(start=None, end=None, categories=(), order_by='profit', limit=20):
+    """Revenue, cost, profit and margin per product, in one grouped query."""
+    return _product_profit_rows(
+        _product_profit_query(start, end, categories, order_by, limit)
+    )
+
+
+def _category_profit_query(start=None, end=None, categories=(), order_by='profit', limit=20):
+    return _ranked(
+        _product_sales(start, end, categories)
+        .values(category=F('product__category'))
+        .annotate(**PROFIT_TOTALS)
+        .annotate(profit=PROFIT, margin_pct=MARGIN_PCT),
+        order_by, limit,
+    )
+
+
+def _category_profit_rows(rows):
+    return [{"category": row['category'], **_profit_numbers(row)} for row in rows]
+
+
+def category_profit(start=None, end=None, categories=(), order_by='profit', limit=20):
+    """Revenue, cost, profit and margin per product category, in one grouped query."""
+    return _category_profit_rows(
+        _category_profit_query(start, end, categories, order_by, limit)
+    )
+
+
+def _period_profit_query(granularity, start, end, categories=()):
+    if categories:
+        qs = _product_sales(start, end, categories)
+    else:
+        qs = DailyPaymentSales.objects.filter(day__gte=start, day__lte=end)
+    return (
+        qs.annotate(bucket=Trunc('day', granularity, output_field=DateField()))
+        .values('bucket')
+        .annotate(**PROFIT_TOTALS)
+        .annotate(profit=PROFIT, margin_pct=MARGIN_PCT)
+        .order_by()
+    )
+
+
+def _period_profit_rows(rows, granularity, start, end):
+    by_bucket = {row['bucket']: row for row in rows}
+    empty = {'total_quantity': 0, 'total_revenue': 0, 'total_cost': 0,
+             'profit': 0, 'margin_pct': None}
+
+    return [
+        {
+            granularity: bucket_label(day, granularity),
+            **_profit_numbers(by_bucket.get(day, empty)),
+        }
+        for day in iter_buckets(start, end, granularity)
+    ]
+
+
+def period_profit(granularity, start, end, categories=()):
+    """
+    Revenue, cost, profit and margin per time bucket, in one grouped query.
+    Empty buckets are returned with zeros and a null margin.
+    """
+    rows = _period_profit_query(granularity, start, end, categories)
+    return _period_profit_rows(rows, granularity, start, end)
+
+
+# ============================
+# PROFIT & LOSS
+# ============================
+
+def _pct(part, whole):
+    return round(float(part) * 100 / float(whole), 2) if whole else None
+
+
+def _profit_loss_queries(granularity, start, end):
+    # From the bucket before the first one, for its comparison.
+    first = previous_bucket(bucket_start(start, granularity), granularity)
+    sales = (
+        DailyPaymentSales.objects
+        .filter(day__gte=first, day__lte=end)
+        .annotate(bucket=Trunc('day', granularity, output_field=DateField()))
+        .values('bucket')
+        .annotate(revenue=Sum('revenue'), cost=Sum('cost'))
+        .order_by('bucket')
+    )
+    # Expenses are grouped by day and bucketed while merging: the covering
+    # expense_day_category_idx returns the days in order, where truncating
+    # in SQL would call the date function on every expense row.
+    expenses = (
+        Expense.objects
+        .filter(date__gte=first, date__lte=end)
+        .values('date', 'category')
+        .annotate(amount=Sum('amount'))
+        .order_by('date', 'category')
+    )
+    return sales, expenses
+
+
+def _profit_loss_rows(sales, expenses, granularity, start, end):
+    categories = sorted({row['category'] for row in expenses})
+    zero = Decimal(0)
+    sales, expenses = iter(sales), iter(expenses)
+    sale, expense = next(sales, None), next(expenses, None)
+
+    first = bucket_start(start, granularity)
+    # Data stops here; a bucket running past it is not comparable yet.
+    cutoff = min(end, local_today())
+    result = []
+    previous_revenue = previous_net = None
+    # Both row lists are sorted by date: merge them while walking the buckets.
+    for day in iter_buckets(previous_bucket(first, granularity), end, granularity):
+        revenue = cost = zero
+        if sale is not None and sale['bucket'] == day:
+            revenue, cost = sale['revenue'] or zero, sale['cost'] or zero
+            sale = next(sales, None)
+        by_category = dict.fromkeys(categories, zero)
+        while expense is not None and bucket_start(expense['date'], granularity) == day:
+            by_category[expense['category']] += expense['amount']
+            expense = next(expenses, None)
+
+        total_expenses = sum(by_category.values(), zero)
+        gross = revenue - cost
+        net = gross - total_expenses
+        if day >= first:
+            partial = next_bucket(day, granularity) - timedelta(days=1) > cutoff
+            result.append({
+                granularity: bucket_label(day, granularity),
+                "revenue": float(revenue),
+                "cost_of_goods": float(cost),
+                "gross_profit": float(gross),
+                "expenses": {category: float(amount) for category, amount in by_category.items()},
+                "total_expenses": float(total_expenses),
+                "net_profit": float(net),
+                "net_margin_pct": _pct(net, revenue),
+                "previous_net_profit": float(previous_net),
+                "net_profit_change": None if partial else float(net - previous_net),
+                "revenue_change_pct": (
+                    None if partial else _pct(revenue - previous_revenue, previous_revenue)
+                ),
+                "partial": partial,
+            })
+        previous_revenue, previous_net = revenue, net
+    return result
+
+
+def profit_loss(granularity, start, end):
+    """
+    Profit & loss per time bucket: revenue and cost of goods from the daily
+    rollups, expenses by category, gross and net profit, and the change
+    from the bucket before. Buckets are whole, from the one containing
+    `start`, so each compares with a complete previous bucket. A bucket
+    that runs past `end` or today (usually the current one) is marked
+    partial and gets no change figures.
+
+    One grouped query per source, merged in a single pass; a multi-year
+    range costs two queries like a single month.
+    """
+    sales, expenses = _profit_loss_queries(granularity, start, end)
+    return _profit_loss_rows(list(sales), list(expenses), granularity, start, end)
+
+
+# ============================
+# CUSTOMERS
+# ============================
+# Read from CustomerStats (see core.customer_stats), never from orders.
+# Rankings and city lists walk one index from the top, so a page costs
+# the same however many customers and orders there are.
+
+# ?order_by= value -> CustomerStats column ranked descending
+CUSTOMER_RANKINGS = {
+    'revenue': 'revenue',
+    'orders': 'order_count',
+    'recent': 'last_order_at',
+}
+
+# RFM dimension -> CustomerStats column; higher values score higher.
+RFM_DIMENSIONS = {
+    'recency': 'last_order_at',
+    'frequency': 'order_count',
+    'monetary': 'revenue',
+}
+
+# (segment, recency scores, frequency scores); the first match wins.
+RFM_SEGMENTS = [
+    ('champions', (4, 5), (4, 5)),
+    ('loyal', (3, 5), (3, 5)),
+    ('new', (4, 5), (1, 2)),
+    ('promising', (3, 3), (1, 2)),
+    ('at_risk', (1, 2), (3, 5)),
+    ('hibernating', (1, 2), (1, 2)),
+]
+
+_DATETIME = serializers.DateTimeField()
+
+
+def _choice(params, name, choices, default):
+    value = params.get(name, default)
+    if value not in choices:
+        raise ValidationError({name: f"Must be one of: {', '.join(choices)}."})
+    return value
+
+
+def parse_customer_params(params):
+    """Validate ?order_by= and ?limit= for the top customers."""
+    return {
+        "order_by": _choice(params, "order_by", CUSTOMER_RANKINGS, "revenue"),
+        "limit": parse_limit(params, default=10, maximum=1000),
+    }
+
+
+def parse_rfm_params(params):
+    """Validate ?segment= (optional) and ?limit= for the RFM segments."""
+    segment = None
+    if params.get("segment"):
+        segment = _choice(params, "segment", [name for name, *_ in RFM_SEGMENTS], None)
+    return {"segment": segment, "limit": parse_limit(params, default=20, maximum=1000)}
+
+
+def _datetime(value):
+    return _DATETIME.to_representation(value) if value else None
+
+
+def _customer_values(qs):
+    return qs.values(
+        'customer_id', 'city', 'order_count', 'revenue', 'first_order_at', 'last_order_at',
+        name=F('customer__name'),
+    )
+
+
+def _customer_row(row):
+    count, revenue = row['order_count'], row['revenue'] or 0
+    return {
+        "customer_id": row['customer_id'],
+        "name": row['name'],
+        "city": row['city'],
+        "order_count": count,
+        "revenue": float(revenue),
+        "average_basket": round(float(revenue) / count, 2) if count else None,
+        "first_order_at": _datetime(row['first_order_at']),
+        "last_order_at": _datetime(row['last_order_at']),
+    }
+
+
+def _buyers():
+    """Stats of the customers with at least one order."""
+    return CustomerStats.objects.filter(last_order_at__isnull=False)
+
+
+def _top_customers_query(order_by='revenue', limit=10):
+    column = CUSTOMER_RANKINGS[order_by]
+    return _customer_values(_buyers().order_by(f'-{column}', '-customer'))[:limit]
+
+
+def top_customers(order_by='revenue', limit=10):
+    """Top `limit` customers by revenue, order count or latest order."""
+    return [_customer_row(row) for row in _top_customers_query(order_by, limit)]
+
+
+def _cities_query(city=None, limit=20):
+    if city is not None:
+        return _customer_values(
+            CustomerStats.objects.filter(city=city).order_by('-revenue', '-customer')
+        )[:limit]
+    return (
+        CustomerStats.objects
+        .values('city')
+        .annotate(customers=Count('customer'), revenue=Sum('revenue'))
+        .order_by('-revenue', 'city')[:limit]
+    )
+
+
+def _cities_rows(rows, city=None):
+    if city is not None:
+        return [_customer_row(row) for row in rows]
+    return [
+        {"city": row['city'], "customers": row['customers'], "revenue": float(row['revenue'] or 0)}
+        for row in rows
+    ]
+
+
+def customers_by_city(city=None, limit=20):
+    """
+    With `city`: its customers by revenue, top `limit`. Without: customer
+    count and revenue per city, largest first.
+    """
+    return _cities_rows(_cities_query(city, limit), city)
+
+
+def _rfm_counts():
+    """Customers, and customers with orders: one pass over the recency index."""
+    return {'total': Count('pk'), 'buyers': Count('last_order_at')}
+
+
+def _rfm_boundary_queries(buyers, total):
+    """
+    Per dimension, the values at 20/40/60/80% of the customers with
+    orders: four single-row reads of the dimension's index. Customers
+    without orders have no last order and sort first on order count and
+    revenue (both zero), so those reads skip them by offset instead of
+    checking each row.
+    """
+    queries = {}
+    for dimension, column in RFM_DIMENSIONS.items():
+        if dimension == 'recency':
+            rows, skip = _buyers(), 0
+        else:
+            rows, skip = CustomerStats.objects.all(), total - buyers
+        ordered = rows.order_by(column).values_list(column, flat=True)
+        queries[dimension] = [
+            ordered[skip + buyers * k // 5:skip + buyers * k // 5 + 1] for k in range(1, 5)
+        ]
+    return queries
+
+
+def _rfm_score(value, boundaries):
+    """
+    1-5: one more than the number of boundaries at or below `value`. Ties
+    score high, so customers sharing a boundary value (or a lone buyer)
+    are not all pushed into the bottom quintile.
+    """
+    return bisect_right(boundaries, value) + 1
+
+
+def _score_expression(column, boundaries):
+    """SQL version of _rfm_score()."""
+    return Case(
+        *(When(**{f'{column}__lt': boundary}, then=score) for score, boundary in enumerate(boundaries, 1)),
+        default=5,
+    )
+
+
+def _segment(recency, frequency):
+    for name, (r_low, r_high), (f_low, f_high) in RFM_SEGMENTS:
+        if r_low <= recency <= r_high and f_low <= frequency <= f_high:
+            return name
+    return None
+
+
+def _score_range(column, boundaries, low, high):
+    """Rows whose score on `column` is between `low` and `high`."""
+    condition = Q()
+    if low > 1:
+        condition &= Q(**{f'{column}__gte': boundaries[low - 2]})
+    if high < 5:
+        condition &= Q(**{f'{column}__lt': boundaries[high - 1]})
+    return condition
+
+
+def _runs(scores):
+    """Consecutive scores as (low, high) ranges: (1, 2, 4) -> [(1, 2), (4, 4)]."""
+    runs = []
+    for score in scores:
+        if runs and runs[-1][1] == score - 1:
+            runs[-1] = (runs[-1][0], score)
+        else:
+            runs.append((score, score))
+    return runs
+
+
+def _segment_condition(thresholds, segment):
+    """
+    Q for the customers in `segment`: its (recency, frequency) score
+    pairs, merged into as few score ranges as possible so each becomes
+    one index range.
+    """
+    bands = []  # [recency low, recency high, frequency runs]
+    for recency in range(1, 6):
+        runs = _runs([f for f in range(1, 6) if _segment(recency, f) == segment])
+        if bands and bands[-1][1] == recency - 1 and bands[-1][2] == runs:
+            bands[-1][1] = recency
+        elif runs:
+            bands.append([recency, recency, runs])
+
+    condition = Q(pk__in=[])
+    for r_low, r_high, runs in bands:
+        for f_low, f_high in runs:
+            condition |= (
+                _score_range(RFM_DIMENSIONS['recency'], thresholds['recency'], r_low, r_high)
+                & _score_range(RFM_DIMENSIONS['frequency'], thresholds['frequency'], f_low, f_high)
+            )
+    return condition
+
+
+def _rfm_grid_query(thresholds):
+    """Customers and revenue per (recency, frequency) score pair: at most 25 rows."""
+    return (
+        _buyers()
+        .values(
+            recency=_score_expression(RFM_DIMENSIONS['recency'], thresholds['recency']),
+            frequency=_score_expression(RFM_DIMENSIONS['frequency'], thresholds['frequency']),
+        )
+        .annotate(customers=Count('pk'), revenue=Sum('revenue'))
+        .order_by()
+    )
+
+
+def _rfm_segment_query(thresholds, segment, limit):
+    """
+    The segment's top `limit` customers by revenue. The page is picked
+    from the recency index alone; only its rows are then read and joined.
+    """
+    ranking = ('-revenue', '-customer')
+    page = (
+        _buyers()
+        .filter(_segment_condition(thresholds, segment))
+        .order_by(*ranking)
+        .values('customer')[:limit]
+    )
+    return _customer_values(CustomerStats.objects.filter(customer__in=page).order_by(*ranking))
+
+
+def _rfm_result(count, thresholds, grid, rows, segment):
+    totals = {name: {"segment": name, "customers": 0, "revenue": 0.0} for name, *_ in RFM_SEGMENTS}
+    for cell in grid:
+        name = _segment(cell['recency'], cell['frequency'])
+        if name is not None:
+            totals[name]["customers"] += cell['customers']
+            totals[name]["revenue"] += float(cell['revenue'] or 0)
+    result = {
+        "customers_with_orders": count,
+        "thresholds": None,
+        "segments": list(totals.values()),
+    }
+    if thresholds:
+        result["thresholds"] = {
+            "recency": [_datetime(value) for value in thresholds['recency']],
+            "frequency": thresholds['frequency'],
+            "monetary": [float(value) for value in thresholds['monetary']],
+        }
+    if segment is not None:
+        result["customers"] = [
+            {
+                **_customer_row(row),
+                "rfm": {
+                    dimension: _rfm_score(row[column], thresholds[dimension])
+                    for dimension, column in RFM_DIMENSIONS.items()
+                },
+            }
+            for row in rows
+        ]
+    return result
+
+
+def customer_rfm(segment=None, limit=20):
+    """
+    RFM segmentation of the customers with orders. Each customer scores
+    1-5 on recency (last order), frequency (order count) and monetary
+    value (revenue) by quintile; recency and frequency place it in one of
+    RFM_SEGMENTS. Returns the quintile boundaries, customers and revenue
+    per segment, and with `segment`, that segment's top `limit` customers
+    by revenue with their scores.
+
+    The boundaries are 12 single-row index reads; the segment totals are
+    one GROUP BY over the recency index, which covers both scores and
+    revenue.
+    """
+    counts = CustomerStats.objects.aggregate(**_rfm_counts())
+    if not counts['buyers']:
+        return _rfm_result(0, None, [], [], segment)
+    thresholds = {
+        dimension: [list(qs)[0] for qs in queries]
+        for dimension, queries in _rfm_boundary_queries(counts['buyers'], counts['total']).items()
+    }
+    grid = list(_rfm_grid_query(thresholds))
+    rows = _rfm_segment_query(thresholds, segment, limit) if segment else []
+    return _rfm_result(counts['buyers'], thresholds, grid, rows, segment)
+
+
+# ============================
+# ASYNC
+# ============================
+# Same queries through the async ORM (aaggregate, acount, async for), for
+# the async views. Django still runs each query on its sync worker thread;
+# the event loop is free while it does.
+
+async def _alist(qs):
+    return [row async for row in qs]
+
+
+async def asales_series(granularity, start, end, payment_sales=None):
+    rows = await _alist(_sales_series_query(granularity, start, end, payment_sales))
+    return _sales_series_rows(rows, granularity, start, end)
+
+
+async def asales_summary():
+    return _summary_result(
+        await DailyPaymentSales.objects.aaggregate(**_summary_aggregates()),
+        (await Expense.objects.aaggregate(total=Sum('amount')))['total'],
+        await Customer.objects.acount(),
+    )
+
+
+async def atop_products(limit, product_sales=None):
+    return _top_products_rows(await _alist(_top_products_query(limit, product_sales)))
+
+
+async def aexpenses_by_category(expenses=None):
+    return await _alist(_expenses_query(expenses))
+
+
+async def aproduct_profit(start=None, end=None, categories=(), order_by='profit', limit=20):
+    return _product_profit_rows(
+        await _alist(_product_profit_query(start, end, categories, order_by, limit))
+    )
+
+
+async def acategory_profit(start=None, end=None, categories=(), order_by='profit', limit=20):
+    return _category_profit_rows(
+        await _alist(_category_profit_query(start, end, categories, order_by, limit))
+    )
+
+
+async def aperiod_profit(granularity, start, end, categories=()):
+    rows = await _alist(_period_profit_query(granularity, start, end, categories))
+    return _period_profit_rows(rows, granularity, start, end)
+
+
+async def aprofit_loss(granularity, start, end):
+    sales, expenses = _profit_loss_queries(granularity, start, end)
+    return _profit_loss_rows(await _alist(sales), await _alist(expenses), granularity, start, end)
+
+
+async def atop_customers(order_by='revenue', limit=10):
+    return [_customer_row(row) for row in await _alist(_top_customers_query(order_by, limit))]
+
+
+async def acustomers_by_city(city=None, limit=20):
+    return _cities_rows(await _alist(_cities_query(city, limit)), city)
+
+
+async def acustomer_rfm(segment=None, limit=20):
+    counts = await CustomerStats.objects.aaggregate(**_rfm_counts())
+    if not counts['buyers']:
+        return _rfm_result(0, None, [], [], segment)
+    thresholds = {
+        dimension: [(await _alist(qs))[0] for qs in queries]
+        for dimension, queries in _rfm_boundary_queries(counts['buyers'], counts['total']).items()
+    }
+    grid = await _alist(_rfm_grid_query(thresholds))
+    rows = await _alist(_rfm_segment_query(thresholds, segment, limit)) if segment else []
+    return _rfm_result(counts['buyers'], thresholds, grid, rows, segment)
@@ -0,0 +1,44 @@
+"""
+Routes of core.urls that have an async view (core.async_views). Included
+ahead of core.urls by config.asgi_urls, so the names and paths are the
+same; writes on the list routes still go to the DRF viewsets.
+"""
+from django.urls import path
+
+from . import async_views
+from .views import ProductViewSet, CustomerViewSet, OrderViewSet, ExpenseViewSet
+
+LIST_ACTIONS = {'get': 'list', 'post': 'create'}
+
+urlpatterns = [
+    # CRUD lists
+    path('products/', async_views.read_async(
+        async_views.ProductList.as_view(), ProductViewSet.as_view(LIST_ACTIONS),
+    ), name='product-list'),
+    path('customers/', async_views.read_async(
+        async_views.CustomerList.as_view(), CustomerViewSet.as_view(LIST_ACTIONS),
+    ), name='customer-list'),
+    path('orders/', async_views.read_async(
+        async_views.OrderList.as_view(), OrderViewSet.as_view(LIST_ACTIONS),
+    ), name='order-list'),
+    path('expenses/', async_views.read_async(
+        async_views.ExpenseList.as_view(), ExpenseViewSet.as_view(LIST_ACTIONS),
+    ), name='expense-list'),
+
+    # Analytics
+    path('analytics/sales-summary/', async_views.sales_summary, name='sales-summary'),
+    path('analytics/monthly-sales/', async_views.monthly_sales, name='monthly-sales'),
+    path('analytics/top-products/', async_views.top_products, name='top-products'),
+    path('analytics/expenses-summary/', async_views.expenses_summary, name='expenses-summary'),
+    path('analytics/profit/products/', async_views.product_profit, name='profit-products'),
+    path('analytics/profit/categories/', async_views.category_profit, name='profit-categories'),
+    path('analytics/profit/periods/', async_views.period_profit, name='profit-periods'),
+    path('analytics/profit-loss/', async_views.profit_loss, name='profit-loss'),
+    path('analytics/customers/top/', async_views.top_customers, name='top-customers'),
+    path('analytics/customers/rfm/', async_views.customer_rfm, name='customer-rfm'),
+    path('analytics/customers/by-city/', async_views.customers_by_city, name='customers-by-city'),
+    path('analytics/dashboard/', async_views.dashboard_view, name='dashboard'),
+
+    # Streaming exports
+    path('export/<slug:dataset>/', async_views.export, name='export'),
+]
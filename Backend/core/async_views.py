@@ -0,0 +1,357 @@
+"""
+Async versions of the read-heavy endpoints, served under ASGI.
+
+config.asgi resolves URLs against config.asgi_urls, which sends GET
+requests for the analytics endpoints and the CRUD lists here and
+everything else to the DRF views in core.views. Authentication, the
+analytics cache and the ORM are all awaited (aaggregate, acount, async
+for), so the event loop keeps serving other requests while one waits on
+the database or the cache. Responses carry the same JSON, ETags and error bodies
+as the DRF views; the browsable API is only served by those.
+
+Django 4.2 still runs each query on a sync thread, the request's own
+(see config.asgi); the event loop stays free while it runs.
+"""
+import time
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Max, Prefetch, prefetch_related_objects
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .analytics import (
+    acategory_profit,
+    acustomer_rfm,
+    acustomers_by_city,
+    aexpenses_by_category,
+    aperiod_profit,
+    aproduct_profit,
+    aprofit_loss,
+    asales_series,
+    asales_summary,
+    atop_customers,
+    atop_products,
+    expenses_between,
+    parse_customer_params,
+    parse_date_param,
+    parse_limit,
+    parse_profit_params,
+    parse_rfm_params,
+    parse_series_params,
+)
+from .authentication import AsyncJWTAuthentication
+from .conditional import dependency_aggregates, list_etag, not_modified, shown_rows, with_validators
+from .readers import ProductReader, CustomerReader, OrderReader, ExpenseReader
+from .models import Product, Customer, Order, OrderItem, Expense
+from .serializers import (
+    ProductSerializer,
+    CustomerSerializer,
+    OrderReadSerializer,
+    ExpenseSerializer,
+)
+from .views import CustomerViewSet, ProductViewSet
+from . import cache, dashboard, exports, fieldsets
+
+authenticator = AsyncJWTAuthentication()
+renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(
+        renderer.render(data), status=status_code, content_type=renderer.media_type,
+    )
+
+
+def error_response(exc):
+    """What rest_framework.views.exception_handler returns for `exc`."""
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound(*exc.args)
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = render(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        response['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    return response
+
+
+def api_view(view):
+    """
+    Decorator for an async view that returns JSON-ready data (or a
+    response): JWT authentication, IsAuthenticated and DRF error bodies.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            result = await authenticator.aauthenticate(request)
+            if result is None:
+                raise exceptions.NotAuthenticated()
+            request.user, request.auth = result
+            response = await view(request, *args, **kwargs)
+        except (exceptions.APIException, Http404) as exc:
+            return error_response(exc)
+        if not isinstance(response, HttpResponseBase):
+            response = render(response)
+        return response
+    wrapper.csrf_exempt = True
+    return wrapper
+
+
+def render_cached(data, etag):
+    """Response for core.cache.cached_data() results: a 304 when data is None."""
+    if data is None:
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = render(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached(endpoint):
+    """core.cache.cached_response for async views."""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            return render_cached(*await cache.cached_data(
+                endpoint, request, lambda: view(request, *args, **kwargs),
+            ))
+        return wrapper
+    return decorator
+
+
+def read_async(async_view, sync_view):
+    """GET and HEAD go to `async_view`; writes to the DRF `sync_view` on a thread."""
+    sync_view = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_view(request, *args, **kwargs)
+    view.csrf_exempt = True
+    return view
+
+
+# ============================
+# CRUD LISTS
+# ============================
+
+class AsyncListView:
+    """
+    The list action of a CRUD viewset: filters, conditional GET, keyset
+    pagination, ?fields= / ?expand= and the viewset's list reader (or
+    serializer, with FAST_LIST_READS off), with every query on the async
+    ORM. Subclasses take their filter_backends and search_fields from the
+    viewset they mirror.
+    """
+    queryset = None
+    serializer_class = None
+    list_reader = None
+    filter_backends = ()
+    search_fields = ()
+    keyset_field = 'created_at'
+    conditional_dependencies = ()
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+
+    @classmethod
+    def as_view(cls):
+        return api_view(cls().get)
+
+    async def etag(self, request, queryset, paginator):
+        totals = await queryset.order_by().aaggregate(last=Max('updated_at'), count=Count('pk'))
+        dependencies = {}
+        if self.conditional_dependencies:
+            page = paginator.page_queryset(queryset, Request(request), view=self, look_ahead=False)
+            dependencies = await shown_rows(queryset, page).aaggregate(
+                **dependency_aggregates(self.conditional_dependencies)
+            )
+        return list_etag(
+            totals, request.get_full_path(), self.conditional_dependencies, dependencies, 'json',
+        )
+
+    async def load_related(self, rows):
+        return rows
+
+    async def get(self, request):
+        queryset = self.queryset.all()
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(Request(request), queryset, self)
+        paginator = self.pagination_class()
+        etag = await self.etag(request, queryset, paginator)
+        if not_modified(request, etag, None):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+            return with_validators(response, etag, None)
+
+        selection = fieldsets.from_query(request.GET)
+        if self.list_reader is not None and settings.FAST_LIST_READS:
+            reader = self.list_reader.narrow(self.serializer_class(**selection))
+            queryset = reader.values(queryset, self.keyset_field)
+            represent = reader.aread
+        else:
+            async def represent(rows):
+                return self.serializer_class(await self.load_related(rows), many=True, **selection).data
+
+        rows = await paginator.apaginate_queryset(queryset, Request(request), view=self)
+        if rows is None:
+            data = await represent([row async for row in queryset])
+        else:
+            data = paginator.get_paginated_data(await represent(rows))
+        return with_validators(render(data), etag, None)
+
+
+class ProductList(AsyncListView):
+    queryset = Product.objects.all().order_by('-created_at', '-id')
+    serializer_class = ProductSerializer
+    list_reader = ProductReader()
+    filter_backends = ProductViewSet.filter_backends
+    search_fields = ProductViewSet.search_fields
+
+
+class CustomerList(AsyncListView):
+    queryset = Customer.objects.all().order_by('-created_at', '-id')
+    serializer_class = CustomerSerializer
+    list_reader = CustomerReader()
+    filter_backends = CustomerViewSet.filter_backends
+    search_fields = CustomerViewSet.search_fields
+
+
+class OrderList(AsyncListView):
+    queryset = Order.objects.select_related('customer').order_by('-order_date', '-id')
+    serializer_class = OrderReadSerializer
+    list_reader = OrderReader()
+    keyset_field = 'order_date'
+    conditional_dependencies = ('customer', 'items__product')
+
+    async def load_related(self, orders):
+        # Async iteration does not run prefetch_related() before Django 5.0;
+        # run the same prefetch on the fetched page.
+        await sync_to_async(prefetch_related_objects)(
+            orders, Prefetch('items', queryset=OrderItem.objects.select_related('product')),
+        )
+        return orders
+
+
+class ExpenseList(AsyncListView):
+    queryset = Expense.objects.all().order_by('-date', '-id')
+    serializer_class = ExpenseSerializer
+    list_reader = ExpenseReader()
+    keyset_field = 'date'
+
+
+# ============================
+# ANALYTICS
+# ============================
+# Same query params and responses as the APIViews in core.views.
+
+@api_view
+@cached('sales-summary')
+async def sales_summary(request):
+    return await asales_summary()
+
+
+@api_view
+@cached('monthly-sales')
+async def monthly_sales(request):
+    granularity, start, end = parse_series_params(request.GET)
+    return await asales_series(granularity, start, end)
+
+
+@api_view
+@cached('top-products')
+async def top_products(request):
+    return await atop_products(parse_limit(request.GET))
+
+
+@api_view
+@cached('expenses-summary')
+async def expenses_summary(request):
+    start = parse_date_param(request.GET, "start")
+    end = parse_date_param(request.GET, "end")
+    return await aexpenses_by_category(expenses_between(start, end))
+
+
+@api_view
+@cached('profit-products')
+async def product_profit(request):
+    return await aproduct_profit(**parse_profit_params(request.GET))
+
+
+@api_view
+@cached('profit-categories')
+async def category_profit(request):
+    return await acategory_profit(**parse_profit_params(request.GET))
+
+
+@api_view
+@cached('profit-periods')
+async def period_profit(request):
+    granularity, start, end = parse_series_params(request.GET)
+    categories = parse_profit_params(request.GET)['categories']
+    return await aperiod_profit(granularity, start, end, categories)
+
+
+@api_view
+@cached('profit-loss')
+async def profit_loss(request):
+    granularity, start, end = parse_series_params(request.GET)
+    return await aprofit_loss(granularity, start, end)
+
+
+@api_view
+@cached('top-customers')
+async def top_customers(request):
+    return await atop_customers(**parse_customer_params(request.GET))
+
+
+@api_view
+@cached('customer-rfm')
+async def customer_rfm(request):
+    return await acustomer_rfm(**parse_rfm_params(request.GET))
+
+
+@api_view
+@cached('customers-by-city')
+async def customers_by_city(request):
+    return await acustomers_by_city(
+        request.GET.get("city"), parse_limit(request.GET, default=20, maximum=1000),
+    )
+
+
+@api_view
+async def dashboard_view(request):
+    # As DashboardView: "meta" describes this request and is not cached.
+    started = time.perf_counter()
+    computed = {}
+
+    async def panels():
+        data = await dashboard.abuild_dashboard(request.GET)
+        computed['meta'] = data.pop('meta')
+        return data
+
+    data, etag = await cache.cached_data('dashboard', request, panels, weak=True)
+    if data is not None:
+        data = {**data, "meta": computed.get('meta') or dashboard.cached_meta(request.GET, started)}
+    return render_cached(data, etag)
+
+
+# ============================
+# EXPORTS
+# ============================
+
+@api_view
+async def export(request, dataset):
+    # As ExportView, streamed from an async iterator: the first rows go out
+    # while the rest are still being read.
+    output, start, end = exports.parse_export_params(dataset, request.GET)
+    response = StreamingHttpResponse(
+        exports.aiter_export(dataset, output, start, end),
+        content_type=exports.CONTENT_TYPES[output],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+    return response
@@ -0,0 +1,544 @@
+"""
+Synthetic data and endpoint benchmarks.
+
+seed() fills the database with a deterministic, realistic-looking history:
+order dates follow a yearly season with busier weekends, product
+popularity is skewed, and some orders have no customer. Everything is
+written with bulk_create in batches, then the rollups and customer stats
+are rebuilt once and each product's stock gets an opening movement in the
+stock ledger.
+
+run_routes() requests every route of core.urls against the current data
+and records p50/p95 latency, query count and peak Python memory per
+route. Used by `manage.py seed_benchmark` and `manage.py run_benchmark`.
+
+render_orders() compares OrderReadSerializer with OrderReader and the stock
+DRF JSON renderer and parser with the orjson-backed ones on a large order
+list (`manage.py run_render_benchmark`).
+"""
+import io
+import math
+import random
+import statistics
+import threading
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError, connection, transaction
+from django.db.models import Prefetch
+from django.urls import URLPattern, URLResolver, reverse
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .analytics import start_of_day
+from .models import (
+    Product,
+    Customer,
+    CustomerStats,
+    Order,
+    OrderItem,
+    Expense,
+    DailyPaymentSales,
+    DailyProductSales,
+    StockMovement,
+    StockSnapshot,
+)
+from .parsers import FastJSONParser
+from .readers import OrderReader
+from .renderers import FastJSONRenderer
+from .serializers import OrderReadSerializer
+from . import cache as analytics_cache, customer_stats, ledger, profiling, rollups
+
+# Named data sizes for run_benchmark; any of them can be overridden on the
+# seed_benchmark command line. "large" is ~5M order items.
+SIZES = {
+    'tiny': {'products': 20, 'customers': 50, 'orders': 200, 'expenses': 50},
+    'small': {'products': 500, 'customers': 2000, 'orders': 10000, 'expenses': 1000},
+    'medium': {'products': 2000, 'customers': 20000, 'orders': 100000, 'expenses': 10000},
+    'large': {'products': 10000, 'customers': 100000, 'orders': 1700000, 'expenses': 100000},
+}
+
+EXPENSE_CATEGORIES = ['Rent', 'Salaries', 'Utilities', 'Supplies', 'Marketing', 'Transport']
+PRODUCT_CATEGORIES = ['Grocery', 'Beverages', 'Household', 'Personal Care', 'Stationery',
+                      'Electronics', 'Snacks', 'Dairy']
+CITIES = ['Surat', 'Ahmedabad', 'Mumbai', 'Pune', 'Vadodara', 'Rajkot', 'Delhi', 'Jaipur']
+
+DEFAULT_BATCH_SIZE = 5000
+# The seeded history ends on a fixed day, not today, so a seed and the
+# baseline recorded from it describe the same rows whenever the run happens.
+SEED_END = date(2025, 12, 31)
+CENT = Decimal("0.01")
+
+
+# ============================
+# SEEDING
+# ============================
+
+def _cumulative(weights):
+    total, result = 0.0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+def _day_weights(days, end):
+    """Relative order volume per day: yearly season, weekend peak, slow growth."""
+    weights = []
+    for offset in range(days):
+        day = end - timedelta(days=days - 1 - offset)
+        season = 1 + 0.35 * math.cos(2 * math.pi * (day.timetuple().tm_yday - 320) / 365)
+        weekend = 1.3 if day.weekday() >= 5 else 1.0
+        growth = 0.7 + 0.3 * offset / max(days - 1, 1)
+        weights.append(season * weekend * growth)
+    return weights
+
+
+def flush():
+    """Delete all business data (users are kept)."""
+    with transaction.atomic():
+        for model in (DailyProductSales, DailyPaymentSales, StockSnapshot, StockMovement,
+                      CustomerStats, OrderItem, Order, Expense, Customer, Product):
+            # Plain DELETE: no per-row signals or cascade collection.
+            model.objects.all()._raw_delete(model.objects.db)
+        analytics_cache.invalidate()
+
+
+def seed(products, customers, orders, expenses, items_per_order=3, days=730,
+         seed=1, batch_size=DEFAULT_BATCH_SIZE, progress=None, end=SEED_END):
+    """
+    Insert a synthetic history of `days` days ending on `end`. The same
+    arguments always produce the same rows. `items_per_order` is the mean; each order has 1..2*mean-1 lines.
+    Returns {"products": n, "customers": n, "orders": n, "order_items": n,
+    "expenses": n, "seconds": float}.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    counts = {'products': products, 'customers': customers, 'orders': orders,
+              'order_items': 0, 'expenses': expenses}
+
+    product_rows = []
+    for i in range(products):
+        buy = Decimal(rng.randint(1000, 200000)) / 100
+        product_rows.append(Product(
+            name=f"Product {i:05d}",
+            category=rng.choice(PRODUCT_CATEGORIES),
+            sku=f"BENCH-{i:06d}",
+            buy_price=buy,
+            sell_price=(buy * Decimal(rng.uniform(1.15, 1.8))).quantize(CENT),
+            stock=10 ** 9,
+            low_stock_threshold=10,
+        ))
+    with transaction.atomic():
+        product_rows = Product.objects.bulk_create(product_rows, batch_size=batch_size)
+        # A few products are running low.
+        Product.objects.filter(
+            pk__in=[p.pk for p in product_rows[::50]]
+        ).update(stock=5)
+
+    customer_ids = []
+    for start in range(0, customers, batch_size):
+        batch = [
+            Customer(
+                name=f"Customer {i:06d}",
+                phone=f"9{rng.randint(100000000, 999999999)}",
+                city=rng.choice(CITIES),
+            )
+            for i in range(start, min(start + batch_size, customers))
+        ]
+        with transaction.atomic():
+            customer_ids.extend(c.pk for c in Customer.objects.bulk_create(batch))
+
+    # A few products sell most of the volume.
+    product_weights = _cumulative(1 / (rank + 1) ** 0.8 for rank in range(products))
+    day_list = [end - timedelta(days=days - 1 - offset) for offset in range(days)]
+    day_weights = _cumulative(_day_weights(days, end))
+    methods = ['CASH', 'UPI', 'CARD', 'OTHER']
+    method_weights = _cumulative([35, 45, 18, 2])
+    max_lines = max(1, 2 * items_per_order - 1)
+
+    for start in range(0, orders, batch_size):
+        n = min(batch_size, orders - start)
+        order_rows, lines_per_order = [], []
+        for day in rng.choices(day_list, cum_weights=day_weights, k=n):
+            when = start_of_day(day) + timedelta(
+                hours=rng.randint(9, 20), minutes=rng.randint(0, 59), seconds=rng.randint(0, 59),
+            )
+            lines = []
+            for product in rng.choices(product_rows, cum_weights=product_weights,
+                                       k=rng.randint(1, max_lines)):
+                price = product.sell_price
+                if rng.random() < 0.1:
+                    price = (price * Decimal("0.9")).quantize(CENT)
+                lines.append(OrderItem(
+                    product=product,
+                    quantity=rng.choices((1, 2, 3, 4, 5), cum_weights=(50, 75, 88, 95, 100))[0],
+                    price_at_sale=price,
+                    cost_at_sale=product.buy_price,
+                ))
+            order_rows.append(Order(
+                customer_id=rng.choice(customer_ids) if customer_ids and rng.random() < 0.8 else None,
+                order_date=when,
+                payment_method=rng.choices(methods, cum_weights=method_weights)[0],
+                total_amount=sum(line.total_price for line in lines),
+                item_count=len(lines),
+            ))
+            lines_per_order.append(lines)
+
+        with transaction.atomic():
+            Order.objects.bulk_create(order_rows)
+            items = []
+            for order, lines in zip(order_rows, lines_per_order):
+                for line in lines:
+                    line.order = order
+                items.extend(lines)
+            OrderItem.objects.bulk_create(items)
+        counts['order_items'] += len(items)
+        if progress:
+            progress(f"{start + n} / {orders} orders")
+
+    for start in range(0, expenses, batch_size):
+        batch = [
+            Expense(
+                category=rng.choice(EXPENSE_CATEGORIES),
+                amount=Decimal(rng.randint(10000, 5000000)) / 100,
+                date=rng.choice(day_list),
+            )
+            for _ in range(min(batch_size, expenses - start))
+        ]
+        with transaction.atomic():
+            Expense.objects.bulk_create(batch)
+
+    rollups.rebuild()
+    customer_stats.rebuild()
+    ledger.reconcile(note="Opening balance")
+    counts['seconds'] = round(time.perf_counter() - started, 2)
+    return counts
+
+
+# ============================
+# ROUTES
+# ============================
+
+def _bulk_payload(fixtures):
+    return [
+        {
+            "order_date": timezone.now().isoformat(),
+            "payment_method": "UPI",
+            "items": [{"product": fixtures['product'], "quantity": 1}],
+        }
+        for _ in range(5)
+    ]
+
+
+# Time series default to the year ending today; end them on SEED_END instead.
+SERIES_END = {"end": SEED_END.isoformat()}
+
+# (label, method, url name, url args from fixtures, query params or body)
+ROUTES = [
+    ('api-root', 'get', 'api-root', None, {}),
+    ('product-list', 'get', 'product-list', None, {}),
+    ('product-detail', 'get', 'product-detail', 'product', {}),
+    ('product-stock', 'get', 'product-stock', 'product', {}),
+    ('product-restock', 'post', 'product-stock', 'product', {"quantity": 1, "kind": "RESTOCK"}),
+    ('customer-list', 'get', 'customer-list', None, {}),
+    ('customer-detail', 'get', 'customer-detail', 'customer', {}),
+    ('order-list', 'get', 'order-list', None, {}),
+    ('order-list-unpaginated', 'get', 'order-list', None, {"paginate": "false"}),
+    ('order-detail', 'get', 'order-detail', 'order', {}),
+    ('order-create', 'post', 'order-list', None,
+     lambda f: {"order_date": timezone.now().isoformat(),
+                "items": [{"product": f['product'], "quantity": 1}]}),
+    ('order-bulk', 'post', 'order-bulk', None, _bulk_payload),
+    ('expense-list', 'get', 'expense-list', None, {}),
+    ('expense-detail', 'get', 'expense-detail', 'expense', {}),
+    ('sales-summary', 'get', 'sales-summary', None, {}),
+    ('monthly-sales', 'get', 'monthly-sales', None, SERIES_END),
+    ('daily-sales', 'get', 'monthly-sales', None, {"granularity": "day", **SERIES_END}),
+    ('top-products', 'get', 'top-products', None, {"limit": 10}),
+    ('expenses-summary', 'get', 'expenses-summary', None, {}),
+    ('profit-products', 'get', 'profit-products', None, {"order_by": "margin"}),
+    ('profit-categories', 'get', 'profit-categories', None, {}),
+    ('profit-periods', 'get', 'profit-periods', None, SERIES_END),
+    ('profit-loss', 'get', 'profit-loss', None, SERIES_END),
+    ('profit-loss-weekly', 'get', 'profit-loss', None, {"granularity": "week", **SERIES_END}),
+    ('top-customers', 'get', 'top-customers', None, {"limit": 20}),
+    ('top-customers-recent', 'get', 'top-customers', None, {"order_by": "recent", "limit": 20}),
+    ('customer-rfm', 'get', 'customer-rfm', None, {"segment": "at_risk"}),
+    ('customers-by-city', 'get', 'customers-by-city', None, {}),
+    ('customers-in-city', 'get', 'customers-by-city', None, {"city": "Surat"}),
+    ('dashboard', 'get', 'dashboard', None,
+     {"panels": "summary,monthly_sales,top_products,expenses,low_stock", **SERIES_END}),
+    ('analytics-cache-stats', 'get', 'analytics-cache-stats', None, {}),
+    ('metrics', 'get', 'metrics', None, {}),
+    ('profile-list', 'get', 'profile-list', None, {}),
+    ('profile-detail', 'get', 'profile-detail', 'profile', {"file": "summary"}),
+    ('export-orders', 'get', 'export', 'export:orders', {"output": "ndjson"}),
+    ('export-order-items', 'get', 'export', 'export:order-items', {}),
+    ('export-expenses', 'get', 'export', 'export:expenses', {}),
+]
+
+
+def route_names(patterns=None, namespace=''):
+    """All named URL patterns reachable from core.urls."""
+    if patterns is None:
+        from . import urls
+        patterns = urls.urlpatterns
+    names = set()
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            names |= route_names(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            names.add(pattern.name)
+    return names
+
+
+def uncovered_routes():
+    return sorted(route_names() - {name for _, _, name, _, _ in ROUTES})
+
+
+def _fixtures():
+    return {
+        # Writes buy this product; pick one that cannot run out.
+        'product': Product.objects.order_by('-stock', 'pk').values_list('pk', flat=True).first(),
+        'customer': Customer.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'order': Order.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'expense': Expense.objects.order_by('pk').values_list('pk', flat=True).first(),
+        'profile': next(iter(profiling.list_ids()), None),
+    }
+
+
+def _request(client, method, url, payload):
+    if method == 'get':
+        response = client.get(url, payload)
+    else:
+        response = client.post(url, payload, format='json')
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+class _QueryCounter:
+    """execute_wrapper that counts queries, independent of DEBUG and queries_log."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_routes(repeat=10, only=None, warm_cache=False):
+    """
+    Time every route in ROUTES against the current database.
+    Analytics caches are cleared before each request unless `warm_cache`.
+    Queries are counted on the request thread only, so dashboard panels
+    computed on worker threads are not included.
+    Returns {label: {"status", "p50_ms", "p95_ms", "mean_ms", "queries", "peak_kib"}}.
+    """
+    user, _ = get_user_model().objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True},
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    fixtures = _fixtures()
+
+    results = {}
+    for label, method, name, args, payload in ROUTES:
+        if only and label not in only:
+            continue
+        if args and args.startswith('export:'):
+            url = reverse(name, args=[args.split(':', 1)[1]])
+        elif args:
+            if fixtures[args] is None:
+                continue
+            url = reverse(name, args=[fixtures[args]])
+        else:
+            url = reverse(name)
+        data = payload(fixtures) if callable(payload) else payload
+
+        if not warm_cache:
+            cache.clear()
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = _request(client, method, url, data)
+
+        timings = []
+        for _ in range(repeat):
+            if not warm_cache:
+                cache.clear()
+            started = time.perf_counter()
+            _request(client, method, url, data)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        if not warm_cache:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            _request(client, method, url, data)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        results[label] = {
+            'status': response.status_code,
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(_percentile(timings, 0.95), 2),
+            'mean_ms': round(statistics.fmean(timings), 2),
+            'queries': counter.count,
+            'peak_kib': round(peak / 1024, 1),
+        }
+    return results
+
+
+def concurrent_writes(threads=8, orders_per_thread=50):
+    """
+    POST orders from `threads` threads at once, each with its own DB
+    connection. Lock errors (DEFERRED transactions only, see
+    config.sqlite3) are retried and counted. Needs a file-based
+    database that the other threads can see (not a TestCase transaction).
+    Returns {"threads", "orders", "seconds", "orders_per_sec", "lock_retries"}.
+    """
+    user, _ = get_user_model().objects.get_or_create(
+        username='benchmark', defaults={'is_staff': True},
+    )
+    product = _fixtures()['product']
+    created, retries = [], []
+
+    def writer():
+        client = APIClient()
+        client.force_authenticate(user)
+        done = lock_errors = 0
+        try:
+            while done < orders_per_thread:
+                try:
+                    response = client.post(reverse('order-list'), {
+                        "order_date": timezone.now().isoformat(),
+                        "items": [{"product": product, "quantity": 1}],
+                    }, format='json')
+                except OperationalError:
+                    lock_errors += 1
+                    continue
+                if response.status_code == 201:
+                    done += 1
+        finally:
+            connection.close()
+            created.append(done)
+            retries.append(lock_errors)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - started
+
+    return {
+        'threads': threads,
+        'orders': sum(created),
+        'seconds': round(seconds, 2),
+        'orders_per_sec': round(sum(created) / seconds, 1),
+        'lock_retries': sum(retries),
+    }
+
+
+def _measure(fn, repeat):
+    """Mean and p95 time of `fn()` over `repeat` runs, and its peak traced memory."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'mean_ms': round(statistics.mean(samples), 2),
+        'p95_ms': round(_percentile(samples, 0.95), 2),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def render_orders(orders=2000, repeat=10):
+    """
+    Build the order list of the newest `orders` orders with
+    OrderReadSerializer and with OrderReader (queries included), render it
+    with JSONRenderer and FastJSONRenderer, and parse the result back with
+    JSONParser and FastJSONParser.
+    Returns {"orders", "bytes", "identical", "read": {...}, "render": {...},
+    "parse": {...}} with mean/p95 ms and peak memory per implementation.
+    """
+    queryset = Order.objects.order_by('-order_date', '-id')
+    serialized = (
+        queryset.select_related('customer')
+        .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product')))
+    )
+    reader = OrderReader()
+
+    def serialize():
+        return OrderReadSerializer(serialized[:orders], many=True).data
+
+    def read():
+        return reader.read(list(reader.values(queryset[:orders])))
+
+    data = serialize()
+    stock, fast = JSONRenderer().render(data), FastJSONRenderer().render(read())
+
+    renderers = {'drf': JSONRenderer(), 'fast': FastJSONRenderer()}
+    parsers = {'drf': JSONParser(), 'fast': FastJSONParser()}
+    return {
+        'orders': len(data),
+        'bytes': len(stock),
+        'identical': stock == fast,
+        'read': {'drf': _measure(serialize, repeat), 'fast': _measure(read, repeat)},
+        'render': {
+            name: _measure(lambda renderer=renderer: renderer.render(data), repeat)
+            for name, renderer in renderers.items()
+        },
+        'parse': {
+            name: _measure(lambda parser=parser: parser.parse(io.BytesIO(stock)), repeat)
+            for name, parser in parsers.items()
+        },
+    }
+
+
+def compare(results, baseline, tolerance=0.25, floor_ms=2.0):
+    """
+    Regressions of `results` against `baseline` (both {size: {label: stats}}).
+    A route regresses when its p95 grows by more than `tolerance` (and by at
+    least `floor_ms`) or when it issues more queries.
+    """
+    regressions = []
+    for size, routes in results.items():
+        for label, current in routes.items():
+            before = baseline.get(size, {}).get(label)
+            if before is None:
+                continue
+            if (current['p95_ms'] > before['p95_ms'] * (1 + tolerance)
+                    and current['p95_ms'] - before['p95_ms'] >= floor_ms):
+                regressions.append(
+                    f"{size}/{label}: p95 {before['p95_ms']} -> {current['p95_ms']} ms"
+                )
+            if current['queries'] > before['queries']:
+                regressions.append(
+                    f"{size}/{label}: queries {before['queries']} -> {current['queries']}"
+                )
+    return regressions
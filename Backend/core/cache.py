@@ -0,0 +1,184 @@
+"""
+Response cache for the analytics endpoints.
+
+Cached payloads are keyed by endpoint, query parameters, the local date
+and a global data version. Any write to the models the dashboards read
+bumps the version (see core.signals), so stale entries are simply never
+looked up again. The key also yields a strong ETag: a client sending it
+back in If-None-Match gets a 304 before any aggregation runs. Endpoints
+whose body carries per-request data next to the cached payload (the
+dashboard's "meta") get a weak ETag instead, since two such bodies are
+only semantically equivalent.
+
+The version lives in the cache too, so a bump is only seen by workers
+that share the backend (FileBasedCache via CACHE_LOCATION, Redis,
+Memcached). With LocMemCache each process has its own version; entries
+and the version both expire after ANALYTICS_CACHE_TIMEOUT, which bounds
+how long another worker can serve stale data or 304s. The async views
+(core.async_views) build the same keys through cached_data(), so WSGI and
+ASGI workers on a shared backend hit each other's entries.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .analytics import local_today
+
+VERSION_KEY = 'analytics:data-version'
+STATS_KEYS = {
+    'hits': 'analytics:stats:hits',
+    'misses': 'analytics:stats:misses',
+    'not_modified': 'analytics:stats:not-modified',
+}
+
+
+def _timeout():
+    return getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def data_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so versions are not reused after a cache flush
+        # or expiry.
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=_timeout())
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def adata_version():
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, int(time.time() * 1000), timeout=_timeout())
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def _bump():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        data_version()
+
+
+def invalidate():
+    """
+    Mark cached analytics as stale. Bumps now, for reads later in the same
+    transaction, and again on commit, so a response computed by a
+    concurrent request before the commit is not served afterwards.
+    """
+    _bump()
+    transaction.on_commit(_bump)
+
+
+def _count(name):
+    key = STATS_KEYS[name]
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+async def _acount(name):
+    key = STATS_KEYS[name]
+    await cache.aadd(key, 0, timeout=None)
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        pass
+
+
+def stats():
+    counters = cache.get_many(STATS_KEYS.values())
+    result = {name: counters.get(key, 0) for name, key in STATS_KEYS.items()}
+    result['data_version'] = data_version()
+    return result
+
+
+def _cache_key(endpoint, query_params, version):
+    params = sorted(
+        (name, value)
+        for name in query_params
+        for value in query_params.getlist(name)
+    )
+    raw = f"{endpoint}|{version}|{local_today().isoformat()}|{params!r}"
+    return f"analytics:{endpoint}:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def _etag(key, weak=False):
+    tag = f'"{key.rsplit(":", 1)[-1]}"'
+    return f'W/{tag}' if weak else tag
+
+
+def _opaque(tag):
+    return tag[2:] if tag.startswith('W/') else tag
+
+
+def _etag_matches(request, etag):
+    # If-None-Match uses the weak comparison (RFC 9110 13.1.2).
+    header = request.headers.get('If-None-Match', '')
+    return header.strip() == '*' or _opaque(etag) in [
+        _opaque(tag.strip()) for tag in header.split(',')
+    ]
+
+
+def cached_response(endpoint, weak=False):
+    """
+    Decorator for an APIView.get that returns cacheable JSON data.
+    Only 200 responses are stored. weak=True sends a weak ETag.
+    """
+    def decorator(get):
+        @wraps(get)
+        def wrapper(self, request, *args, **kwargs):
+            key = _cache_key(endpoint, request.query_params, data_version())
+            etag = _etag(key, weak)
+
+            if _etag_matches(request, etag):
+                _count('not_modified')
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                data = cache.get(key)
+                if data is None:
+                    _count('misses')
+                    response = get(self, request, *args, **kwargs)
+                    if response.status_code != status.HTTP_200_OK:
+                        return response
+                    cache.set(key, response.data, timeout=_timeout())
+                else:
+                    _count('hits')
+                    response = Response(data)
+
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+async def cached_data(endpoint, request, compute, weak=False):
+    """
+    Async counterpart of cached_response for a plain Django request.
+    Returns (data, etag); data is None when the client's ETag matched
+    and a 304 should be sent. `compute` is an async callable.
+    """
+    key = _cache_key(endpoint, request.GET, await adata_version())
+    etag = _etag(key, weak)
+    if _etag_matches(request, etag):
+        await _acount('not_modified')
+        return None, etag
+
+    data = await cache.aget(key)
+    if data is None:
+        await _acount('misses')
+        data = await compute()
+        await cache.aset(key, data, timeout=_timeout())
+    else:
+        await _acount('hits')
+    return data, etag
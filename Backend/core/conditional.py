@@ -0,0 +1,206 @@
+"""
+Conditional requests for the CRUD viewsets.
+
+Validators are derived from `updated_at`, which every model inherits from
+TimeStampedModel:
+  - list:   max(updated_at) and row count of the filtered queryset, plus
+            the query string; ETag only
+  - detail: the row's updated_at; ETag and Last-Modified
+Views whose representation embeds other models name the relations in
+`conditional_dependencies` (e.g. 'items__product'). The latest updated_at
+and number of the rows they reference from the page or row being served
+are folded in too, in one query. The count catches deletes:
+on_delete=SET_NULL is an UPDATE that leaves the referencing rows'
+updated_at alone.
+
+Lists carry no Last-Modified: deleting a row leaves max(updated_at) where
+it was, so If-Modified-Since alone would get a stale 304. Their ETag has
+the count.
+
+If-None-Match / If-Modified-Since are answered with 304 before any
+serializer runs; If-Match / If-Unmodified-Since on writes return 412 when
+the row changed since the client read it.
+
+The async list views (core.async_views) build the same ETag with
+list_etag() and answer If-None-Match with not_modified().
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+
+class ConditionalViewSetMixin:
+    conditional_dependencies = ()
+
+    # ============================
+    # VALIDATORS
+    # ============================
+
+    def list_validators(self, queryset):
+        """(etag, None) of the list page being requested."""
+        totals = queryset.order_by().aggregate(last=Max('updated_at'), count=Count('pk'))
+        dependencies = {}
+        if self.conditional_dependencies:
+            page = None
+            if self.paginator is not None:
+                page = self.paginator.page_queryset(queryset, self.request, self, look_ahead=False)
+            dependencies = shown_rows(queryset, page).aggregate(
+                **dependency_aggregates(self.conditional_dependencies)
+            )
+        return list_etag(
+            totals, self.request.get_full_path(), self.conditional_dependencies,
+            dependencies, self.request.accepted_renderer.format,
+        ), None
+
+    def detail_validators(self):
+        """(etag, last_modified) of the requested row, or None if it does not exist."""
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        lookup = {self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        totals = (
+            self.filter_queryset(self.get_queryset())
+            .filter(**lookup)
+            .order_by()
+            .aggregate(last=Max('updated_at'), **dependency_aggregates(self.conditional_dependencies))
+        )
+        if totals['last'] is None:
+            return None
+        parts, stamps = dependency_validators(self.conditional_dependencies, totals)
+        return make_validators(
+            ['detail', self.kwargs[lookup_url_kwarg], *parts],
+            [totals['last'], *stamps],
+            self.request.accepted_renderer.format,
+        )
+
+    # ============================
+    # PRECONDITIONS
+    # ============================
+
+    def _not_modified(self, etag, last_modified):
+        return not_modified(self.request, etag, last_modified)
+
+    def _precondition_failed(self, etag, last_modified):
+        if_match = self.request.headers.get('If-Match')
+        if if_match:
+            return not _etag_in(etag, if_match)
+        if_unmodified_since = parse_http_date_safe(self.request.headers.get('If-Unmodified-Since', ''))
+        if if_unmodified_since and last_modified:
+            return int(last_modified.timestamp()) > if_unmodified_since
+        return False
+
+    def _with_validators(self, response, etag, last_modified):
+        return with_validators(response, etag, last_modified)
+
+    # ============================
+    # ACTIONS
+    # ============================
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.list_validators(self.filter_queryset(self.get_queryset()))
+        if self._not_modified(etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        return self._with_validators(response, etag, last_modified)
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.detail_validators()
+        if validators is None:
+            return super().retrieve(request, *args, **kwargs)  # 404
+        if self._not_modified(*validators):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().retrieve(request, *args, **kwargs)
+        return self._with_validators(response, *validators)
+
+    def _guarded(self, write, request, *args, **kwargs):
+        validators = self.detail_validators()
+        if validators is not None and self._precondition_failed(*validators):
+            return Response(
+                {'detail': 'The resource has changed since it was retrieved.'},
+                status=status.HTTP_412_PRECONDITION_FAILED,
+            )
+        return write(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self._guarded(super().update, request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        return self._guarded(super().destroy, request, *args, **kwargs)
+
+
+def dependency_aggregates(paths):
+    """Per relation path: the latest updated_at and number of rows referenced."""
+    aggregates = {}
+    for index, path in enumerate(paths):
+        aggregates[f'dependency_{index}_last'] = Max(f'{path}__updated_at')
+        aggregates[f'dependency_{index}_count'] = Count(path, distinct=True)
+    return aggregates
+
+
+def dependency_validators(paths, totals):
+    """(parts, stamps) from the result of dependency_aggregates()."""
+    return (
+        [totals[f'dependency_{index}_count'] for index in range(len(paths))],
+        [totals[f'dependency_{index}_last'] for index in range(len(paths))],
+    )
+
+
+def shown_rows(queryset, page):
+    """
+    The rows a list response shows, for dependency_aggregates(): those of
+    `page` (KeysetPagination.page_queryset without the look-ahead row), or
+    the whole queryset when unpaginated.
+    """
+    if page is None:
+        return queryset.order_by()
+    return queryset.model._default_manager.filter(pk__in=page.values('pk'))
+
+
+def list_etag(totals, full_path, paths, dependencies, renderer_format):
+    """ETag of a list from its totals and, if `paths`, its dependency_aggregates()."""
+    parts, stamps = dependency_validators(paths, dependencies) if paths else ([], [])
+    etag, _ = make_validators(
+        ['list', totals['count'], full_path, *parts],
+        [totals['last'], *stamps],
+        renderer_format,
+    )
+    return etag
+
+
+def make_validators(parts, stamps, renderer_format):
+    """(etag, last_modified) from identifying parts and updated_at stamps."""
+    last_modified = max((s for s in stamps if s is not None), default=None)
+    raw = "|".join(
+        [str(p) for p in parts]
+        + [s.isoformat() if s else "-" for s in stamps]
+        + [renderer_format or ""]
+    )
+    etag = f'"{hashlib.sha1(raw.encode()).hexdigest()}"'
+    return etag, last_modified
+
+
+def not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        return _etag_in(etag, if_none_match)
+    if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    if if_modified_since and last_modified:
+        return int(last_modified.timestamp()) <= if_modified_since
+    return False
+
+
+def with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _etag_in(etag, header):
+    if header.strip() == '*':
+        return True
+    return etag in [tag.strip() for tag in header.split(',')]
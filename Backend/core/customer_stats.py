@@ -0,0 +1,183 @@
+"""
+Per-customer order aggregates.
+
+CustomerStats holds order count, lifetime revenue and first/last order
+date per customer, so rankings and segments (core.analytics) never scan
+orders. Every customer has a row, created with the customer (see
+core.signals), kept in step with writes by:
+  - record_orders():     deltas for newly created orders, in the same
+                         transaction (OrderWriteSerializer and core.ingest)
+  - refresh_customers(): recompute some customers after order edits and
+                         deletes
+  - rebuild():           recompute everything (manage.py rebuild_customer_stats),
+                         e.g. after bulk-loading historical orders
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Min, Sum
+
+from . import cache
+from .models import Customer, CustomerStats, Order
+
+CENT = Decimal("0.01")
+AGGREGATES = ('order_count', 'revenue', 'first_order_at', 'last_order_at')
+
+
+# ============================
+# INCREMENTAL UPDATES
+# ============================
+
+def sync_customer(customer, created):
+    """Create the stats row of a new customer, or copy an edited city."""
+    if created:
+        CustomerStats.objects.create(customer=customer, city=customer.city)
+    else:
+        CustomerStats.objects.filter(customer=customer).exclude(city=customer.city).update(city=customer.city)
+
+
+def _apply(deltas):
+    """
+    Fold {customer pk: totals of new orders} into the stats rows: one
+    SELECT, one bulk UPDATE and, for customers without a row, one INSERT.
+    """
+    existing = CustomerStats.objects.select_for_update().in_bulk(deltas)
+    changed = []
+    for pk, delta in deltas.items():
+        stats = existing.get(pk)
+        if stats is None:
+            continue
+        stats.order_count += delta['order_count']
+        stats.revenue += delta['revenue']
+        stats.first_order_at = min(filter(None, (stats.first_order_at, delta['first_order_at'])))
+        stats.last_order_at = max(filter(None, (stats.last_order_at, delta['last_order_at'])))
+        changed.append(stats)
+    if changed:
+        CustomerStats.objects.bulk_update(changed, AGGREGATES, batch_size=500)
+
+    missing = {pk: delta for pk, delta in deltas.items() if pk not in existing}
+    if not missing:
+        return
+    cities = dict(Customer.objects.filter(pk__in=missing).values_list('pk', 'city'))
+    try:
+        with transaction.atomic():
+            CustomerStats.objects.bulk_create([
+                CustomerStats(customer_id=pk, city=cities.get(pk, ''), **delta)
+                for pk, delta in missing.items()
+            ], batch_size=500)
+    except IntegrityError:
+        # Another writer created some of the rows first.
+        _apply(missing)
+
+
+def record_orders(orders):
+    """
+    Add newly created orders (with total_amount set) to their customers'
+    stats. Call inside the transaction that creates the orders.
+    """
+    deltas = {}
+    for order in orders:
+        if order.customer_id is None:
+            continue
+        delta = deltas.setdefault(order.customer_id, {
+            'order_count': 0,
+            'revenue': Decimal(0),
+            'first_order_at': order.order_date,
+            'last_order_at': order.order_date,
+        })
+        delta['order_count'] += 1
+        delta['revenue'] += order.total_amount
+        delta['first_order_at'] = min(delta['first_order_at'], order.order_date)
+        delta['last_order_at'] = max(delta['last_order_at'], order.order_date)
+    if deltas:
+        _apply(deltas)
+
+
+# ============================
+# RECOMPUTATION
+# ============================
+
+def _compute(customer_ids=None):
+    """
+    Build (unsaved) stats rows from raw orders for every customer, or for
+    `customer_ids`. Two queries: the customers and their grouped orders.
+    """
+    customers = Customer.objects.all()
+    orders = Order.objects.filter(customer__isnull=False)
+    if customer_ids is not None:
+        customers = customers.filter(pk__in=customer_ids)
+        orders = orders.filter(customer__in=customer_ids)
+
+    totals = {
+        row.pop('customer'): row
+        for row in orders.values('customer').annotate(
+            order_count=Count('id'),
+            revenue=Sum('total_amount'),
+            first_order_at=Min('order_date'),
+            last_order_at=Max('order_date'),
+        ).order_by()
+    }
+    return [
+        CustomerStats(customer_id=pk, city=city, **totals.get(pk, {}))
+        for pk, city in customers.values_list('pk', 'city').iterator()
+    ]
+
+
+def _lock_customers(customer_ids):
+    """
+    Lock the customers' stats rows, as _apply() does. Until commit, their
+    new orders wait in record_orders(), and the ones that got there first
+    have committed, so _compute() sees all of them.
+    """
+    list(
+        CustomerStats.objects.select_for_update()
+        .filter(customer__in=customer_ids).order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def refresh_customers(customer_ids):
+    """Recompute the stats of the given customers (None entries are ignored)."""
+    customer_ids = {pk for pk in customer_ids if pk is not None}
+    if not customer_ids:
+        return
+    with transaction.atomic():
+        _lock_customers(customer_ids)
+        rows = _compute(customer_ids)
+        CustomerStats.objects.filter(customer__in=customer_ids).delete()
+        CustomerStats.objects.bulk_create(rows)
+
+
+def rebuild(batch_size=1000):
+    """Replace every stats row with values recomputed from raw orders."""
+    rows = _compute()
+    with transaction.atomic():
+        CustomerStats.objects.all().delete()
+        CustomerStats.objects.bulk_create(rows, batch_size=batch_size)
+        cache.invalidate()
+    return len(rows)
+
+
+def verify():
+    """
+    Compare stored stats with values recomputed from raw orders.
+    Returns a list of human-readable differences (empty when in sync).
+    """
+    def snapshot(rows):
+        return {
+            row.customer_id: (
+                row.city,
+                row.order_count or 0,
+                Decimal(row.revenue or 0).quantize(CENT),
+                row.first_order_at,
+                row.last_order_at,
+            )
+            for row in rows
+        }
+
+    want = snapshot(_compute())
+    have = snapshot(CustomerStats.objects.all())
+    return [
+        f"customer {pk}: stored {have.get(pk)} expected {want.get(pk)}"
+        for pk in sorted(set(want) | set(have))
+        if want.get(pk) != have.get(pk)
+    ]
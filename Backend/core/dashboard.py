@@ -0,0 +1,179 @@
+"""
+Composite dashboard: every panel of DashboardPage in one response.
+
+The request's ?start= / ?end= window is turned into one set of filtered
+base querysets (daily rollups and expenses) that all panels share. Panels
+are independent, so they run concurrently on a small module-level thread
+pool. Pool threads outlive requests, so each task recycles its thread's
+DB connection the way Django does around a request (close_old_connections:
+kept for CONN_MAX_AGE, dropped when expired or broken). Inside a
+transaction (tests, admin actions) the panels run inline instead, since
+other threads could not see uncommitted rows.
+
+abuild_dashboard() is the entry point for the async view: it hands
+build_dashboard() to the request's sync thread, which fans the panels out
+to the same pool. (Awaiting async ORM panels instead would run them one
+after another, since Django 4.2 sends a request's queries to one thread.)
+
+Panels:
+  summary        headline totals (all-time / today / this month)
+  monthly_sales  sales series, see analytics.parse_series_params
+  top_products   top ?limit= products by quantity in the window
+  expenses       expenses by category in the window
+  low_stock      products at or below their low-stock threshold
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from rest_framework.exceptions import ValidationError
+
+from .analytics import (
+    expenses_between,
+    expenses_by_category,
+    low_stock_products,
+    parse_date_param,
+    parse_limit,
+    parse_series_params,
+    sales_series,
+    sales_summary,
+    top_products,
+)
+from .models import DailyPaymentSales, DailyProductSales
+
+DEFAULT_PANELS = ('summary', 'monthly_sales', 'top_products')
+
+_executor = None
+
+
+def _max_workers():
+    return getattr(settings, 'DASHBOARD_MAX_WORKERS', 4)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_max_workers(), thread_name_prefix='dashboard'
+        )
+    return _executor
+
+
+class BaseData:
+    """Querysets filtered once by the request window and shared by panels."""
+
+    def __init__(self, params):
+        self.params = params
+        self.start = parse_date_param(params, "start")
+        self.end = parse_date_param(params, "end")
+        if self.start and self.end and self.start > self.end:
+            raise ValidationError({"start": "Must not be after end."})
+        self.limit = parse_limit(params)
+        self.series = parse_series_params(params)
+
+        self.product_sales = self._window(DailyProductSales.objects.all(), 'day')
+        self.payment_sales = self._window(DailyPaymentSales.objects.all(), 'day')
+        self.expenses = expenses_between(self.start, self.end)
+
+    def _window(self, qs, field):
+        if self.start:
+            qs = qs.filter(**{f'{field}__gte': self.start})
+        if self.end:
+            qs = qs.filter(**{f'{field}__lte': self.end})
+        return qs
+
+
+# panel name -> function(BaseData) returning JSON-ready data
+PANELS = {
+    'summary': lambda base: sales_summary(),
+    'monthly_sales': lambda base: sales_series(*base.series, payment_sales=base.payment_sales),
+    'top_products': lambda base: top_products(base.limit, product_sales=base.product_sales),
+    'expenses': lambda base: expenses_by_category(base.expenses),
+    'low_stock': lambda base: low_stock_products(),
+}
+
+
+def parse_panels(params):
+    """Read ?panels=a,b,c; defaults to DEFAULT_PANELS."""
+    raw = params.get("panels")
+    if not raw:
+        return list(DEFAULT_PANELS)
+    names = []
+    for name in raw.split(","):
+        name = name.strip()
+        if name and name not in names:
+            names.append(name)
+    unknown = [name for name in names if name not in PANELS]
+    if unknown or not names:
+        raise ValidationError(
+            {"panels": f"Must be a comma-separated list of: {', '.join(PANELS)}."}
+        )
+    return names
+
+
+def _timed(name, base, in_worker):
+    if in_worker:
+        close_old_connections()
+    started = time.perf_counter()
+    try:
+        return PANELS[name](base), (time.perf_counter() - started) * 1000
+    finally:
+        if in_worker:
+            close_old_connections()
+
+
+def build_dashboard(params):
+    """
+    Returns {"<panel>": data, ..., "meta": {"panels": [...],
+    "timings_ms": {"<panel>": float}, "total_ms": float, "concurrent": bool,
+    "cached": false}}.
+    """
+    started = time.perf_counter()
+    names = parse_panels(params)
+    base = BaseData(params)
+
+    concurrent = (
+        len(names) > 1
+        and _max_workers() > 1
+        and not connection.in_atomic_block
+    )
+    if concurrent:
+        futures = {
+            name: _get_executor().submit(_timed, name, base, True)
+            for name in names
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {name: _timed(name, base, False) for name in names}
+
+    return _with_meta(names, results, started, concurrent)
+
+
+async def abuild_dashboard(params):
+    """build_dashboard() for async views; the event loop stays free meanwhile."""
+    return await sync_to_async(build_dashboard)(params)
+
+
+def _with_meta(names, results, started, concurrent):
+    data = {name: value for name, (value, _) in results.items()}
+    data["meta"] = {
+        "panels": names,
+        "timings_ms": {name: round(ms, 2) for name, (_, ms) in results.items()},
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "concurrent": concurrent,
+        "cached": False,
+    }
+    return data
+
+
+def cached_meta(params, started):
+    """The "meta" of a response served from the analytics cache: no panel ran."""
+    return {
+        "panels": parse_panels(params),
+        "timings_ms": {},
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "concurrent": False,
+        "cached": True,
+    }
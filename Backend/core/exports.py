@@ -0,0 +1,146 @@
+"""
+Streaming exports of orders, order items and expenses.
+
+Rows are read with `values_list(...).iterator()` in chunks and encoded
+one line at a time, so memory stays flat however large the table is.
+Used by ExportView, the async export view served under ASGI
+(aiter_export) and `manage.py export_data`.
+"""
+import csv
+import json
+from datetime import date, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import NotFound, ValidationError
+
+from .analytics import LINE_TOTAL, parse_date_param, start_of_day
+from .models import Order, OrderItem, Expense
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _orders(start, end):
+    qs = Order.objects.all()
+    if start:
+        qs = qs.filter(order_date__gte=start_of_day(start))
+    if end:
+        qs = qs.filter(order_date__lt=start_of_day(end + timedelta(days=1)))
+    return qs.order_by('order_date', 'id').values_list(
+        'id', 'order_date', 'customer_id', 'customer__name',
+        'payment_method', 'item_count', 'total_amount', 'created_at',
+    )
+
+
+def _order_items(start, end):
+    qs = OrderItem.objects.all()
+    if start or end:
+        # Always bound both ends: with only one, SQLite scans every item in
+        # order_id order rather than searching order_date_idx for the window.
+        # A day of slack keeps the open ends clear of the datetime limits.
+        start = start or date.min + timedelta(days=1)
+        end = end or date.max - timedelta(days=2)
+        qs = qs.filter(
+            order__order_date__gte=start_of_day(start),
+            order__order_date__lt=start_of_day(end + timedelta(days=1)),
+        )
+    return qs.order_by('order__order_date', 'order_id', 'id').values_list(
+        'id', 'order_id', 'order__order_date', 'product_id', 'product__sku',
+        'product__name', 'quantity', 'price_at_sale',
+        LINE_TOTAL,
+    )
+
+
+def _expenses(start, end):
+    qs = Expense.objects.all()
+    if start:
+        qs = qs.filter(date__gte=start)
+    if end:
+        qs = qs.filter(date__lte=end)
+    return qs.order_by('date', 'id').values_list(
+        'id', 'date', 'category', 'amount', 'note',
+    )
+
+
+# dataset name -> (column headers, queryset builder)
+DATASETS = {
+    'orders': (
+        ['id', 'order_date', 'customer_id', 'customer_name',
+         'payment_method', 'item_count', 'total_amount', 'created_at'],
+        _orders,
+    ),
+    'order-items': (
+        ['id', 'order_id', 'order_date', 'product_id', 'product_sku',
+         'product_name', 'quantity', 'price_at_sale', 'total_price'],
+        _order_items,
+    ),
+    'expenses': (
+        ['id', 'date', 'category', 'amount', 'note'],
+        _expenses,
+    ),
+}
+
+
+def parse_export_params(dataset, params):
+    """Validate the dataset and ?output=, ?start=, ?end=; returns (output, start, end)."""
+    if dataset not in DATASETS:
+        raise NotFound(f"Unknown dataset '{dataset}'.")
+    output = params.get("output", "csv")
+    if output not in FORMATS:
+        raise ValidationError({"output": f"Must be one of: {', '.join(FORMATS)}."})
+    return output, parse_date_param(params, "start"), parse_date_param(params, "end")
+
+
+class _Echo:
+    """File-like object whose write() just returns the line for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _as_text(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, (int, str)):
+        return value
+    return str(value)  # Decimal
+
+
+def iter_export(dataset, output, start=None, end=None):
+    """Yield encoded lines (str) for `dataset` in `output` format."""
+    headers, build = DATASETS[dataset]
+    rows = build(start, end).iterator(chunk_size=CHUNK_SIZE)
+
+    if output == 'csv':
+        writer = csv.writer(_Echo())
+        yield writer.writerow(headers)
+        for row in rows:
+            yield writer.writerow([_as_text(value) for value in row])
+    else:
+        for row in rows:
+            record = dict(zip(headers, (_as_text(value) for value in row)))
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+
+async def aiter_export(dataset, output, start=None, end=None):
+    """
+    iter_export() for async responses. Each CHUNK_SIZE lines are produced
+    on the request's sync thread, which holds the open cursor, and sent
+    as one string. A sync iterator would be read to the end first:
+    Django 4.2 lists it on a thread before sending anything under ASGI.
+    """
+    lines = iter_export(dataset, output, start, end)
+    next_chunk = sync_to_async(lambda: "".join(islice(lines, CHUNK_SIZE)))
+    try:
+        while chunk := await next_chunk():
+            yield chunk
+    finally:
+        await sync_to_async(lines.close)()
@@ -0,0 +1,69 @@
+"""
+Sparse fieldsets and expansion for the CRUD viewsets.
+
+    ?fields=id,total_amount                   only these fields
+    ?fields=id,items.product,items.quantity   nested fields by dotted path
+    ?expand=customer,items.product            related objects instead of ids
+
+Both parameters parse to a tree {name: subtree, or None for the whole
+field}. The read serializers (SparseFieldsetMixin in core.serializers)
+drop the fields that were not asked for and swap expanded ids for the
+related serializer; core.readers builds its plan from such a serializer,
+so the serializer and reader paths return the same fields and leave out
+the same columns, joins and prefetches. Unknown names are a 400.
+"""
+
+from .serializers import SparseFieldsetMixin
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_tree(value):
+    """'id,items.quantity' -> {'id': None, 'items': {'quantity': None}}."""
+    tree = {}
+    for path in (value or '').split(','):
+        names = [name.strip() for name in path.split('.')]
+        if not all(names):
+            continue
+        node = tree
+        for name in names[:-1]:
+            if name in node and node[name] is None:
+                break  # the whole field is already requested
+            node = node.setdefault(name, {})
+        else:
+            node[names[-1]] = None
+    return tree
+
+
+def from_query(query_params):
+    """serializer kwargs for the ?fields= / ?expand= of a request."""
+    return {
+        'fields': parse_tree(query_params.get(FIELDS_PARAM)) or None,
+        'expand': parse_tree(query_params.get(EXPAND_PARAM)),
+    }
+
+
+def wants(fields, name):
+    """Whether field `name` is part of the `fields` tree (None = every field)."""
+    return fields is None or name in fields
+
+
+def subtree(tree, name):
+    """The part of `tree` below `name`; None (everything) if it is not narrowed."""
+    return (tree or {}).get(name)
+
+
+class SparseFieldsetViewMixin:
+    """Passes ?fields= / ?expand= to the serializer of GET requests."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if self.request.method in ('GET', 'HEAD') and issubclass(serializer_class, SparseFieldsetMixin):
+            kwargs.update(from_query(self.request.query_params))
+        return super().get_serializer(*args, **kwargs)
+
+    def get_selection(self):
+        """(fields, expand) trees of the current request."""
+        selection = from_query(self.request.query_params)
+        return selection['fields'], selection['expand']
@@ -0,0 +1,102 @@
+"""
+Query-string filters for the product and customer lists.
+
+Products (ProductFilter):
+    ?category=             repeatable or comma-separated
+    ?low_stock=true|false  stock <= low_stock_threshold, evaluated in SQL
+    ?min_price= ?max_price=  sell_price range, inclusive
+Products and customers (PrefixSearchFilter, on the view's search_fields):
+    ?search=               case-insensitive prefix of any search field
+                           (product name or SKU, customer name or phone)
+
+Every predicate has an index: product_category_idx, the partial
+product_low_stock_idx, product_price_idx, and the *_search_idx indexes of
+migration 0006, which match Django's istartswith on each backend
+(`col COLLATE NOCASE` on SQLite, `UPPER(col::text) text_pattern_ops` on
+PostgreSQL). A filtered page or a typeahead lookup reads only matching
+rows, however large the catalog.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def parse_bool(params, name):
+    """True, False, or None when ?name= is absent."""
+    value = params.get(name, '').strip().lower()
+    if not value:
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValidationError({name: "Must be true or false."})
+
+
+def parse_price(params, name):
+    value = params.get(name, '').strip()
+    if not value:
+        return None
+    try:
+        price = Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: "Must be a number."})
+    if not price.is_finite() or price < 0:
+        raise ValidationError({name: "Must be a number of at least 0."})
+    return price
+
+
+def parse_list(params, name):
+    """?name=a,b&name=c -> ['a', 'b', 'c']."""
+    return [
+        item.strip()
+        for value in params.getlist(name)
+        for item in value.split(',')
+        if item.strip()
+    ]
+
+
+class ProductFilter(BaseFilterBackend):
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        categories = parse_list(params, 'category')
+        if categories:
+            queryset = queryset.filter(category__in=categories)
+
+        low_stock = parse_bool(params, 'low_stock')
+        if low_stock is True:
+            queryset = queryset.filter(stock__lte=F('low_stock_threshold'))
+        elif low_stock is False:
+            queryset = queryset.filter(stock__gt=F('low_stock_threshold'))
+
+        min_price = parse_price(params, 'min_price')
+        max_price = parse_price(params, 'max_price')
+        if min_price is not None and max_price is not None and min_price > max_price:
+            raise ValidationError({'min_price': "Must not be more than max_price."})
+        if min_price is not None:
+            queryset = queryset.filter(sell_price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(sell_price__lte=max_price)
+        return queryset
+
+
+class PrefixSearchFilter(BaseFilterBackend):
+    """?search=: rows where one of the view's `search_fields` starts with the term."""
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(self.search_param, '').strip()
+        fields = getattr(view, 'search_fields', ())
+        if not term or not fields:
+            return queryset
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f'{field}__istartswith': term})
+        return queryset.filter(condition)
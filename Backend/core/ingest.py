@@ -0,0 +1,281 @@
+"""
+Bulk order ingestion for POS backfills.
+
+Orders are processed in batches. For each batch the products and customers
+are resolved with one query each, orders and items are inserted with
+bulk_create, stock is decremented with a single UPDATE and recorded in the
+stock ledger, and the rollups and customer stats are updated with bulk
+upserts (see rollups.record_orders).
+
+Rows that fail validation are reported and skipped; they never abort the
+rest of the batch. Used by OrderViewSet.bulk and `manage.py import_orders`.
+
+JSON input is a list of orders shaped like the POST /api/orders/ payload:
+    {"customer": 3, "order_date": "2025-01-10T12:00:00Z",
+     "payment_method": "UPI",
+     "items": [{"product": 1, "quantity": 2, "price_at_sale": "700.00"}]}
+Items may name the product by "sku" instead of "product".
+
+CSV input has one line per item; lines sharing an `order_ref` form one
+order. Columns: order_ref, customer, order_date, payment_method,
+product or sku, quantity, price_at_sale (optional).
+"""
+import csv
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+
+from .models import Product, Customer, Order, OrderItem
+from .serializers import OrderItemWriteSerializer
+from . import cache, customer_stats, inventory, ledger, rollups
+
+DEFAULT_BATCH_SIZE = 500
+PAYMENT_METHODS = {choice for choice, _ in Order.PAYMENT_METHOD_CHOICES}
+# Item fields are checked exactly as POST /api/orders/ checks them.
+ITEM_FIELDS = OrderItemWriteSerializer().fields
+
+
+def orders_from_csv(lines):
+    """Group CSV item lines (an iterable of str) into order dicts."""
+    orders = {}
+    for row in csv.DictReader(lines):
+        ref = row.get('order_ref') or f"line-{len(orders)}"
+        order = orders.setdefault(ref, {
+            'customer': row.get('customer') or None,
+            'order_date': row.get('order_date'),
+            'payment_method': row.get('payment_method') or 'CASH',
+            'items': [],
+        })
+        order['items'].append({
+            'product': row.get('product') or None,
+            'sku': row.get('sku') or None,
+            'quantity': row.get('quantity'),
+            'price_at_sale': row.get('price_at_sale') or None,
+        })
+    return list(orders.values())
+
+
+def _clean_item_field(name, value, problems):
+    """Validate one item value with ITEM_FIELDS; errors go into `problems`."""
+    try:
+        return ITEM_FIELDS[name].run_validation(value)
+    except serializers.ValidationError as exc:
+        problems[name] = [str(message) for message in exc.detail]
+        return None
+
+
+def _parse_order(data):
+    """Check one raw order dict; returns (cleaned, errors)."""
+    errors = {}
+    if not isinstance(data, dict):
+        return None, {'non_field_errors': ["Expected an object."]}
+
+    order_date = data.get('order_date')
+    try:
+        parsed_date = parse_datetime(order_date) if isinstance(order_date, str) else None
+    except ValueError:
+        # Well formed but impossible, e.g. month 13.
+        parsed_date = None
+    if parsed_date is None:
+        errors['order_date'] = ["Expected an ISO 8601 datetime."]
+    elif timezone.is_naive(parsed_date):
+        parsed_date = timezone.make_aware(parsed_date)
+
+    payment_method = data.get('payment_method') or 'CASH'
+    if not isinstance(payment_method, str) or payment_method not in PAYMENT_METHODS:
+        errors['payment_method'] = [f"\"{payment_method}\" is not a valid choice."]
+
+    customer = data.get('customer')
+    try:
+        customer = int(customer) if customer not in (None, '') else None
+    except (TypeError, ValueError):
+        errors['customer'] = ["Expected a customer id."]
+
+    items, item_errors = [], {}
+    raw_items = data.get('items')
+    if not isinstance(raw_items, list) or not raw_items:
+        errors['items'] = ["At least one item is required."]
+        raw_items = []
+    for index, item in enumerate(raw_items):
+        problems = {}
+        item = item if isinstance(item, dict) else {}
+        product, sku = item.get('product'), item.get('sku')
+        try:
+            product = int(product) if product not in (None, '') else None
+        except (TypeError, ValueError):
+            problems['product'] = ["Expected a product id."]
+        if sku in (None, ''):
+            sku = None
+        elif not isinstance(sku, str):
+            problems['sku'] = ["Expected a string."]
+        if product is None and not sku and not problems:
+            problems['product'] = ["Give a product id or sku."]
+        quantity = _clean_item_field('quantity', item.get('quantity'), problems)
+        price = item.get('price_at_sale')
+        if price not in (None, ''):
+            price = _clean_item_field('price_at_sale', price, problems)
+        else:
+            price = None
+        if problems:
+            item_errors[index] = problems
+        else:
+            items.append({'product': product, 'sku': sku, 'quantity': quantity, 'price_at_sale': price})
+    if item_errors:
+        errors['items'] = item_errors
+
+    if errors:
+        return None, errors
+    return {
+        'customer': customer,
+        'order_date': parsed_date,
+        'payment_method': payment_method,
+        'items': items,
+    }, None
+
+
+def _ingest_batch(batch, report):
+    """Validate and write one batch of (index, raw order) pairs."""
+    parsed = []
+    for index, data in batch:
+        cleaned, errors = _parse_order(data)
+        if errors:
+            report['errors'].append({'index': index, 'errors': errors})
+        else:
+            parsed.append((index, cleaned))
+    if not parsed:
+        return
+
+    try:
+        orders, errors = _write_batch(parsed)
+    except inventory.InsufficientStock:
+        # Stock changed between our read and the conditional UPDATE
+        # (select_for_update() locks nothing on SQLite). Nothing was
+        # written: try once more against fresh stock, so only the orders
+        # that are really short fail.
+        orders, errors = _write_batch(parsed, last_attempt=True)
+
+    report['errors'].extend(errors)
+    report['created'] += len(orders)
+    report['order_ids'].extend(order.pk for order in orders)
+
+
+def _write_batch(parsed, last_attempt=False):
+    """
+    Write the parsed orders of a batch in one transaction. Returns the
+    created orders and the errors of the rejected ones. If stock ran out
+    under it, nothing is written and InsufficientStock is raised; on the
+    last attempt the orders it had accepted are reported as short instead.
+    """
+    product_ids = {i['product'] for _, o in parsed for i in o['items'] if i['product']}
+    skus = {i['sku'] for _, o in parsed for i in o['items'] if not i['product']}
+    customer_ids = {o['customer'] for _, o in parsed if o['customer']}
+
+    rejected, accepted = [], []
+    try:
+        with transaction.atomic():
+            products = Product.objects.select_for_update().filter(
+                Q(pk__in=product_ids) | Q(sku__in=skus)
+            ).only('id', 'sku', 'sell_price', 'buy_price', 'stock')
+            by_id = {p.pk: p for p in products}
+            by_sku = {p.sku: p for p in by_id.values()}
+            known_customers = set(
+                Customer.objects.filter(pk__in=customer_ids).values_list('pk', flat=True)
+            )
+
+            taken = defaultdict(int)  # product pk -> quantity used by this batch
+            orders, items_per_order = [], []
+
+            for index, data in parsed:
+                errors = {}
+                if data['customer'] and data['customer'] not in known_customers:
+                    errors['customer'] = [f"Invalid pk \"{data['customer']}\" - object does not exist."]
+
+                lines, wanted = [], defaultdict(int)
+                for position, item in enumerate(data['items']):
+                    product = by_id.get(item['product']) if item['product'] else by_sku.get(item['sku'])
+                    if product is None:
+                        ref = item['product'] or item['sku']
+                        errors.setdefault('items', {})[position] = {
+                            'product': [f"Unknown product \"{ref}\"."]
+                        }
+                        continue
+                    wanted[product.pk] += item['quantity']
+                    lines.append(OrderItem(
+                        product=product,
+                        quantity=item['quantity'],
+                        price_at_sale=item['price_at_sale'] or product.sell_price,
+                        cost_at_sale=product.buy_price,
+                    ))
+
+                short = [
+                    by_id[pk].sku for pk, qty in wanted.items()
+                    if by_id[pk].stock - taken.get(pk, 0) < qty
+                ]
+                if short and not errors:
+                    errors['stock'] = [f"Insufficient stock for: {', '.join(sorted(short))}."]
+                if errors:
+                    rejected.append({'index': index, 'errors': errors})
+                    continue
+
+                for pk, qty in wanted.items():
+                    taken[pk] += qty
+                accepted.append(index)
+                orders.append(Order(
+                    customer_id=data['customer'],
+                    order_date=data['order_date'],
+                    payment_method=data['payment_method'],
+                    total_amount=sum(line.total_price for line in lines),
+                    item_count=len(lines),
+                ))
+                items_per_order.append(lines)
+
+            if not orders:
+                return [], rejected
+
+            Order.objects.bulk_create(orders)
+            all_items = []
+            for order, lines in zip(orders, items_per_order):
+                for line in lines:
+                    line.order = order
+                all_items.extend(lines)
+            OrderItem.objects.bulk_create(all_items)
+
+            # One UPDATE for every product touched by the batch.
+            inventory.reserve_stock(taken)
+
+            ledger.record_sales(zip(orders, items_per_order))
+            rollups.record_orders(zip(orders, items_per_order))
+            customer_stats.record_orders(orders)
+            # bulk_create and update() send no signals.
+            cache.invalidate()
+    except inventory.InsufficientStock as exc:
+        if not last_attempt:
+            raise
+        return [], rejected + [
+            {'index': index, 'errors': {'stock': [f"{exc}."]}} for index in accepted
+        ]
+    return orders, rejected
+
+
+def ingest_orders(raw_orders, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Create orders from an iterable of raw order dicts.
+    Returns {"created": int, "failed": int, "order_ids": [...], "errors": [...]}
+    where each error is {"index": <position in input>, "errors": {...}}.
+    """
+    report = {'created': 0, 'failed': 0, 'order_ids': [], 'errors': []}
+    batch = []
+    for index, data in enumerate(raw_orders):
+        batch.append((index, data))
+        if len(batch) >= batch_size:
+            _ingest_batch(batch, report)
+            batch = []
+    if batch:
+        _ingest_batch(batch, report)
+    report['errors'].sort(key=lambda error: error['index'])
+    report['failed'] = len(report['errors'])
+    return report
@@ -0,0 +1,57 @@
+"""
+Stock reservation.
+
+Stock is decremented in the database with a single conditional UPDATE,
+so concurrent checkouts can neither lose decrements nor drive stock
+below zero.
+"""
+from collections import defaultdict
+
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from .models import Product
+
+
+class InsufficientStock(Exception):
+    """Raised by reserve_stock(); `short_skus` lists the products that ran out."""
+
+    def __init__(self, short_skus):
+        self.short_skus = short_skus
+        super().__init__(f"Insufficient stock for: {', '.join(short_skus)}")
+
+
+def quantities_by_product(lines):
+    """Sum quantities per product pk from objects with product_id/quantity."""
+    totals = defaultdict(int)
+    for line in lines:
+        totals[line.product_id] += line.quantity
+    return dict(totals)
+
+
+def reserve_stock(quantities):
+    """
+    Decrement stock by {product pk: quantity} in one UPDATE that only
+    touches rows with stock >= quantity. If any product is short, raises
+    InsufficientStock; the caller's transaction.atomic() must then roll
+    back the rows that were decremented.
+    """
+    if not quantities:
+        return
+    wanted = Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        output_field=IntegerField(),
+    )
+    marker = timezone.now()
+    updated = Product.objects.filter(pk__in=quantities, stock__gte=wanted).update(
+        stock=F('stock') - wanted,
+        updated_at=marker,
+    )
+    if updated != len(quantities):
+        short = (
+            Product.objects.filter(pk__in=quantities)
+            .exclude(updated_at=marker)
+            .order_by('sku')
+            .values_list('sku', flat=True)
+        )
+        raise InsufficientStock(list(short))
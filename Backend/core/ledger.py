@@ -0,0 +1,232 @@
+"""
+Stock movement ledger.
+
+Every change to Product.stock is also appended to StockMovement, in the
+same transaction, so the sum of a product's movements is its stock:
+  - record_sales():  one SALE row per product of each new order, in bulk
+                     (OrderWriteSerializer.create and core.ingest)
+  - record_change(): a change already written to the product row
+                     (product create and edit, API and admin)
+  - adjust():        a restock or adjustment applied with a conditional
+                     UPDATE (POST /api/products/{id}/stock/)
+
+StockSnapshot rows, written by take_snapshots() (`manage.py stock_ledger`,
+e.g. nightly), bound the point-in-time lookups: stock_at() reads each
+product's latest snapshot before the moment plus the movements after it,
+never the whole history.
+
+verify() checks the ledger against Product.stock and the snapshots;
+reconcile() appends the ADJUSTMENT that closes a gap left by writes made
+around the ledger (seed scripts, raw SQL).
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .analytics import local_today, start_of_day
+from .models import Product, StockMovement, StockSnapshot
+from . import cache, inventory
+
+
+# ============================
+# RECORDING
+# ============================
+
+def record_sales(orders_with_items):
+    """
+    Append a SALE movement per product of each newly created order.
+    `orders_with_items` yields (order, items) pairs; call inside the
+    transaction that creates the orders and reserves their stock.
+    """
+    now = timezone.now()
+    movements = [
+        StockMovement(
+            product_id=product_id,
+            kind=StockMovement.SALE,
+            quantity=-quantity,
+            order=order,
+            created_at=now,
+        )
+        for order, items in orders_with_items
+        for product_id, quantity in inventory.quantities_by_product(items).items()
+    ]
+    StockMovement.objects.bulk_create(movements, batch_size=500)
+
+
+def record_change(product, quantity, kind=StockMovement.ADJUSTMENT, note=''):
+    """Append the movement of a `quantity` change already made to product.stock."""
+    if quantity:
+        StockMovement.objects.create(product=product, kind=kind, quantity=quantity, note=note)
+
+
+def locked_stock(pk):
+    """Stock of product `pk`, with the row locked until the transaction ends."""
+    return Product.objects.select_for_update().values_list('stock', flat=True).get(pk=pk)
+
+
+def adjust(product, quantity, kind=StockMovement.ADJUSTMENT, note=''):
+    """
+    Add `quantity` (negative to remove) to the stock of `product` and
+    record it. Like inventory.reserve_stock(), one conditional UPDATE, so
+    a concurrent sale is never overwritten; raises InsufficientStock if
+    stock would drop below zero. Returns the new stock.
+    """
+    with transaction.atomic():
+        updated = Product.objects.filter(pk=product.pk, stock__gte=-quantity).update(
+            stock=F('stock') + quantity,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            raise inventory.InsufficientStock([product.sku])
+        record_change(product, quantity, kind, note)
+        stock = Product.objects.values_list('stock', flat=True).get(pk=product.pk)
+        # update() sends no signals.
+        cache.invalidate()
+    return stock
+
+
+# ============================
+# POINT IN TIME
+# ============================
+
+def _sum(movements):
+    """Subquery: the total quantity of `movements` (filtered on one product)."""
+    return Subquery(
+        movements.order_by().values('product').annotate(total=Sum('quantity')).values('total')
+    )
+
+
+def with_stock_at(products, moment):
+    """
+    `products` annotated with `stock_at` (stock at `moment`) and `moved`
+    (whether it changed since the latest snapshot before `moment`). Each
+    product costs two index lookups and a scan of its movements since
+    that snapshot.
+    """
+    snapshots = (
+        StockSnapshot.objects
+        .filter(product=OuterRef('pk'), taken_at__lte=moment)
+        .order_by('-taken_at')
+    )
+    beginning = start_of_day(date(1970, 1, 1))
+    since = StockMovement.objects.filter(
+        product=OuterRef('pk'),
+        created_at__gt=Coalesce(OuterRef('snapshot_at'), Value(beginning)),
+        created_at__lte=moment,
+    )
+    return (
+        products
+        .annotate(
+            snapshot_at=Subquery(snapshots.values('taken_at')[:1]),
+            snapshot_stock=Subquery(snapshots.values('stock')[:1]),
+        )
+        .annotate(
+            stock_at=Coalesce('snapshot_stock', 0) + Coalesce(_sum(since), 0),
+            moved=Exists(since),
+        )
+    )
+
+
+def stock_at(moment, products=None):
+    """{product pk: stock at `moment`} for `products` (default: all)."""
+    if products is None:
+        products = Product.objects.all()
+    return dict(with_stock_at(products, moment).values_list('pk', 'stock_at'))
+
+
+def take_snapshots(moment=None):
+    """
+    Snapshot, as of `moment`, every product whose stock moved since its
+    latest snapshot. Defaults to the start of today: a moment far enough
+    back that no transaction still in flight can add movements before it.
+    Returns the number of snapshots written.
+    """
+    if moment is None:
+        moment = start_of_day(local_today())
+    rows = (
+        with_stock_at(Product.objects.all(), moment)
+        .filter(moved=True)
+        .values_list('pk', 'stock_at')
+    )
+    snapshots = [
+        StockSnapshot(product_id=pk, taken_at=moment, stock=stock)
+        for pk, stock in rows
+    ]
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=500, ignore_conflicts=True)
+    return len(snapshots)
+
+
+# ============================
+# CHECKS
+# ============================
+
+def _with_ledger(products):
+    ledger = _sum(StockMovement.objects.filter(product=OuterRef('pk')))
+    return products.annotate(ledger=Coalesce(ledger, 0))
+
+
+def verify():
+    """
+    Compare the ledger with Product.stock, and each product's latest
+    snapshot with the movements up to it. Returns a list of
+    human-readable differences (empty when in sync).
+    """
+    differences = [
+        f"product {sku}: stock {stock}, ledger {ledger}"
+        for sku, stock, ledger in (
+            _with_ledger(Product.objects.all())
+            .exclude(stock=F('ledger'))
+            .order_by('sku')
+            .values_list('sku', 'stock', 'ledger')
+        )
+    ]
+
+    latest = (
+        StockSnapshot.objects
+        .filter(product=OuterRef('product'))
+        .order_by('-taken_at')
+        .values('pk')[:1]
+    )
+    replayed = _sum(StockMovement.objects.filter(
+        product=OuterRef('product'), created_at__lte=OuterRef('taken_at'),
+    ))
+    snapshots = (
+        StockSnapshot.objects
+        .filter(pk=Subquery(latest))
+        .annotate(ledger=Coalesce(replayed, 0))
+        .exclude(stock=F('ledger'))
+        .order_by('product__sku')
+        .values_list('product__sku', 'taken_at', 'stock', 'ledger')
+    )
+    differences.extend(
+        f"snapshot {sku} at {taken_at.isoformat()}: stored {stock}, ledger {ledger}"
+        for sku, taken_at, stock, ledger in snapshots
+    )
+    return differences
+
+
+def reconcile(note="Reconciled with Product.stock"):
+    """
+    Append an ADJUSTMENT for every product whose stock differs from its
+    ledger. Returns the number of movements written.
+    """
+    with transaction.atomic():
+        gaps = (
+            _with_ledger(Product.objects.select_for_update())
+            .exclude(stock=F('ledger'))
+            .values_list('pk', 'stock', 'ledger')
+        )
+        movements = [
+            StockMovement(
+                product_id=pk,
+                kind=StockMovement.ADJUSTMENT,
+                quantity=stock - ledger,
+                note=note,
+            )
+            for pk, stock, ledger in gaps
+        ]
+        StockMovement.objects.bulk_create(movements, batch_size=500)
+    return len(movements)
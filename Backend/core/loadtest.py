@@ -0,0 +1,180 @@
+"""
+WSGI vs ASGI load test.
+
+Starts the project on a local port once per server, each time as a
+single worker process on the database named by the `env` DATABASE_URL:
+  wsgi  gunicorn, gthread worker, config.wsgi (concurrency = its threads)
+  asgi  uvicorn, config.asgi (one event loop, async views)
+and drives it with the same closed loop: `users` simulated dashboard users
+on keep-alive connections, each sending its next request as soon as the
+previous one is answered. Reported per server: requests/s, p50/p95
+latency, errors and the peak resident memory of the server processes, so
+throughput is compared at (about) equal memory rather than by adding
+workers.
+
+Used by `manage.py run_load_test`; needs gunicorn and uvicorn installed.
+"""
+import http.client
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from itertools import count
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+LOAD_USER = 'loadtest'
+HOST = '127.0.0.1'
+
+
+def server_command(kind, port, threads):
+    if kind == 'wsgi':
+        return [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--bind', f'{HOST}:{port}', '--workers', '1',
+            '--worker-class', 'gthread', '--threads', str(threads),
+            '--log-level', 'warning',
+        ]
+    return [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--host', HOST, '--port', str(port), '--log-level', 'warning',
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}.")
+        try:
+            socket.create_connection((HOST, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server did not listen on port {port} within {timeout}s.")
+
+
+def tree_rss_kb(pid):
+    """Resident memory of `pid` and its descendants, from /proc (Linux only)."""
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f'/proc/{current}/status') as fh:
+                for line in fh:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1])
+            with open(f'/proc/{current}/task/{current}/children') as fh:
+                pending.extend(int(child) for child in fh.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total
+
+
+def auth_header():
+    user, _ = get_user_model().objects.get_or_create(username=LOAD_USER)
+    return f"Bearer {RefreshToken.for_user(user).access_token}"
+
+
+def default_paths():
+    """What DashboardPage and the order list page request."""
+    return [
+        reverse('dashboard') + "?panels=summary,monthly_sales,top_products&limit=5",
+        reverse('sales-summary'),
+        reverse('order-list') + "?page_size=20",
+        reverse('product-list') + "?page_size=50",
+    ]
+
+
+def _user_loop(port, paths, headers, deadline, cold, counter, latencies, errors):
+    conn = http.client.HTTPConnection(HOST, port, timeout=60)
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        if cold:
+            # A distinct query string misses the analytics cache.
+            path += ('&' if '?' in path else '?') + f"_={next(counter)}"
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=60)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not ok:
+            errors.append(path)
+    conn.close()
+
+
+def drive(port, pid, users, seconds, paths, headers, cold=False):
+    latencies, errors, peak_kb = [], [], [tree_rss_kb(pid)]
+    counter = count()
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(
+            target=_user_loop,
+            args=(port, paths, headers, deadline, cold, counter, latencies, errors),
+        )
+        for _ in range(users)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    while any(thread.is_alive() for thread in threads):
+        peak_kb.append(tree_rss_kb(pid))
+        time.sleep(0.2)
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies) or [0.0]
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': round(elapsed, 2),
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(ordered), 1),
+        'p95_ms': round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+        'peak_rss_mb': round(max(peak_kb) / 1024, 1),
+    }
+
+
+def run(kind, users, seconds, threads=8, paths=None, cold=False, warmup=2, env=None):
+    """Start one server, warm it up, load it for `seconds`, stop it."""
+    paths = paths or default_paths()
+    headers = {'Authorization': auth_header()}
+    port = free_port()
+    process = subprocess.Popen(
+        server_command(kind, port, threads),
+        cwd=str(settings.BASE_DIR),
+        env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port, process)
+        drive(port, process.pid, min(users, 4), warmup, paths, headers, cold)
+        result = drive(port, process.pid, users, seconds, paths, headers, cold)
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    result.update({'server': kind, 'users': users, 'threads': threads if kind == 'wsgi' else None})
+    return result
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core import exports
+
+
+class Command(BaseCommand):
+    help = "Stream orders, order items or expenses to CSV or NDJSON in constant memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(exports.DATASETS))
+        parser.add_argument('--output', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--start', help="YYYY-MM-DD, inclusive")
+        parser.add_argument('--end', help="YYYY-MM-DD, inclusive")
+        parser.add_argument('--file', help="Write to this path instead of stdout.")
+
+    def handle(self, *args, **options):
+        start, end = self._date(options, 'start'), self._date(options, 'end')
+        lines = exports.iter_export(options['dataset'], options['output'], start, end)
+
+        if options['file']:
+            with open(options['file'], 'w', encoding='utf-8', newline='') as fh:
+                fh.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
+
+    def _date(self, options, name):
+        value = options[name]
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"--{name} must be YYYY-MM-DD.")
+        return parsed
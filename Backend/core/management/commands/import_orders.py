@@ -0,0 +1,45 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ingest
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-import orders from a JSON list, NDJSON (one order per line) or "
+        "CSV (one item per line, grouped by order_ref). See core.ingest."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=['json', 'ndjson', 'csv'],
+            help="Input format; guessed from the file extension by default.",
+        )
+        parser.add_argument('--batch-size', type=int, default=ingest.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or path.rsplit('.', 1)[-1].lower()
+        if fmt not in ('json', 'ndjson', 'csv'):
+            raise CommandError("Cannot guess the format; pass --format.")
+
+        with open(path, encoding='utf-8-sig', newline='') as fh:
+            try:
+                if fmt == 'csv':
+                    raw_orders = ingest.orders_from_csv(fh)
+                elif fmt == 'ndjson':
+                    raw_orders = (json.loads(line) for line in fh if line.strip())
+                else:
+                    raw_orders = json.load(fh)
+                report = ingest.ingest_orders(raw_orders, batch_size=options['batch_size'])
+            except UnicodeDecodeError:
+                raise CommandError(f"{path} is not UTF-8.")
+
+        for error in report['errors'][:50]:
+            self.stderr.write(f"#{error['index']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} order(s); {report['failed']} failed."
+        ))
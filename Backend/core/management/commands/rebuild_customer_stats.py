@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import customer_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-customer stats from raw orders, or verify them with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare stored stats with raw orders; exit non-zero on mismatch.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = customer_stats.verify()
+            for line in differences[:50]:
+                self.stdout.write(line)
+            if differences:
+                raise CommandError(f"{len(differences)} customer stats row(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS("Customer stats are in sync."))
+            return
+
+        count = customer_stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} customers."))
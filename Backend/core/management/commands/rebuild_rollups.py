@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollup tables from raw orders, or verify them with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare stored rollups with raw orders; exit non-zero on mismatch.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = rollups.verify()
+            for line in differences[:50]:
+                self.stdout.write(line)
+            if differences:
+                raise CommandError(f"{len(differences)} rollup row(s) out of sync.")
+            self.stdout.write(self.style.SUCCESS("Rollups are in sync."))
+            return
+
+        n_products, n_payments = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {n_products} product and {n_payments} payment rollup rows."
+        ))
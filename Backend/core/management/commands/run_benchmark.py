@@ -0,0 +1,98 @@
+import json
+import platform
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every API route at one or more data sizes in a throwaway "
+        "test database. Writes JSON results and compares them with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='tiny,small',
+                            help=f"Comma-separated sizes from: {', '.join(benchmark.SIZES)}.")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--routes', help="Comma-separated route labels (default all).")
+        parser.add_argument('--warm-cache', action='store_true',
+                            help="Let analytics responses be served from the cache.")
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--baseline', default='benchmarks/baseline.json')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Write the results to --baseline instead of comparing.")
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help="Allowed p95 growth over the baseline (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        sizes = [s.strip() for s in options['sizes'].split(',') if s.strip()]
+        unknown = [s for s in sizes if s not in benchmark.SIZES]
+        if unknown or not sizes:
+            raise CommandError(f"Unknown size(s): {', '.join(unknown)}.")
+        only = set(options['routes'].split(',')) if options['routes'] else None
+
+        results = {}
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            settings.DEBUG = False
+            for size in sizes:
+                benchmark.flush()
+                counts = benchmark.seed(**benchmark.SIZES[size], seed=options['seed'])
+                self.stdout.write(f"{size}: seeded {counts['order_items']} order items "
+                                  f"in {counts['seconds']}s")
+                results[size] = benchmark.run_routes(
+                    repeat=options['repeat'], only=only, warm_cache=options['warm_cache'],
+                )
+                for label, stats in results[size].items():
+                    self.stdout.write(
+                        f"  {label:<24} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms"
+                        f"  {stats['queries']:>3} queries  {stats['peak_kib']:>9.1f} KiB"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'seed': options['seed'],
+                'repeat': options['repeat'],
+                'warm_cache': options['warm_cache'],
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'machine': platform.machine(),
+            },
+            'results': results,
+        }
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}."))
+            return
+
+        Path(options['output']).write_text(json.dumps(report, indent=2) + "\n")
+        self.stdout.write(f"Results written to {options['output']}.")
+
+        if not baseline_path.exists():
+            self.stdout.write("No baseline to compare with; use --save-baseline.")
+            return
+        baseline = json.loads(baseline_path.read_text())['results']
+        regressions = benchmark.compare(results, baseline, tolerance=options['tolerance'])
+        for line in regressions:
+            self.stderr.write(line)
+        if regressions:
+            raise CommandError(f"{len(regressions)} regression(s) against {baseline_path}.")
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
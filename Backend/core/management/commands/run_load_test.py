@@ -0,0 +1,74 @@
+import json
+import logging
+import tempfile
+from importlib.util import find_spec
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import benchmark, loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the dashboard endpoints through gunicorn (WSGI) and uvicorn (ASGI), "
+        "one worker process each, on a throwaway SQLite file seeded at --size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', default='wsgi,asgi', help="Comma-separated: wsgi, asgi.")
+        parser.add_argument('--users', type=int, default=50, help="Concurrent simulated users.")
+        parser.add_argument('--seconds', type=float, default=15)
+        parser.add_argument('--threads', type=int, default=8, help="gthread threads of the WSGI worker.")
+        parser.add_argument('--size', default='small',
+                            help=f"Data size from: {', '.join(benchmark.SIZES)}.")
+        parser.add_argument('--cold', action='store_true',
+                            help="Vary the query string so the analytics cache never hits.")
+        parser.add_argument('--output', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        servers = [s.strip() for s in options['servers'].split(',') if s.strip()]
+        if not servers or set(servers) - {'wsgi', 'asgi'}:
+            raise CommandError("--servers takes wsgi and/or asgi.")
+        if options['size'] not in benchmark.SIZES:
+            raise CommandError(f"Unknown size '{options['size']}'.")
+        missing = [name for name, kind in (('gunicorn', 'wsgi'), ('uvicorn', 'asgi'))
+                   if kind in servers and find_spec(name) is None]
+        if missing:
+            raise CommandError(f"Install {' and '.join(missing)} to run the load test.")
+        if connection.vendor != 'sqlite':
+            raise CommandError("The load test seeds a throwaway SQLite file; use a sqlite DATABASE_URL.")
+
+        logging.getLogger('core.performance').setLevel(logging.ERROR)
+        results = []
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = Path(tmp) / "loadtest.sqlite3"
+                connection.settings_dict['TEST']['NAME'] = str(path)
+                old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                try:
+                    benchmark.seed(**benchmark.SIZES[options['size']])
+                    env = {'DATABASE_URL': f"sqlite:///{path}", 'DEBUG': 'False', 'DB_CONN_MAX_AGE': '0'}
+                    for kind in servers:
+                        result = loadtest.run(
+                            kind, options['users'], options['seconds'], threads=options['threads'],
+                            cold=options['cold'], env=env,
+                        )
+                        results.append(result)
+                        workers = f"{result['threads']} threads" if result['threads'] else "event loop"
+                        self.stdout.write(
+                            f"{kind}  {result['requests_per_sec']:>7} req/s  "
+                            f"p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+                            f"{result['errors']} errors  peak RSS {result['peak_rss_mb']} MB  "
+                            f"({result['users']} users, {workers})"
+                        )
+                finally:
+                    connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + "\n")
@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import benchmark
+from core.renderers import orjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare OrderReadSerializer with OrderReader, and DRF's JSON renderer and "
+        "parser with the orjson-backed ones, on a large order list in a throwaway "
+        "test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=5000, help="Orders in the payload.")
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--output', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError("orjson is not installed; FastJSONRenderer falls back to DRF's renderer.")
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            benchmark.seed(products=500, customers=2000, orders=options['orders'], expenses=0)
+            results = benchmark.render_orders(orders=options['orders'], repeat=options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(
+            f"{results['orders']} orders, {results['bytes'] / 1024:.0f} KB of JSON, "
+            f"identical output: {results['identical']}"
+        )
+        for step in ('read', 'render', 'parse'):
+            drf, fast = results[step]['drf'], results[step]['fast']
+            self.stdout.write(
+                f"{step:<7} drf  {drf['mean_ms']:>8} ms (p95 {drf['p95_ms']}), peak {drf['peak_kb']} KB\n"
+                f"{'':<7} fast {fast['mean_ms']:>8} ms (p95 {fast['p95_ms']}), peak {fast['peak_kb']} KB  "
+                f"-> {drf['mean_ms'] / max(fast['mean_ms'], 0.01):.1f}x faster"
+            )
+        if not results['identical']:
+            raise CommandError("OrderReader + FastJSONRenderer output differs from the serializer's.")
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + "\n")
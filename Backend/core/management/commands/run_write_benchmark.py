@@ -0,0 +1,67 @@
+import json
+import logging
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure concurrent order writes on a throwaway SQLite file, once with "
+        "SQLite's default settings (DEFERRED transactions, no pragmas) and once "
+        "with the configured transaction_mode and settings.SQLITE_PRAGMAS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=50, help="Orders per thread.")
+        parser.add_argument('--output', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("The write benchmark compares SQLite settings; use a sqlite DATABASE_URL.")
+
+        tuned = dict(settings.SQLITE_PRAGMAS)
+        db_options = connection.settings_dict['OPTIONS']
+        transaction_mode = db_options.get('transaction_mode')
+        modes = [('defaults', {}, 'DEFERRED'), ('tuned', tuned, transaction_mode)]
+        results = {}
+        # Lock waits and lock errors are what is being measured; keep the
+        # slow-request and 500 logs out of the report.
+        logging.getLogger('core.performance').setLevel(logging.ERROR)
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                for label, pragmas, mode in modes:
+                    settings.SQLITE_PRAGMAS = pragmas
+                    db_options['transaction_mode'] = mode
+                    connection.settings_dict['TEST']['NAME'] = str(Path(tmp) / f"{label}.sqlite3")
+                    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+                    try:
+                        benchmark.seed(products=20, customers=0, orders=0, expenses=0)
+                        results[label] = benchmark.concurrent_writes(
+                            threads=options['threads'], orders_per_thread=options['orders'],
+                        )
+                    finally:
+                        connection.creation.destroy_test_db(old_name, verbosity=0)
+                    self.stdout.write(
+                        f"{label:<9} {results[label]['orders']} orders from {options['threads']} threads "
+                        f"in {results[label]['seconds']}s: {results[label]['orders_per_sec']} orders/s, "
+                        f"{results[label]['lock_retries']} lock retries"
+                    )
+        finally:
+            settings.SQLITE_PRAGMAS = tuned
+            db_options['transaction_mode'] = transaction_mode
+            teardown_test_environment()
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2) + "\n")
+        gain = results['tuned']['orders_per_sec'] / max(results['defaults']['orders_per_sec'], 0.1)
+        self.stdout.write(self.style.SUCCESS(f"Tuned SQLite: {gain:.1f}x the write throughput."))
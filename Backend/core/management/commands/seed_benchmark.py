@@ -0,0 +1,55 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with deterministic synthetic sales data for "
+        "benchmarking. Start from a named --size and override any volume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=list(benchmark.SIZES), default='small')
+        parser.add_argument('--products', type=int)
+        parser.add_argument('--customers', type=int)
+        parser.add_argument('--orders', type=int)
+        parser.add_argument('--expenses', type=int)
+        parser.add_argument('--items-per-order', type=int, default=3,
+                            help="Mean number of lines per order.")
+        parser.add_argument('--days', type=int, default=730,
+                            help="Length of the order history, ending on --end.")
+        parser.add_argument('--end', type=date.fromisoformat, default=benchmark.SEED_END,
+                            help=f"Last day of the history (default {benchmark.SEED_END}).")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=benchmark.DEFAULT_BATCH_SIZE)
+        parser.add_argument('--flush', action='store_true',
+                            help="Delete existing products, customers, orders and expenses first.")
+
+    def handle(self, *args, **options):
+        volumes = dict(benchmark.SIZES[options['size']])
+        for name in volumes:
+            if options[name] is not None:
+                volumes[name] = options[name]
+        if min(volumes.values()) < 0 or options['items_per_order'] < 1 or options['days'] < 1:
+            raise CommandError("Volumes must not be negative.")
+        if volumes['orders'] and not volumes['products']:
+            raise CommandError("Orders need at least one product.")
+
+        if options['flush']:
+            benchmark.flush()
+        counts = benchmark.seed(
+            **volumes,
+            items_per_order=options['items_per_order'],
+            days=options['days'],
+            end=options['end'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            progress=self.stdout.write if options['verbosity'] > 1 else None,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            "Seeded {products} products, {customers} customers, {orders} orders "
+            "({order_items} items) and {expenses} expenses in {seconds}s.".format(**counts)
+        ))
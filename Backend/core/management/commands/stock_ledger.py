@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core import ledger
+from core.analytics import local_today, start_of_day
+
+
+class Command(BaseCommand):
+    help = (
+        "Snapshot product stock from the stock ledger (run e.g. nightly), or check the "
+        "ledger against Product.stock with --verify."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help="Only compare the ledger with Product.stock and the snapshots; exit non-zero on mismatch.",
+        )
+        parser.add_argument(
+            '--reconcile',
+            action='store_true',
+            help="Append an adjustment for every product whose stock differs from its ledger.",
+        )
+        parser.add_argument(
+            '--at',
+            help="Snapshot as of the start of this day (YYYY-MM-DD, not after today); default today.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            differences = ledger.verify()
+            for line in differences[:50]:
+                self.stdout.write(line)
+            if differences:
+                raise CommandError(f"{len(differences)} stock ledger difference(s).")
+            self.stdout.write(self.style.SUCCESS("Stock ledger is in sync."))
+            return
+
+        if options['reconcile']:
+            count = ledger.reconcile()
+            self.stdout.write(self.style.SUCCESS(f"Recorded {count} reconciling adjustment(s)."))
+            return
+
+        moment = None
+        if options['at']:
+            day = parse_date(options['at'])
+            if day is None:
+                raise CommandError("--at expects a date in YYYY-MM-DD format.")
+            if day > local_today():
+                # Movements written before that moment would never be counted.
+                raise CommandError("--at must not be after today.")
+            moment = start_of_day(day)
+        count = ledger.take_snapshots(moment)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} stock snapshot(s)."))
@@ -0,0 +1,174 @@
+"""
+In-process request metrics.
+
+PerformanceMiddleware (core.middleware) opens a RequestTimings for every
+request. The current timings live in a context variable, so concurrent
+requests on one ASGI event loop each see their own, and the sync threads
+running their ORM calls inherit them. Database queries are recorded by
+record_query(), installed as an execute wrapper on every connection
+(core.signals); serializers and the response renderer add their own
+phases via phase(). At the end of the request the totals go into per-route latency
+histograms, which MetricsView renders in the Prometheus text format.
+
+Histograms live in the worker process: each gunicorn worker reports its
+own numbers.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Upper bounds of the latency histogram buckets, in milliseconds.
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_current = ContextVar('request_timings', default=None)
+_lock = threading.Lock()
+_histograms = {}
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total_ms = None
+        self.db_count = 0
+        self.db_ms = 0.0
+        self.phases = {}
+        self.statements = Counter()
+        self._active = set()
+
+    def record_query(self, execute, sql, params, many, context):
+        """Counts and times one query."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.db_count += 1
+            self.statements[sql] += 1
+
+    def add(self, name, ms):
+        self.phases[name] = self.phases.get(name, 0.0) + ms
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        return self.total_ms
+
+    def repeated_statements(self, limit=3):
+        return [(sql, n) for sql, n in self.statements.most_common(limit) if n > 1]
+
+    def server_timing(self):
+        """Value for the Server-Timing response header."""
+        entries = [f'db;dur={self.db_ms:.1f};desc="{self.db_count} queries"']
+        for name in ('serialize', 'render'):
+            if name in self.phases:
+                entries.append(f'{name};dur={self.phases[name]:.1f}')
+        entries.append(f'total;dur={self.total_ms:.1f}')
+        return ', '.join(entries)
+
+
+def start_request():
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+def end_request():
+    _current.set(None)
+
+
+def current():
+    """The RequestTimings of the request in this context, or None."""
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper: records the query on the current request."""
+    timings = current()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+def install(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def phase(name):
+    """Add the time spent in the block to phase `name` of the current request."""
+    timings = current()
+    if timings is None or name in timings._active:
+        yield
+        return
+    timings._active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings._active.discard(name)
+        timings.add(name, (time.perf_counter() - started) * 1000)
+
+
+# ============================
+# HISTOGRAMS
+# ============================
+
+def observe(route, method, timings):
+    key = (route, method)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {
+                'buckets': [0] * len(BUCKETS_MS), 'count': 0, 'sum_ms': 0.0, 'queries': 0,
+            }
+        for index, bound in enumerate(BUCKETS_MS):
+            if timings.total_ms <= bound:
+                histogram['buckets'][index] += 1
+                break
+        histogram['count'] += 1
+        histogram['sum_ms'] += timings.total_ms
+        histogram['queries'] += timings.db_count
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """{(route, method): histogram} copy, safe to read without the lock."""
+    with _lock:
+        return {
+            key: {**value, 'buckets': list(value['buckets'])}
+            for key, value in _histograms.items()
+        }
+
+
+def render_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP http_request_duration_ms Request latency per route.",
+        "# TYPE http_request_duration_ms histogram",
+    ]
+    histograms = sorted(snapshot().items())
+    for (route, method), histogram in histograms:
+        labels = f'route="{route}",method="{method}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS_MS, histogram['buckets']):
+            cumulative += count
+            lines.append(f'http_request_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'http_request_duration_ms_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+        lines.append(f'http_request_duration_ms_sum{{{labels}}} {histogram["sum_ms"]:.3f}')
+        lines.append(f'http_request_duration_ms_count{{{labels}}} {histogram["count"]}')
+
+    lines += [
+        "# HELP http_request_db_queries_total Database queries issued per route.",
+        "# TYPE http_request_db_queries_total counter",
+    ]
+    for (route, method), histogram in histograms:
+        lines.append(
+            f'http_request_db_queries_total{{route="{route}",method="{method}"}} {histogram["queries"]}'
+        )
+    return "\n".join(lines) + "\n"
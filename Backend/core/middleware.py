@@ -0,0 +1,126 @@
+import logging
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics, profiling
+
+logger = logging.getLogger('core.performance')
+
+
+class PerformanceMiddleware:
+    """
+    Times every request and adds a Server-Timing header with DB time and
+    query count, serializer and render time and the total. Feeds the
+    per-route histograms in core.metrics and logs requests over the
+    PERF_SLOW_REQUEST_MS / PERF_SLOW_REQUEST_QUERIES budgets together with
+    their most repeated SQL.
+
+    Streaming responses are timed up to the first byte. Queries made on
+    other threads (dashboard panels) are not counted.
+
+    Works under WSGI and ASGI; under ASGI it stays on the event loop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = metrics.start_request()
+        try:
+            response = self.get_response(request)
+            timings.finish()
+        finally:
+            metrics.end_request()
+        return self._report(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = metrics.start_request()
+        try:
+            response = await self.get_response(request)
+            timings.finish()
+        finally:
+            metrics.end_request()
+        return self._report(request, response, timings)
+
+    def _report(self, request, response, timings):
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        metrics.observe(route, request.method, timings)
+        response['Server-Timing'] = timings.server_timing()
+        self._log_if_slow(request, route, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # Runs just before render(); the callback runs right after it.
+        timings = metrics.current()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: timings.add('render', (time.perf_counter() - started) * 1000)
+            )
+        return response
+
+    def _log_if_slow(self, request, route, timings):
+        max_ms = getattr(settings, 'PERF_SLOW_REQUEST_MS', 500)
+        max_queries = getattr(settings, 'PERF_SLOW_REQUEST_QUERIES', 50)
+        if timings.total_ms <= max_ms and timings.db_count <= max_queries:
+            return
+        repeated = "".join(
+            f"\n  {count}x {sql}" for sql, count in timings.repeated_statements()
+        )
+        logger.warning(
+            "Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in db.%s",
+            request.method, request.get_full_path(), route,
+            timings.total_ms, timings.db_count, timings.db_ms,
+            f" Most repeated SQL:{repeated}" if repeated else "",
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Runs a request under cProfile when a staff user asks for it with
+    `X-Profile: 1` or `?profile=1` (see core.profiling). The response
+    carries X-Profile-Id, or `X-Profile: rate-limited` when another
+    profile was taken too recently. Other requests pass straight through.
+
+    Under ASGI a profiled request runs on a worker thread, so the profile
+    covers the ORM and serializer work done there; time spent on the
+    event loop shows up as a single async_to_sync call.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not profiling.requested(request):
+            return self.get_response(request)
+        return self._profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not profiling.requested(request):
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(request, async_to_sync(self.get_response))
+
+    def _profile(self, request, get_response):
+        user = profiling.staff_user(request)
+        if user is None:
+            return get_response(request)
+        if not profiling.acquire_slot():
+            response = get_response(request)
+            response['X-Profile'] = 'rate-limited'
+            return response
+        return profiling.run(get_response, request, user)
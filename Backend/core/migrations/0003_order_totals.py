@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-18 15:43
+
+from django.db import migrations, models
+
+
+def backfill_order_totals(apps, schema_editor):
+    Order = apps.get_model('core', 'Order')
+    OrderItem = apps.get_model('core', 'OrderItem')
+
+    totals = (
+        OrderItem.objects
+        .values('order_id')
+        .annotate(
+            total_amount=models.Sum(
+                models.F('quantity') * models.F('price_at_sale'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            item_count=models.Count('id'),
+        )
+        .order_by()
+    )
+    batch = []
+    for row in totals.iterator(chunk_size=2000):
+        batch.append(Order(
+            pk=row['order_id'],
+            total_amount=row['total_amount'],
+            item_count=row['item_count'],
+        ))
+        if len(batch) >= 2000:
+            Order.objects.bulk_update(batch, ['total_amount', 'item_count'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['total_amount', 'item_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_amount',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
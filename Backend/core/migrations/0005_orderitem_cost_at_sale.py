@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+def backfill_cost_at_sale(apps, schema_editor):
+    # The purchase price at the time of sale is not known for existing
+    # items; the product's current buy_price is the best estimate.
+    OrderItem = apps.get_model('core', 'OrderItem')
+    Product = apps.get_model('core', 'Product')
+    OrderItem.objects.update(cost_at_sale=models.Subquery(
+        Product.objects.filter(pk=models.OuterRef('product_id')).values('buy_price')[:1]
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='cost_at_sale',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_cost_at_sale, migrations.RunPython.noop),
+    ]
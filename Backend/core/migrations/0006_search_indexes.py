@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 16:56
+
+from django.db import migrations, models
+
+# (index, table, column) of the ?search= prefix lookups.
+SEARCH_INDEXES = [
+    ('product_name_search_idx', 'core_product', 'name'),
+    ('product_sku_search_idx', 'core_product', 'sku'),
+    ('customer_name_search_idx', 'core_customer', 'name'),
+    ('customer_phone_search_idx', 'core_customer', 'phone'),
+]
+
+
+def _index_expression(vendor, column):
+    # Must match the SQL of Django's istartswith lookup on each backend.
+    if vendor == 'sqlite':
+        return f'"{column}" COLLATE NOCASE'  # LIKE 'term%' ESCAPE '\'
+    if vendor == 'postgresql':
+        return f'UPPER("{column}"::text) text_pattern_ops'  # UPPER(col::text) LIKE UPPER('term%')
+    return None
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, table, column in SEARCH_INDEXES:
+        expression = _index_expression(vendor, column)
+        if expression:
+            schema_editor.execute(f'CREATE INDEX "{name}" ON "{table}" ({expression})')
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for name, table, column in SEARCH_INDEXES:
+        if _index_expression(vendor, column):
+            schema_editor.execute(f'DROP INDEX "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_orderitem_cost_at_sale'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['sell_price'], name='product_price_idx'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
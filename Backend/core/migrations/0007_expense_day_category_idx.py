@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['date', 'category', 'amount'], name='expense_day_category_idx'),
+        ),
+    ]
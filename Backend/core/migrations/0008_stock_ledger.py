@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def open_balances(apps, schema_editor):
+    # The history behind existing stock is not known: each product's
+    # current stock becomes one opening movement, so the ledger adds up.
+    Product = apps.get_model('core', 'Product')
+    StockMovement = apps.get_model('core', 'StockMovement')
+    StockMovement.objects.bulk_create(
+        (
+            StockMovement(product_id=pk, kind='ADJUSTMENT', quantity=stock, note='Opening balance')
+            for pk, stock in Product.objects.exclude(stock=0).values_list('pk', 'stock').iterator()
+        ),
+        batch_size=500,
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_expense_day_category_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('stock', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='core.product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('SALE', 'Sale'), ('RESTOCK', 'Restock'), ('ADJUSTMENT', 'Adjustment')], max_length=10)),
+                ('quantity', models.IntegerField()),
+                ('note', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='core.order')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='core.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('product', 'taken_at'), name='uniq_stock_snapshot'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['product', 'created_at', 'quantity'], name='stock_movement_product_idx'),
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
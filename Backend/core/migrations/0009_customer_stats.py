@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:14
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    # Same as core.customer_stats.rebuild(), with the historical models.
+    Customer = apps.get_model('core', 'Customer')
+    CustomerStats = apps.get_model('core', 'CustomerStats')
+    Order = apps.get_model('core', 'Order')
+    totals = {
+        row.pop('customer'): row
+        for row in Order.objects.filter(customer__isnull=False).values('customer').annotate(
+            order_count=models.Count('id'),
+            revenue=models.Sum('total_amount'),
+            first_order_at=models.Min('order_date'),
+            last_order_at=models.Max('order_date'),
+        ).order_by()
+    }
+    CustomerStats.objects.bulk_create(
+        (
+            CustomerStats(customer_id=pk, city=city, **totals.get(pk, {}))
+            for pk, city in Customer.objects.values_list('pk', 'city').iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='core.customer')),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('first_order_at', models.DateTimeField(blank=True, null=True)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['revenue', 'customer'], name='customer_stats_revenue_idx'), models.Index(fields=['order_count', 'customer'], name='customer_stats_orders_idx'), models.Index(fields=['last_order_at', 'order_count', 'revenue', 'customer'], name='customer_stats_recency_idx'), models.Index(fields=['city', 'revenue', 'customer'], name='customer_stats_city_idx')],
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
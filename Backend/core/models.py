@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 
 
 class TimeStampedModel(models.Model):
@@ -22,6 +23,23 @@ class Product(TimeStampedModel):
     def __str__(self):
         return f"{self.name} ({self.sku})"
 
+    class Meta:
+        indexes = [
+            # Product list and keyset pagination.
+            models.Index(fields=['created_at', 'id'], name='product_created_idx'),
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+            models.Index(fields=['category'], name='product_category_idx'),
+            models.Index(fields=['sell_price'], name='product_price_idx'),
+            # Only low-stock rows are indexed, ordered as the low-stock panel reads them.
+            models.Index(
+                fields=['stock', 'id'],
+                condition=models.Q(stock__lte=models.F('low_stock_threshold')),
+                name='product_low_stock_idx',
+            ),
+            # The ?search= indexes on name and sku depend on the database
+            # backend and are created by migration 0006.
+        ]
+
     @property
     def is_low_stock(self):
         return self.stock <= self.low_stock_threshold
@@ -33,6 +51,13 @@ class Customer(TimeStampedModel):
     email = models.EmailField(blank=True)
     city = models.CharField(max_length=100, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='customer_created_idx'),
+            models.Index(fields=['updated_at'], name='customer_updated_idx'),
+            # ?search= on name and phone: see migration 0006.
+        ]
+
     def __str__(self):
         return self.name
 
@@ -58,13 +83,37 @@ class Order(TimeStampedModel):
         choices=PAYMENT_METHOD_CHOICES,
         default='CASH'
     )
+    # Denormalized from items; kept current by refresh_totals().
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            # Order list, keyset pagination, exports and rollup rebuilds by date.
+            models.Index(fields=['order_date', 'id'], name='order_date_idx'),
+            models.Index(fields=['updated_at'], name='order_updated_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.order_date.date()}"
 
-    @property
-    def total_amount(self):
-        return sum(item.total_price for item in self.items.all())
+    def refresh_totals(self):
+        """Recompute total_amount and item_count from the order's items."""
+        totals = self.items.aggregate(
+            total_amount=models.Sum(
+                models.F('quantity') * models.F('price_at_sale'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            item_count=models.Count('id'),
+        )
+        self.total_amount = totals['total_amount'] or 0
+        self.item_count = totals['item_count']
+        self.updated_at = timezone.now()
+        Order.objects.filter(pk=self.pk).update(
+            total_amount=self.total_amount,
+            item_count=self.item_count,
+            updated_at=self.updated_at,
+        )
 
 
 class OrderItem(models.Model):
@@ -80,6 +129,14 @@ class OrderItem(models.Model):
     )
     quantity = models.PositiveIntegerField()
     price_at_sale = models.DecimalField(max_digits=10, decimal_places=2)
+    # product.buy_price when the item was sold, so past margins never change.
+    cost_at_sale = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
+
+    class Meta:
+        indexes = [
+            # Quantity sold per product is read from the index alone.
+            models.Index(fields=['product', 'quantity'], name='orderitem_product_qty_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
@@ -88,6 +145,21 @@ class OrderItem(models.Model):
     def total_price(self):
         return self.quantity * self.price_at_sale
 
+    @property
+    def total_cost(self):
+        return self.quantity * self.cost_at_sale
+
+    def save(self, *args, **kwargs):
+        if self.cost_at_sale is None:
+            self.cost_at_sale = self.product.buy_price
+        super().save(*args, **kwargs)
+        self.order.refresh_totals()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self.order.refresh_totals()
+        return result
+
 
 class Expense(TimeStampedModel):
     category = models.CharField(max_length=100)
@@ -95,5 +167,185 @@ class Expense(TimeStampedModel):
     date = models.DateField()
     note = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # Expense list, keyset pagination and date-windowed summaries.
+            models.Index(fields=['date', 'id'], name='expense_date_idx'),
+            # Expenses by category, answered from the index alone.
+            models.Index(fields=['category', 'date', 'amount'], name='expense_category_idx'),
+            # Expenses per day and category for the profit & loss series.
+            models.Index(fields=['date', 'category', 'amount'], name='expense_day_category_idx'),
+            models.Index(fields=['updated_at'], name='expense_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.category} - {self.amount} on {self.date}"
+
+
+# ============================
+# SALES ROLLUPS
+# ============================
+
+class DailyProductSales(models.Model):
+    """
+    Sales per local calendar day and product, maintained by core.rollups.
+    """
+    day = models.DateField()
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='daily_sales'
+    )
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='uniq_daily_product_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.revenue}"
+
+
+class DailyPaymentSales(models.Model):
+    """
+    Sales per local calendar day and payment method, maintained by core.rollups.
+    `order_count` includes orders without items.
+    """
+    day = models.DateField()
+    payment_method = models.CharField(max_length=10, choices=Order.PAYMENT_METHOD_CHOICES)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantity = models.PositiveIntegerField(default=0)
+    cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'payment_method'], name='uniq_daily_payment_sales'),
+        ]
+        indexes = [
+            # Sales summary and series read only these columns.
+            models.Index(fields=['day', 'revenue', 'order_count'], name='payment_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.payment_method} on {self.day}: {self.revenue}"
+
+
+# ============================
+# CUSTOMER STATS
+# ============================
+
+class CustomerStats(models.Model):
+    """
+    Order aggregates per customer, maintained by core.customer_stats in the
+    transactions that write orders. `city` is copied from the customer
+    (core.signals) so a city's customers are read from one index.
+    """
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    city = models.CharField(max_length=100, blank=True)
+    order_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    first_order_at = models.DateTimeField(null=True, blank=True)
+    last_order_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Rankings, read backwards from the top: one index per ?order_by=.
+            models.Index(fields=['revenue', 'customer'], name='customer_stats_revenue_idx'),
+            models.Index(fields=['order_count', 'customer'], name='customer_stats_orders_idx'),
+            # Also covers the RFM scores and revenue, for the segment totals.
+            models.Index(
+                fields=['last_order_at', 'order_count', 'revenue', 'customer'],
+                name='customer_stats_recency_idx',
+            ),
+            # A city's customers by revenue, and customers and revenue per city.
+            models.Index(fields=['city', 'revenue', 'customer'], name='customer_stats_city_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id}: {self.order_count} orders, {self.revenue}"
+
+    @property
+    def average_basket(self):
+        return self.revenue / self.order_count if self.order_count else None
+
+
+# ============================
+# STOCK LEDGER
+# ============================
+
+class StockMovement(models.Model):
+    """
+    One change to a product's stock, written by core.ledger next to every
+    update of Product.stock. Rows are only appended, never edited: the sum
+    of a product's movements is its stock, and a correction is a new
+    ADJUSTMENT.
+    """
+    SALE = 'SALE'
+    RESTOCK = 'RESTOCK'
+    ADJUSTMENT = 'ADJUSTMENT'
+    KIND_CHOICES = [
+        (SALE, 'Sale'),
+        (RESTOCK, 'Restock'),
+        (ADJUSTMENT, 'Adjustment'),
+    ]
+
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_movements'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # Signed: negative when stock leaves.
+    quantity = models.IntegerField()
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements'
+    )
+    note = models.CharField(max_length=200, blank=True)
+    # When the change was recorded (not the order date of a backfilled sale),
+    # so movements only ever arrive after the snapshots already taken.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            # Movements of a product after its latest snapshot, read from the index alone.
+            models.Index(fields=['product', 'created_at', 'quantity'], name='stock_movement_product_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.quantity:+d} of {self.product_id}"
+
+
+class StockSnapshot(models.Model):
+    """
+    A product's stock at `taken_at`, i.e. the sum of its movements up to
+    then. Stock at any later moment is the snapshot plus the movements
+    since, so a point-in-time lookup never replays the whole ledger.
+    """
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name='stock_snapshots'
+    )
+    taken_at = models.DateTimeField()
+    stock = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'taken_at'], name='uniq_stock_snapshot'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} at {self.taken_at}: {self.stock}"
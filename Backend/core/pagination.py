@@ -0,0 +1,163 @@
+"""
+Keyset (cursor) pagination for the CRUD viewsets.
+
+Pages are located by the (ordering field, id) pair of the last row seen
+instead of an OFFSET, so page N costs the same as page 1. The cursor is
+an opaque base64 token in ?cursor=; ?page_size= picks the page size.
+
+Clients that still need the whole table can pass ?paginate=false.
+"""
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 50
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    legacy_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering_field(self, view):
+        """
+        Field the view is sorted on, descending; `id` breaks ties.
+        Taken from the view's `keyset_field` (e.g. 'order_date').
+        """
+        return getattr(view, 'keyset_field', 'created_at')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() through the async ORM."""
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self._set_page([row async for row in queryset])
+
+    def page_queryset(self, queryset, request, view, look_ahead=True):
+        """
+        The queryset of the requested page plus a look-ahead row, or None
+        if unpaginated. core.conditional asks for the page alone
+        (look_ahead=False) to find the rows it shows before fetching it.
+        """
+        if request.query_params.get(self.legacy_query_param, '').lower() in ('false', '0'):
+            return None
+
+        self.request = request
+        self.field = self.get_ordering_field(view)
+        self.model_field = queryset.model._meta.get_field(self.field)
+        self.page_size_value = self.get_page_size(request)
+
+        position = self.decode_cursor(request)
+        self.position = position
+        reverse = bool(position and position['reverse'])
+
+        if position:
+            value, pk = position['value'], position['id']
+            if reverse:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__gt': value}) | Q(**{self.field: value, 'pk__gt': pk}),
+                    **{f'{self.field}__gte': value},
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__lt': value}) | Q(**{self.field: value, 'pk__lt': pk}),
+                    **{f'{self.field}__lte': value},
+                )
+
+        if reverse:
+            queryset = queryset.order_by(self.field, 'pk')
+        else:
+            queryset = queryset.order_by(f'-{self.field}', '-pk')
+        return queryset[:self.page_size_value + look_ahead]
+
+    def _set_page(self, rows):
+        position = self.position
+        reverse = bool(position and position['reverse'])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page = rows
+        return rows
+
+    def get_paginated_data(self, data):
+        return OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ])
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    # ============================
+    # CURSORS
+    # ============================
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        value = self.model_field.value_to_string(row)
+        payload = json.dumps({'v': value, 'id': row.pk, 'r': int(reverse)})
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            return {
+                'value': self.model_field.to_python(payload['v']),
+                'id': int(payload['id']),
+                'reverse': bool(payload['r']),
+            }
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
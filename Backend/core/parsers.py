@@ -0,0 +1,40 @@
+"""
+JSON parser on orjson, when it is installed.
+
+UTF-8 request bodies are decoded by orjson. Anything orjson rejects
+(invalid JSON, NaN, lone surrogates) is handed to
+rest_framework.parsers.JSONParser, so what is accepted and the
+"JSON parse error" messages stay exactly as before. So is any body with
+a run of 19 or more digits: orjson reads integers beyond 64 bits as
+floats.
+"""
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from .renderers import FastJSONRenderer, orjson
+
+UTF8 = ('utf-8', 'utf8')
+# Every digit becomes b'0' and everything else b' ', so a long digit run
+# is a plain substring search; a regex is slower than orjson itself.
+DIGITS_ONLY = bytes(48 if 48 <= byte <= 57 else 32 for byte in range(256))
+LONG_NUMBER = b'0' * 19
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_NUMBER in body.translate(DIGITS_ONLY):
+            return super().parse(io.BytesIO(body), media_type, parser_context)
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,211 @@
+"""
+On-demand profiling of single requests.
+
+A staff user adds `X-Profile: 1` (or `?profile=1`) to a request; the
+request then runs under cProfile and the result is kept in PROFILE_DIR as
+  <id>.prof   raw stats, for pstats / snakeviz
+  <id>.txt    call tree and top functions by cumulative time
+  <id>.json   method, path, user, status and duration
+Only the newest PROFILE_MAX_FILES profiles are kept, and at most one
+profile is taken per PROFILE_MIN_INTERVAL seconds across all workers
+sharing the cache. Requests without the flag skip all of this.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+HEADER = 'X-Profile'
+QUERY_PARAM = 'profile'
+RATE_LIMIT_KEY = 'profiling:last-profile'
+PROFILE_ID = re.compile(r'^[0-9]{8}T[0-9]{12}-[0-9a-f]{6}$')
+
+TREE_DEPTH = 12
+TREE_MIN_FRACTION = 0.01
+TOP_FUNCTIONS = 40
+
+
+def profile_dir():
+    return str(getattr(settings, 'PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'dashboard-profiles')))
+
+
+def requested(request):
+    return request.headers.get(HEADER) == '1' or request.GET.get(QUERY_PARAM) == '1'
+
+
+def _user(request):
+    """The session user, or the one named by the API's authenticators (JWT)."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return user
+    drf_request = Request(request)
+    for authenticator_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        try:
+            result = authenticator_class().authenticate(drf_request)
+        except APIException:
+            return None
+        if result is not None:
+            return result[0]
+    return None
+
+
+def staff_user(request):
+    """The requesting user if they may profile, else None."""
+    user = _user(request)
+    return user if user is not None and user.is_staff else None
+
+
+def acquire_slot():
+    """True at most once per PROFILE_MIN_INTERVAL seconds."""
+    return cache.add(RATE_LIMIT_KEY, time.time(), timeout=getattr(settings, 'PROFILE_MIN_INTERVAL', 10))
+
+
+# ============================
+# STORAGE
+# ============================
+
+def _path(profile_id, suffix):
+    return os.path.join(profile_dir(), f"{profile_id}.{suffix}")
+
+
+def save(profiler, meta):
+    """Write the profile files and trim the ring; returns the profile id."""
+    os.makedirs(profile_dir(), exist_ok=True)
+    # Sortable by time, so the ring can drop the oldest by name.
+    profile_id = f"{timezone.now():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+
+    profiler.dump_stats(_path(profile_id, 'prof'))
+    stats = pstats.Stats(profiler)
+    with open(_path(profile_id, 'txt'), 'w', encoding='utf-8') as fh:
+        fh.write(summary(stats, meta))
+    with open(_path(profile_id, 'json'), 'w', encoding='utf-8') as fh:
+        json.dump({'id': profile_id, **meta}, fh)
+
+    _trim()
+    return profile_id
+
+
+def _trim():
+    keep = getattr(settings, 'PROFILE_MAX_FILES', 20)
+    for profile_id in list_ids()[keep:]:
+        for suffix in ('prof', 'txt', 'json'):
+            try:
+                os.remove(_path(profile_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_ids():
+    """Stored profile ids, newest first."""
+    try:
+        names = os.listdir(profile_dir())
+    except FileNotFoundError:
+        return []
+    ids = {name.rsplit('.', 1)[0] for name in names if name.endswith('.prof')}
+    return sorted((i for i in ids if PROFILE_ID.match(i)), reverse=True)
+
+
+def list_profiles():
+    profiles = []
+    for profile_id in list_ids():
+        try:
+            with open(_path(profile_id, 'json'), encoding='utf-8') as fh:
+                meta = json.load(fh)
+        except (FileNotFoundError, ValueError):
+            meta = {'id': profile_id}
+        meta['size'] = os.path.getsize(_path(profile_id, 'prof'))
+        profiles.append(meta)
+    return profiles
+
+
+def file_path(profile_id, kind):
+    """Path of a stored profile file, or None if there is no such profile."""
+    if not PROFILE_ID.match(profile_id or ''):
+        return None
+    path = _path(profile_id, 'prof' if kind == 'prof' else 'txt')
+    return path if os.path.exists(path) else None
+
+
+# ============================
+# SUMMARY
+# ============================
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name  # built-in
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _call_tree(stats):
+    """Indented call tree from the outermost call, hiding calls under 1%."""
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((cumulative, func))
+
+    roots = [func for func, row in stats.stats.items() if not row[4]]
+    total = max((stats.stats[func][3] for func in roots), default=0) or stats.total_tt or 1
+    lines = []
+
+    def walk(func, cumulative, depth, seen):
+        lines.append(
+            f"{'  ' * depth}{cumulative * 1000:9.1f} ms  {cumulative / total:6.1%}  {_label(func)}"
+        )
+        if depth >= TREE_DEPTH or func in seen:
+            return
+        for child_cumulative, child in sorted(callees.get(func, []), reverse=True):
+            if child_cumulative / total >= TREE_MIN_FRACTION:
+                walk(child, child_cumulative, depth + 1, seen | {func})
+
+    for root in sorted(roots, key=lambda func: stats.stats[func][3], reverse=True):
+        if stats.stats[root][3] / total >= TREE_MIN_FRACTION:
+            walk(root, stats.stats[root][3], 0, frozenset())
+    return lines
+
+
+def summary(stats, meta):
+    out = io.StringIO()
+    out.write(f"{meta['method']} {meta['path']} -> {meta['status']} "
+              f"in {meta['duration_ms']} ms ({meta['user']}, {meta['created_at']})\n\n")
+    out.write("Call tree (cumulative time, calls under 1% hidden)\n")
+    out.write("\n".join(_call_tree(stats)))
+    out.write("\n\nTop functions by cumulative time\n")
+    stats.stream = out
+    stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+    return out.getvalue()
+
+
+def run(get_response, request, user):
+    """Call get_response(request) under cProfile and store the profile."""
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        response = get_response(request)
+    finally:
+        profiler.disable()
+    duration_ms = (time.perf_counter() - started) * 1000
+
+    profile_id = save(profiler, {
+        'method': request.method,
+        'path': request.get_full_path(),
+        'user': user.get_username(),
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 1),
+        'created_at': timezone.now().isoformat(),
+    })
+    response['X-Profile-Id'] = profile_id
+    return response
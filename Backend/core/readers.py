@@ -0,0 +1,338 @@
+"""
+Serializer-free reads for the CRUD list actions.
+
+A ListReader produces exactly what its serializer's `many=True` `.data`
+would, from `values_list()` rows instead of model instances: only the
+columns the representation needs are fetched, nested lists (an order's
+items) come from one query grouped by parent in a single pass, and no
+serializer, field or model object is built per row.
+
+Values are formatted by the serializer's own field objects wherever the
+field does more than pass the value through (dates, decimals, big ints),
+so settings such as COERCE_DECIMAL_TO_STRING and DATETIME_FORMAT apply
+the same way. Every serializer field must be mapped in `columns` or
+`nested`; a field added to a serializer but not to its reader raises
+ImproperlyConfigured instead of silently disappearing from the list.
+
+The plan follows the serializer instance it is built from, so a reader
+narrowed to a ?fields= / ?expand= serializer (core.fieldsets) selects
+only the columns and joins those fields need, and runs the items query
+or an expanded relation's query only when they are returned.
+
+Used by ListReaderMixin (the DRF viewsets) and core.async_views; turned
+off with FAST_LIST_READS=False.
+"""
+import copy
+from operator import attrgetter
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.fields import empty
+from rest_framework.response import Response
+
+from .serializers import (
+    ProductSerializer,
+    CustomerSerializer,
+    OrderItemReadSerializer,
+    OrderReadSerializer,
+    ExpenseSerializer,
+)
+from . import metrics
+
+# Fields whose to_representation() returns database values unchanged.
+PASS_THROUGH = (
+    serializers.CharField,
+    serializers.EmailField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ReadOnlyField,
+    serializers.SerializerMethodField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class Computed:
+    """A field computed in Python from other columns of the row."""
+
+    def __init__(self, function, *lookups):
+        self.function = function
+        self.lookups = lookups
+
+    def __call__(self, row):
+        return self.function(row)
+
+
+class ListReader:
+    """
+    Reads the fields of `serializer` (by default an unnarrowed
+    `serializer_class()`); narrow() gives the reader for a serializer built
+    with ?fields= / ?expand=, which fetches only what that one returns.
+    """
+    serializer_class = None
+    # output field -> values_list() lookup, or Computed
+    columns = {}
+    # list field -> (reader class, lookup of the child's parent id)
+    nested = {}
+    # expandable field -> (reader class, lookup of the related id)
+    related = {}
+
+    def __init__(self, serializer=None):
+        self.serializer = serializer if serializer is not None else self.serializer_class()
+
+    def narrow(self, serializer):
+        return type(self)(serializer) if serializer.narrowed else self
+
+    @property
+    def model(self):
+        return self.serializer_class.Meta.model
+
+    @property
+    def plan(self):
+        """
+        (name, getter, converter, relation) per field, in serializer order.
+        `relation` gets the related id of a field read through a nullable
+        relation: when it is None the serializer leaves the field out
+        (customer_name of an order without a customer).
+        """
+        return self.layout[0]
+
+    @property
+    def joins(self):
+        """{joined field: (reader, lookup, many)} for lists and expanded relations."""
+        return self.layout[1]
+
+    @property
+    def lookups(self):
+        return self.layout[2]
+
+    @cached_property
+    def layout(self):
+        plan, joins, lookups = [], {}, ['pk']
+        for name, field in self.serializer.fields.items():
+            if isinstance(field, serializers.ListSerializer):
+                reader_class, parent = self.nested[name]
+                joins[name] = (reader_class(field.child), parent, True)
+                plan.append((name, attrgetter('pk'), None, None))
+                continue
+            if isinstance(field, serializers.BaseSerializer):
+                reader_class, lookup = self.related[name]
+                joins[name] = (reader_class(field), lookup, False)
+                plan.append((name, attrgetter(lookup), None, None))
+                lookups.append(lookup)
+                continue
+            if name not in self.columns:
+                raise ImproperlyConfigured(
+                    f"{type(self).__name__} has no column for {self.serializer_class.__name__}.{name}."
+                )
+            column = self.columns[name]
+            convert = None if type(field) in PASS_THROUGH else field.to_representation
+            if isinstance(column, Computed):
+                plan.append((name, column, convert, None))
+                lookups.extend(column.lookups)
+                continue
+            relation = None
+            if '__' in column:
+                # 'customer__name' also needs 'customer', to tell a missing
+                # customer from a missing name.
+                lookups.append(column.rsplit('__', 1)[0])
+                if not field.required and field.default is empty and not field.allow_null:
+                    relation = attrgetter(column.rsplit('__', 1)[0])
+            lookups.append(column)
+            plan.append((name, attrgetter(column), convert, relation))
+        return plan, joins, list(dict.fromkeys(lookups))
+
+    def values(self, queryset, *extra):
+        """`queryset` as named rows with the plan's columns plus `extra` fields."""
+        lookups = self.lookups + [lookup for lookup in extra if lookup not in self.lookups]
+        return queryset.prefetch_related(None).values_list(*lookups, named=True)
+
+    def children(self, rows):
+        """{joined field: queryset of its rows} for `rows`."""
+        queries = {}
+        for name, (reader, lookup, many) in self.joins.items():
+            if many:
+                ids = [row.pk for row in rows]
+                queryset = reader.model.objects.filter(**{f'{lookup}__in': ids})
+                extra = (lookup,)
+            else:
+                ids = {getattr(row, lookup) for row in rows} - {None}
+                queryset = reader.model.objects.filter(pk__in=ids)
+                extra = ()
+            if ids:
+                queries[name] = reader.values(queryset.order_by('pk'), *extra)
+        return queries
+
+    def read(self, rows):
+        """The representation of `rows`, running the queries of the joined fields."""
+        return self.represent(rows, self.fetch(rows))
+
+    async def aread(self, rows):
+        """read() through the async ORM."""
+        return self.represent(rows, await self.afetch(rows))
+
+    def fetch(self, rows):
+        """{joined field: (its rows, what their own joins fetched)}."""
+        fetched = {}
+        for name, queryset in self.children(rows).items():
+            child_rows = list(queryset)
+            fetched[name] = (child_rows, self.joins[name][0].fetch(child_rows))
+        return fetched
+
+    async def afetch(self, rows):
+        fetched = {}
+        for name, queryset in self.children(rows).items():
+            child_rows = [child async for child in queryset]
+            fetched[name] = (child_rows, await self.joins[name][0].afetch(child_rows))
+        return fetched
+
+    def pinned_plan(self):
+        """
+        The plan with each DateTimeField pinned to the active time zone.
+        DRF looks the zone up again for every value, which costs more than
+        formatting the value.
+        """
+        plan = []
+        for name, getter, convert, relation in self.plan:
+            field = getattr(convert, '__self__', None)
+            if isinstance(field, serializers.DateTimeField) and not hasattr(field, 'timezone'):
+                field = copy.copy(field)
+                field.timezone = field.default_timezone()
+                convert = field.to_representation
+            plan.append((name, getter, convert, relation))
+        return plan
+
+    def represent(self, rows, fetched=None):
+        """The representation of `rows`, given what fetch() read for the joins."""
+        with metrics.phase('serialize'):
+            plan = self.pinned_plan()
+            # joined field -> {parent id (lists) or related id: representation}
+            joined = {}
+            for name, (reader, lookup, many) in self.joins.items():
+                child_rows, child_fetched = (fetched or {}).get(name, ([], {}))
+                key = attrgetter(lookup if many else 'pk')
+                grouped = joined[name] = {}
+                for child, data in zip(child_rows, reader.represent(child_rows, child_fetched)):
+                    if many:
+                        grouped.setdefault(key(child), []).append(data)
+                    else:
+                        grouped[key(child)] = data
+            empty = {name: [] if many else None for name, (_, _, many) in self.joins.items()}
+
+            data = []
+            for row in rows:
+                item = {}
+                for name, getter, convert, relation in plan:
+                    if relation is not None and relation(row) is None:
+                        continue
+                    value = getter(row)
+                    if name in joined:
+                        item[name] = joined[name].get(value, empty[name])
+                    elif value is None or convert is None:
+                        item[name] = value
+                    else:
+                        item[name] = convert(value)
+                data.append(item)
+            return data
+
+
+class ProductReader(ListReader):
+    serializer_class = ProductSerializer
+    columns = {
+        'id': 'id',
+        'name': 'name',
+        'category': 'category',
+        'sku': 'sku',
+        'buy_price': 'buy_price',
+        'sell_price': 'sell_price',
+        'stock': 'stock',
+        'low_stock_threshold': 'low_stock_threshold',
+        'is_low_stock': Computed(
+            lambda row: row.stock <= row.low_stock_threshold, 'stock', 'low_stock_threshold',
+        ),
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+
+
+class CustomerReader(ListReader):
+    serializer_class = CustomerSerializer
+    columns = {
+        'id': 'id',
+        'name': 'name',
+        'phone': 'phone',
+        'email': 'email',
+        'city': 'city',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+
+
+class OrderItemReader(ListReader):
+    serializer_class = OrderItemReadSerializer
+    columns = {
+        'id': 'id',
+        'product': 'product',
+        'product_name': 'product__name',
+        'product_sku': 'product__sku',
+        'product_category': 'product__category',
+        'quantity': 'quantity',
+        'price_at_sale': 'price_at_sale',
+        'total_price': Computed(
+            lambda row: row.quantity * row.price_at_sale, 'quantity', 'price_at_sale',
+        ),
+    }
+    related = {'product': (ProductReader, 'product')}
+
+
+class OrderReader(ListReader):
+    serializer_class = OrderReadSerializer
+    columns = {
+        'id': 'id',
+        'customer': 'customer',
+        'customer_name': 'customer__name',
+        'order_date': 'order_date',
+        'payment_method': 'payment_method',
+        'total_amount': 'total_amount',
+        'item_count': 'item_count',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    nested = {'items': (OrderItemReader, 'order')}
+    related = {'customer': (CustomerReader, 'customer')}
+
+
+class ExpenseReader(ListReader):
+    serializer_class = ExpenseSerializer
+    columns = {
+        'id': 'id',
+        'category': 'category',
+        'amount': 'amount',
+        'date': 'date',
+        'note': 'note',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+
+
+class ListReaderMixin:
+    """
+    The list action answered by `list_reader` instead of the serializer,
+    with the same pagination and response; detail actions are unchanged.
+    """
+    list_reader = None
+
+    def list(self, request, *args, **kwargs):
+        if self.list_reader is None or not settings.FAST_LIST_READS:
+            return super().list(request, *args, **kwargs)
+
+        reader = self.list_reader.narrow(self.get_serializer())
+        queryset = reader.values(
+            self.filter_queryset(self.get_queryset()), getattr(self, 'keyset_field', 'created_at'),
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.read(page))
+        return Response(reader.read(list(queryset)))
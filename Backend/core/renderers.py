@@ -0,0 +1,75 @@
+"""
+JSON renderer on orjson, when it is installed.
+
+The output is byte-for-byte what rest_framework.renderers.JSONRenderer
+writes with this project's settings: compact, UTF-8, U+2028/U+2029
+escaped, UTC datetimes ending in "Z", and Decimal, lazy strings and the
+other types orjson does not know converted by DRF's own encoder. Whatever
+orjson would spell differently goes through the stock renderer instead:
+  - indented output (`Accept: application/json; indent=4`, browsable API)
+  - integers beyond 64 bits
+  - floats that repr() writes with an exponent (1e+16, 1.5e-05)
+  - UNICODE_JSON / COMPACT_JSON / STRICT_JSON turned off
+One difference remains: NaN and Infinity, which the stock renderer
+refuses, are written as null.
+"""
+import re
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # stock renderer only
+    orjson = None
+
+# orjson writes 1e16 / 1e-7 / 0.000015 where repr() writes 1e+16 / 1e-07 /
+# 1.5e-05. The full pattern is slow on large bodies, so a cheap one goes
+# first; a match inside a string only costs a fallback.
+EXPONENT_HINT = re.compile(rb'e[-1-9]')
+EXPONENT_FLOAT = re.compile(rb'[0-9]e[-1-9]')
+TINY_FLOAT = b'0.0000'
+
+
+def _floats_differ(ret):
+    if TINY_FLOAT in ret:
+        return True
+    return EXPONENT_HINT.search(ret) is not None and EXPONENT_FLOAT.search(ret) is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def __init__(self):
+        self._encoder = self.encoder_class()
+
+    def _default(self, obj):
+        # Decimals (SerializerMethodField totals) are by far the most common
+        # type orjson hands back; float() is what the encoder does too.
+        if type(obj) is Decimal:
+            return float(obj)
+        return self._encoder.default(obj)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self._default,
+                option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+            )
+        except (TypeError, ValueError):  # orjson.JSONEncodeError is a TypeError
+            return super().render(data, accepted_media_type, renderer_context)
+        if _floats_differ(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same escaping as JSONRenderer, so the output stays a JavaScript subset.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
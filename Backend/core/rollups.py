@@ -0,0 +1,266 @@
+"""
+Daily sales rollups.
+
+DailyProductSales and DailyPaymentSales hold revenue, quantity and cost per
+local calendar day, so the analytics views never scan raw orders. They are
+kept in step with writes by:
+  - record_orders(): incremental deltas for newly created orders
+  - refresh_days(): recompute whole days after edits and deletes
+  - rebuild():      recompute everything (manage.py rebuild_rollups)
+
+record_orders() and refresh_days() both lock a day's DailyPaymentSales
+rows first, so a refresh waits for orders being written on that day and
+the other way round.
+
+Days are computed in the current time zone; after changing TIME_ZONE run
+`manage.py rebuild_rollups`.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .analytics import LINE_TOTAL, start_of_day
+from . import cache
+from .models import Order, OrderItem, DailyProductSales, DailyPaymentSales
+
+# quantity * cost_at_sale, evaluated by the database.
+LINE_COST = ExpressionWrapper(
+    F('quantity') * F('cost_at_sale'),
+    output_field=DecimalField(max_digits=14, decimal_places=2),
+)
+
+CENT = Decimal("0.01")
+
+
+def order_day(order_date):
+    """Local calendar day an order belongs to."""
+    if settings.USE_TZ and timezone.is_aware(order_date):
+        return timezone.localdate(order_date)
+    return order_date.date()
+
+
+# ============================
+# INCREMENTAL UPDATES
+# ============================
+
+def _add(model, keys, **deltas):
+    """Add `deltas` to the row identified by `keys`, creating it if missing."""
+    increments = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(**keys).update(**increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:
+        # Another writer created the row first.
+        model.objects.filter(**keys).update(**increments)
+
+
+def _apply(model, key_fields, deltas):
+    """
+    Add {key: {field: delta}} to `model` rows: one SELECT, one bulk UPDATE
+    and one bulk INSERT for the whole set of keys.
+    """
+    if not deltas:
+        return
+    fields = list(next(iter(deltas.values())))
+    existing = {
+        tuple(getattr(row, f) for f in key_fields): row
+        for row in model.objects.select_for_update().filter(**{
+            f'{key_fields[0]}__in': {key[0] for key in deltas},
+            f'{key_fields[1]}__in': {key[1] for key in deltas},
+        })
+    }
+
+    changed, new = [], []
+    for key, delta in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            new.append(model(**dict(zip(key_fields, key)), **delta))
+            continue
+        for field, value in delta.items():
+            setattr(row, field, getattr(row, field) + value)
+        changed.append(row)
+
+    if changed:
+        model.objects.bulk_update(changed, fields, batch_size=500)
+    if new:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(new, batch_size=500)
+        except IntegrityError:
+            # Another writer created some of the rows first.
+            for row in new:
+                _add(
+                    model,
+                    {f: getattr(row, f) for f in key_fields},
+                    **{f: getattr(row, f) for f in fields},
+                )
+
+
+def record_orders(orders_with_items):
+    """
+    Add newly created orders to the rollups.
+    `orders_with_items` yields (order, items) pairs where items are
+    OrderItem instances with cost_at_sale set. Call inside the transaction
+    that creates the orders.
+    """
+    def zero():
+        return {'revenue': Decimal(0), 'quantity': 0, 'cost': Decimal(0)}
+
+    per_product = defaultdict(zero)
+    per_payment = defaultdict(lambda: {**zero(), 'order_count': 0})
+
+    for order, items in orders_with_items:
+        day = order_day(order.order_date)
+        payment = per_payment[day, order.payment_method]
+        payment['order_count'] += 1
+        for item in items:
+            revenue = item.quantity * item.price_at_sale
+            cost = item.total_cost
+            for totals in (per_product[day, item.product_id], payment):
+                totals['revenue'] += revenue
+                totals['quantity'] += item.quantity
+                totals['cost'] += cost
+
+    # Payment rows first: they are the per-day lock refresh_days() takes.
+    _apply(DailyPaymentSales, ('day', 'payment_method'), per_payment)
+    _apply(DailyProductSales, ('day', 'product_id'), per_product)
+
+
+def record_order(order, items):
+    """Add one newly created order to the rollups (see record_orders)."""
+    record_orders([(order, items)])
+
+
+# ============================
+# RECOMPUTATION
+# ============================
+
+def _compute(start=None, end=None):
+    """
+    Build (unsaved) rollup rows from raw orders, optionally limited to the
+    local days start..end inclusive. Three grouped queries in total.
+    """
+    tz = timezone.get_current_timezone()
+    items = OrderItem.objects.all()
+    orders = Order.objects.all()
+    if start is not None:
+        lower, upper = start_of_day(start), start_of_day(end + timedelta(days=1))
+        items = items.filter(order__order_date__gte=lower, order__order_date__lt=upper)
+        orders = orders.filter(order_date__gte=lower, order_date__lt=upper)
+
+    items = items.annotate(day=TruncDate('order__order_date', tzinfo=tz))
+    # `quantity` goes last so F('quantity') in the line expressions still
+    # refers to the column rather than to this annotation.
+    totals = dict(revenue=Sum(LINE_TOTAL), cost=Sum(LINE_COST), quantity=Sum('quantity'))
+
+    product_rows = [
+        DailyProductSales(**row)
+        for row in items.values('day', 'product_id').annotate(**totals).order_by()
+    ]
+
+    payment_rows = {}
+    order_counts = (
+        orders.annotate(day=TruncDate('order_date', tzinfo=tz))
+        .values('day', 'payment_method')
+        .annotate(order_count=Count('id'))
+        .order_by()
+    )
+    for row in order_counts:
+        payment_rows[row['day'], row['payment_method']] = DailyPaymentSales(**row)
+
+    item_totals = (
+        items.values('day', payment_method=F('order__payment_method'))
+        .annotate(**totals)
+        .order_by()
+    )
+    for row in item_totals:
+        rollup = payment_rows[row['day'], row['payment_method']]
+        rollup.revenue = row['revenue']
+        rollup.quantity = row['quantity']
+        rollup.cost = row['cost']
+
+    return product_rows, list(payment_rows.values())
+
+
+def _lock_day(day):
+    """
+    Lock the day's rollup rows, in record_orders()' order. Until commit,
+    orders written on that day wait in _apply(), and the ones that got
+    there first have committed, so _compute() sees all of them.
+    """
+    for model in (DailyPaymentSales, DailyProductSales):
+        list(model.objects.select_for_update().filter(day=day).values_list('pk', flat=True))
+
+
+def refresh_days(days):
+    """Recompute the rollups of the given local days from raw orders."""
+    for day in sorted(set(days)):
+        with transaction.atomic():
+            _lock_day(day)
+            product_rows, payment_rows = _compute(day, day)
+            DailyProductSales.objects.filter(day=day).delete()
+            DailyPaymentSales.objects.filter(day=day).delete()
+            DailyProductSales.objects.bulk_create(product_rows)
+            DailyPaymentSales.objects.bulk_create(payment_rows)
+
+
+def order_days(orders):
+    """Local days touched by an iterable/queryset of orders."""
+    if hasattr(orders, 'values_list'):
+        dates = orders.values_list('order_date', flat=True)
+    else:
+        dates = (order.order_date for order in orders)
+    return {order_day(value) for value in dates}
+
+
+def rebuild(batch_size=1000):
+    """Replace every rollup row with values recomputed from raw orders."""
+    product_rows, payment_rows = _compute()
+    with transaction.atomic():
+        DailyProductSales.objects.all().delete()
+        DailyPaymentSales.objects.all().delete()
+        DailyProductSales.objects.bulk_create(product_rows, batch_size=batch_size)
+        DailyPaymentSales.objects.bulk_create(payment_rows, batch_size=batch_size)
+        cache.invalidate()
+    return len(product_rows), len(payment_rows)
+
+
+def verify():
+    """
+    Compare stored rollups with values recomputed from raw orders.
+    Returns a list of human-readable differences (empty when in sync).
+    """
+    def snapshot(rows, key_fields, value_fields):
+        result = {}
+        for row in rows:
+            key = tuple(getattr(row, f) for f in key_fields)
+            result[key] = tuple(
+                Decimal(getattr(row, f) or 0).quantize(CENT) for f in value_fields
+            )
+        return result
+
+    product_fields = ('revenue', 'quantity', 'cost')
+    payment_fields = ('revenue', 'quantity', 'cost', 'order_count')
+    expected_products, expected_payments = _compute()
+
+    differences = []
+    for label, model, expected, keys, fields in (
+        ('product', DailyProductSales, expected_products, ('day', 'product_id'), product_fields),
+        ('payment', DailyPaymentSales, expected_payments, ('day', 'payment_method'), payment_fields),
+    ):
+        want = snapshot(expected, keys, fields)
+        have = snapshot(model.objects.all(), keys, fields)
+        for key in sorted(set(want) | set(have), key=str):
+            if want.get(key) != have.get(key):
+                differences.append(
+                    f"{label} {key}: stored {have.get(key)} expected {want.get(key)}"
+                )
+    return differences
@@ -1,11 +1,77 @@
 from django.db import transaction
 from rest_framework import serializers
-from .models import Product, Customer, Order, OrderItem, Expense
+from .models import Product, Customer, Order, OrderItem, Expense, StockMovement
+from . import customer_stats, inventory, ledger, metrics, rollups
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with metrics.phase('serialize'):
+            return super().data
+
+
+class TimedSerializerMixin:
+    """Reports the time spent building `.data` in the Server-Timing header."""
+
+    @property
+    def data(self):
+        with metrics.phase('serialize'):
+            return super().data
+
+
+class SparseFieldsetMixin:
+    """
+    Read serializers narrowed by the `fields` / `expand` trees of
+    core.fieldsets: fields that were not requested are dropped, and the
+    fields in `expandable_fields` become the given serializer instead of
+    an id. Nested serializers get the matching subtrees.
+    """
+    # field name -> serializer class used when the field is expanded
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        self.requested_fields = fields
+        self.requested_expand = expand or {}
+        self.field_path = ''
+        super().__init__(*args, **kwargs)
+
+    @property
+    def narrowed(self):
+        return self.requested_fields is not None or bool(self.requested_expand)
+
+    def get_fields(self):
+        fields = super().get_fields()
+
+        for name in self.requested_expand:
+            if name in self.expandable_fields:
+                fields[name] = self.expandable_fields[name](read_only=True)
+            elif not isinstance(getattr(fields.get(name), 'child', fields.get(name)), SparseFieldsetMixin):
+                raise serializers.ValidationError(
+                    {'expand': [f"'{self.field_path}{name}' cannot be expanded."]}
+                )
+
+        if self.requested_fields is not None:
+            unknown = [name for name in self.requested_fields if name not in fields]
+            if unknown:
+                raise serializers.ValidationError(
+                    {'fields': [f"Unknown field '{self.field_path}{name}'." for name in unknown]}
+                )
+            fields = {name: field for name, field in fields.items() if name in self.requested_fields}
+
+        for name, field in fields.items():
+            child = getattr(field, 'child', field)
+            if isinstance(child, SparseFieldsetMixin):
+                child.field_path = f'{self.field_path}{name}.'
+                child.requested_fields = (self.requested_fields or {}).get(name)
+                child.requested_expand = self.requested_expand.get(name) or {}
+        return fields
+
+
+class ProductSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'name', 'category', 'sku',
             'buy_price', 'sell_price', 'stock',
@@ -14,10 +80,59 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'is_low_stock', 'created_at', 'updated_at']
 
+    # Stock set through the API is recorded in the stock ledger.
 
-class CustomerSerializer(serializers.ModelSerializer):
+    def create(self, validated_data):
+        with transaction.atomic():
+            product = super().create(validated_data)
+            ledger.record_change(product, product.stock, StockMovement.RESTOCK, "Opening stock")
+        return product
+
+    def update(self, instance, validated_data):
+        if 'stock' not in validated_data:
+            # Save only the edited columns: writing back the stock read at
+            # the start of the request would undo a sale or adjustment
+            # made since.
+            for name, value in validated_data.items():
+                setattr(instance, name, value)
+            instance.save(update_fields=[*validated_data, 'updated_at'])
+            instance.refresh_from_db(fields=['stock'])
+            return instance
+        with transaction.atomic():
+            previous = ledger.locked_stock(instance.pk)
+            product = super().update(instance, validated_data)
+            ledger.record_change(product, product.stock - previous, note="Edited")
+        return product
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """
+    POST /api/products/{id}/stock/
+    {"quantity": 25, "kind": "RESTOCK", "note": "Delivery #118"}
+    A negative quantity removes stock (shrinkage, damage, a recount).
+    """
+    quantity = serializers.IntegerField()
+    kind = serializers.ChoiceField(
+        choices=[StockMovement.RESTOCK, StockMovement.ADJUSTMENT],
+        default=StockMovement.ADJUSTMENT,
+    )
+    note = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+
+    def validate_quantity(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Must not be 0.")
+        return value
+
+    def validate(self, data):
+        if data['kind'] == StockMovement.RESTOCK and data['quantity'] < 0:
+            raise serializers.ValidationError({'quantity': ["A restock must add stock."]})
+        return data
+
+
+class CustomerSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'name', 'phone', 'email', 'city',
             'created_at', 'updated_at',
@@ -29,12 +144,14 @@ class CustomerSerializer(serializers.ModelSerializer):
 # ORDER READ SERIALIZERS
 # ============================
 
-class OrderItemReadSerializer(serializers.ModelSerializer):
+class OrderItemReadSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_sku = serializers.CharField(source='product.sku', read_only=True)
     product_category = serializers.CharField(source='product.category', read_only=True)
     total_price = serializers.SerializerMethodField()
 
+    expandable_fields = {'product': ProductSerializer}
+
     class Meta:
         model = OrderItem
         fields = [
@@ -53,20 +170,23 @@ class OrderItemReadSerializer(serializers.ModelSerializer):
         return obj.total_price
 
 
-class OrderReadSerializer(serializers.ModelSerializer):
+class OrderReadSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemReadSerializer(many=True, read_only=True)
     total_amount = serializers.SerializerMethodField()
     customer_name = serializers.CharField(source='customer.name', read_only=True)
 
+    expandable_fields = {'customer': CustomerSerializer}
+
     class Meta:
         model = Order
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'customer', 'customer_name',
             'order_date', 'payment_method',
-            'items', 'total_amount',
+            'items', 'total_amount', 'item_count',
             'created_at', 'updated_at',
         ]
-        read_only_fields = ['id', 'total_amount', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'total_amount', 'item_count', 'created_at', 'updated_at']
 
     def get_total_amount(self, obj):
         return obj.total_amount
@@ -93,7 +213,7 @@ class OrderItemWriteSerializer(serializers.Serializer):
     )
 
 
-class OrderWriteSerializer(serializers.ModelSerializer):
+class OrderWriteSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     items = OrderItemWriteSerializer(many=True)
 
     class Meta:
@@ -107,32 +227,49 @@ class OrderWriteSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         items_data = validated_data.pop('items', [])
 
-        with transaction.atomic():
-            order = Order.objects.create(**validated_data)
-
-            for item_data in items_data:
-                product = item_data['product']
-                quantity = item_data['quantity']
-                price_at_sale = item_data.get('price_at_sale') or product.sell_price
-
-                # Create order item
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    quantity=quantity,
-                    price_at_sale=price_at_sale,
+        items = [
+            OrderItem(
+                product=item_data['product'],
+                quantity=item_data['quantity'],
+                price_at_sale=item_data.get('price_at_sale') or item_data['product'].sell_price,
+                cost_at_sale=item_data['product'].buy_price,
+            )
+            for item_data in items_data
+        ]
+
+        try:
+            with transaction.atomic():
+                # One conditional UPDATE for the whole order; rolls back
+                # everything if any product is short.
+                inventory.reserve_stock(inventory.quantities_by_product(items))
+
+                order = Order.objects.create(
+                    **validated_data,
+                    total_amount=sum(item.total_price for item in items),
+                    item_count=len(items),
                 )
 
-                # Update product stock
-                product.stock = product.stock - quantity
-                product.save()
+                # Totals are already set, so skip OrderItem.save()'s refresh.
+                for item in items:
+                    item.order = order
+                OrderItem.objects.bulk_create(items)
+
+                ledger.record_sales([(order, items)])
+                rollups.record_order(order, items)
+                customer_stats.record_orders([order])
+        except inventory.InsufficientStock as exc:
+            raise serializers.ValidationError({
+                'items': [str(exc) + '.'],
+                'short_skus': exc.short_skus,
+            })
 
         return order
 
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Expense
+        list_serializer_class = TimedListSerializer
         fields = [
             'id', 'category', 'amount', 'date',
             'note', 'created_at', 'updated_at',
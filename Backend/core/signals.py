@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Product, Customer, Order, OrderItem, Expense
+from . import cache, customer_stats, metrics
+
+ANALYTICS_SOURCES = (Product, Customer, Order, OrderItem, Expense)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_analytics(sender, **kwargs):
+    """Any write to a model the dashboards read makes cached analytics stale."""
+    if sender in ANALYTICS_SOURCES:
+        cache.invalidate()
+
+
+@receiver(post_save, sender=Customer)
+def sync_customer_stats(sender, instance, created, raw=False, **kwargs):
+    """Every customer has a CustomerStats row carrying its current city."""
+    if not raw:
+        customer_stats.sync_customer(instance, created)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to each new SQLite connection."""
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def record_queries(sender, connection, **kwargs):
+    """Count every query against the request being served (core.metrics)."""
+    metrics.install(connection)
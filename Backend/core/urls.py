@@ -10,6 +10,19 @@ from .views import (
     MonthlySalesView,
     TopProductsView,
     ExpensesSummaryView,
+    DashboardView,
+    ProductProfitView,
+    CategoryProfitView,
+    PeriodProfitView,
+    ProfitLossView,
+    TopCustomersView,
+    CustomerRFMView,
+    CustomersByCityView,
+    AnalyticsCacheStatsView,
+    MetricsView,
+    ProfileListView,
+    ProfileDetailView,
+    ExportView,
 )
 
 router = DefaultRouter()
@@ -27,4 +40,21 @@ urlpatterns = [
     path('analytics/monthly-sales/', MonthlySalesView.as_view(), name='monthly-sales'),
     path('analytics/top-products/', TopProductsView.as_view(), name='top-products'),
     path('analytics/expenses-summary/', ExpensesSummaryView.as_view(), name='expenses-summary'),
+    path('analytics/profit/products/', ProductProfitView.as_view(), name='profit-products'),
+    path('analytics/profit/categories/', CategoryProfitView.as_view(), name='profit-categories'),
+    path('analytics/profit/periods/', PeriodProfitView.as_view(), name='profit-periods'),
+    path('analytics/profit-loss/', ProfitLossView.as_view(), name='profit-loss'),
+    path('analytics/customers/top/', TopCustomersView.as_view(), name='top-customers'),
+    path('analytics/customers/rfm/', CustomerRFMView.as_view(), name='customer-rfm'),
+    path('analytics/customers/by-city/', CustomersByCityView.as_view(), name='customers-by-city'),
+    path('analytics/dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('analytics/cache-stats/', AnalyticsCacheStatsView.as_view(), name='analytics-cache-stats'),
+
+    # Request metrics (admin only)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('profiles/', ProfileListView.as_view(), name='profile-list'),
+    path('profiles/<str:profile_id>/', ProfileDetailView.as_view(), name='profile-detail'),
+
+    # Streaming exports: /api/export/orders/?output=csv
+    path('export/<slug:dataset>/', ExportView.as_view(), name='export'),
 ]
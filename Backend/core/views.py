@@ -1,60 +1,218 @@
-from datetime import date, timedelta
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Sum
-from rest_framework import viewsets
+import io
+import time
+from datetime import timedelta
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from django.db import transaction
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from .models import Product, Customer, Order, Expense
+from .models import (
+    Customer,
+    Product,
+    Order,
+    OrderItem,
+    Expense,
+)
+from .analytics import (
+    category_profit,
+    customer_rfm,
+    customers_by_city,
+    expenses_between,
+    expenses_by_category,
+    parse_date_param,
+    parse_customer_params,
+    parse_limit,
+    parse_profit_params,
+    parse_rfm_params,
+    parse_series_params,
+    period_profit,
+    product_profit,
+    profit_loss,
+    sales_series,
+    sales_summary,
+    start_of_day,
+    top_customers,
+    top_products,
+)
+from . import (
+    cache, customer_stats, dashboard, exports, ingest, inventory, ledger, metrics, profiling, rollups,
+)
+from .cache import cached_response
+from .conditional import ConditionalViewSetMixin
+from .fieldsets import SparseFieldsetViewMixin, subtree, wants
+from .filters import PrefixSearchFilter, ProductFilter
+from .readers import (
+    ListReaderMixin,
+    ProductReader,
+    CustomerReader,
+    OrderReader,
+    ExpenseReader,
+)
 from .serializers import (
     ProductSerializer,
     CustomerSerializer,
     OrderReadSerializer,
     OrderWriteSerializer,
     ExpenseSerializer,
+    StockAdjustmentSerializer,
 )
 
 # ============================
 # CRUD VIEWSETS
 # ============================
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalViewSetMixin, SparseFieldsetViewMixin, ListReaderMixin,
+                     viewsets.ModelViewSet):
     """
-    CRUD API for Products.
+    CRUD API for Products, filtered by category, low stock, price range
+    and name/SKU prefix (see core.filters).
     """
-    queryset = Product.objects.all().order_by('-created_at')
+    queryset = Product.objects.all().order_by('-created_at', '-id')
     serializer_class = ProductSerializer
+    list_reader = ProductReader()
+    filter_backends = [ProductFilter, PrefixSearchFilter]
+    search_fields = ('name', 'sku')
+    keyset_field = 'created_at'
     permission_classes = [IsAuthenticated]
 
-
-class CustomerViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get', 'post'])
+    def stock(self, request, pk=None):
+        """
+        GET:  stock from the stock ledger, at the end of ?at=YYYY-MM-DD
+              (now without it): {"product": 1, "at": "2025-01-10", "stock": 12}
+        POST: restock or adjust, see StockAdjustmentSerializer; returns the
+              new stock. Removing more than is in stock is a 400.
+        """
+        product = self.get_object()
+        if request.method == 'GET':
+            at = parse_date_param(request.query_params, "at")
+            moment = start_of_day(at + timedelta(days=1)) if at else timezone.now()
+            stock = ledger.stock_at(moment, Product.objects.filter(pk=product.pk))[product.pk]
+            return Response({
+                "product": product.pk,
+                "at": at.isoformat() if at else None,
+                "stock": stock,
+            })
+
+        serializer = StockAdjustmentSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            stock = ledger.adjust(product, **serializer.validated_data)
+        except inventory.InsufficientStock as exc:
+            raise ValidationError({'quantity': [str(exc) + '.'], 'short_skus': exc.short_skus})
+        return Response({"product": product.pk, "at": None, "stock": stock})
+
+
+class CustomerViewSet(ConditionalViewSetMixin, SparseFieldsetViewMixin, ListReaderMixin,
+                      viewsets.ModelViewSet):
     """
-    CRUD API for Customers.
+    CRUD API for Customers, searchable by name/phone prefix.
     """
-    queryset = Customer.objects.all().order_by('-created_at')
+    queryset = Customer.objects.all().order_by('-created_at', '-id')
     serializer_class = CustomerSerializer
+    list_reader = CustomerReader()
+    filter_backends = [PrefixSearchFilter]
+    search_fields = ('name', 'phone')
+    keyset_field = 'created_at'
     permission_classes = [IsAuthenticated]
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalViewSetMixin, SparseFieldsetViewMixin, ListReaderMixin,
+                   viewsets.ModelViewSet):
     """
     CRUD API for Orders, with different serializers for read/write.
     """
-    queryset = Order.objects.all().order_by('-order_date')
+    queryset = Order.objects.all().order_by('-order_date', '-id')
     permission_classes = [IsAuthenticated]
+    list_reader = OrderReader()
+    keyset_field = 'order_date'
+    # Orders embed customer and product names.
+    conditional_dependencies = ('customer', 'items__product')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            # Orders with customer_name, then the nested items with their
+            # product fields: two queries per page, however many orders.
+            # Joins and the items query are skipped when ?fields= leaves
+            # out what they are for.
+            fields, expand = self.get_selection()
+            if wants(fields, 'customer_name') or 'customer' in expand:
+                queryset = queryset.select_related('customer')
+            if wants(fields, 'items'):
+                items = OrderItem.objects.all()
+                item_fields, item_expand = subtree(fields, 'items'), subtree(expand, 'items') or {}
+                product_fields = ('product_name', 'product_sku', 'product_category')
+                if 'product' in item_expand or any(wants(item_fields, name) for name in product_fields):
+                    items = items.select_related('product')
+                queryset = queryset.prefetch_related(Prefetch('items', queryset=items))
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ['create', 'update', 'partial_update']:
             return OrderWriteSerializer
         return OrderReadSerializer
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            days = {rollups.order_day(serializer.instance.order_date)}
+            customers = {serializer.instance.customer_id}
+            order = serializer.save()
+            rollups.refresh_days(days | {rollups.order_day(order.order_date)})
+            customer_stats.refresh_customers(customers | {order.customer_id})
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            rollups.refresh_days({rollups.order_day(instance.order_date)})
+            customer_stats.refresh_customers({instance.customer_id})
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Bulk-create orders: a JSON list of order payloads (or {"orders": [...]}),
+        or a CSV upload in the `file` field. See core.ingest for the formats.
+        Invalid rows are reported per index and skipped.
+        """
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                raw_orders = ingest.orders_from_csv(
+                    io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+                )
+            except UnicodeDecodeError:
+                raise ValidationError({"file": "CSV must be UTF-8."})
+        elif isinstance(request.data, list):
+            raw_orders = request.data
+        elif isinstance(request.data, dict):
+            raw_orders = request.data.get('orders')
+        else:
+            raw_orders = None
+        if not isinstance(raw_orders, list):
+            raise ValidationError({"orders": "Expected a list of orders or a CSV file."})
+
+        report = ingest.ingest_orders(raw_orders)
+        return Response(
+            report,
+            status=status.HTTP_201_CREATED if report['created'] else status.HTTP_400_BAD_REQUEST,
+        )
+
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(ConditionalViewSetMixin, SparseFieldsetViewMixin, ListReaderMixin,
+                     viewsets.ModelViewSet):
     """
     CRUD API for Expenses.
     """
-    queryset = Expense.objects.all().order_by('-date')
+    queryset = Expense.objects.all().order_by('-date', '-id')
     serializer_class = ExpenseSerializer
+    list_reader = ExpenseReader()
+    keyset_field = 'date'
     permission_classes = [IsAuthenticated]
 
 
@@ -75,130 +233,297 @@ class SalesSummaryView(APIView):
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_response('sales-summary')
     def get(self, request, format=None):
-        today = date.today()
-        start_of_month = today.replace(day=1)
+        return Response(sales_summary())
 
-        orders = Order.objects.all().prefetch_related('items__product')
 
-        total_revenue = 0
-        today_sales = 0
-        month_sales = 0
+class MonthlySalesView(APIView):
+    """
+    Sales time series, bucketed in the database.
+    Query params:
+      ?granularity=day|week|month|quarter (default month)
+      ?start=YYYY-MM-DD (default one year before end)
+      ?end=YYYY-MM-DD (default today)
+    Empty buckets are returned with 0.
+    Response example (granularity=month):
+    [
+      {"month": "2025-01", "total_sales": 12345.50},
+      {"month": "2025-02", "total_sales": 9876.00}
+    ]
+    """
+    permission_classes = [IsAuthenticated]
 
-        for order in orders:
-            order_total = order.total_amount or 0
+    @cached_response('monthly-sales')
+    def get(self, request, format=None):
+        granularity, start, end = parse_series_params(request.query_params)
+        return Response(sales_series(granularity, start, end))
 
-            total_revenue += order_total
 
-            if order.order_date.date() == today:
-                today_sales += order_total
+class TopProductsView(APIView):
+    """
+    Top N products by quantity sold.
+    Query param: ?limit=5 (default 5)
+    """
+    permission_classes = [IsAuthenticated]
 
-            if order.order_date.date() >= start_of_month:
-                month_sales += order_total
+    @cached_response('top-products')
+    def get(self, request, format=None):
+        return Response(top_products(parse_limit(request.query_params)))
 
-        total_expense = (
-            Expense.objects.aggregate(total=Sum('amount'))['total'] or 0
-        )
-        total_profit = total_revenue - total_expense
-
-        data = {
-            "today_sales": float(today_sales),
-            "month_sales": float(month_sales),
-            "total_revenue": float(total_revenue),
-            "total_expense": float(total_expense),
-            "total_profit": float(total_profit),
-            "total_orders": orders.count(),
-            "total_customers": Customer.objects.count(),
-        }
 
-        return Response(data)
+class ExpensesSummaryView(APIView):
+    """
+    Expenses grouped by category.
+    Optional filters:
+      ?start=YYYY-MM-DD
+      ?end=YYYY-MM-DD
+    """
+    permission_classes = [IsAuthenticated]
 
+    @cached_response('expenses-summary')
+    def get(self, request, format=None):
+        start = parse_date_param(request.query_params, "start")
+        end = parse_date_param(request.query_params, "end")
+        return Response(expenses_by_category(expenses_between(start, end)))
 
-class MonthlySalesView(APIView):
+
+class ProductProfitView(APIView):
     """
-    Sales grouped by month for last 12 months.
-    Response example:
+    Revenue, cost, gross profit and margin % per product.
+    Query params:
+      ?start=YYYY-MM-DD / ?end=YYYY-MM-DD
+      ?category=Snacks (repeatable or comma-separated)
+      ?order_by=profit|revenue|quantity|margin (default profit, descending)
+      ?limit=20
+    Costs are the buy prices at the time of sale.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @cached_response('profit-products')
+    def get(self, request, format=None):
+        return Response(product_profit(**parse_profit_params(request.query_params)))
+
+
+class CategoryProfitView(APIView):
+    """
+    Revenue, cost, gross profit and margin % per product category.
+    Same query params as ProductProfitView.
+    """
+    permission_classes = [IsAuthenticated]
+
+    @cached_response('profit-categories')
+    def get(self, request, format=None):
+        return Response(category_profit(**parse_profit_params(request.query_params)))
+
+
+class PeriodProfitView(APIView):
+    """
+    Revenue, cost, gross profit and margin % per time bucket.
+    Query params: ?granularity=, ?start=, ?end= as for monthly-sales, and
+    ?category= to restrict to some product categories.
+    Response example (granularity=month):
     [
-      {"month": "2025-01", "total_sales": 12345.50},
-      {"month": "2025-02", "total_sales": 9876.00}
+      {"month": "2025-01", "quantity": 310, "revenue": 12345.5, "cost": 8100.0,
+       "profit": 4245.5, "margin_pct": 34.39}
+    ]
+    """
+    permission_classes = [IsAuthenticated]
+
+    @cached_response('profit-periods')
+    def get(self, request, format=None):
+        granularity, start, end = parse_series_params(request.query_params)
+        categories = parse_profit_params(request.query_params)['categories']
+        return Response(period_profit(granularity, start, end, categories))
+
+
+class ProfitLossView(APIView):
+    """
+    Profit & loss per time bucket, with the change from the bucket before.
+    Query params: ?granularity=, ?start=, ?end= as for monthly-sales;
+    buckets are whole, starting with the one that contains ?start=.
+    Response example (granularity=month):
+    [
+      {"month": "2025-01", "revenue": 12345.5, "cost_of_goods": 8100.0,
+       "gross_profit": 4245.5, "expenses": {"Rent": 1500.0, "Salaries": 2000.0},
+       "total_expenses": 3500.0, "net_profit": 745.5, "net_margin_pct": 6.04,
+       "previous_net_profit": 512.0, "net_profit_change": 233.5,
+       "revenue_change_pct": 4.21, "partial": false}
     ]
+    `expenses` has the same categories in every bucket; the change fields
+    compare with the previous bucket, and the percentages are null when
+    there is nothing to divide by. The bucket still in progress (past
+    ?end= or today) has "partial": true and null change fields.
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_response('profit-loss')
     def get(self, request, format=None):
-        today = date.today()
-        one_year_ago = today.replace(year=today.year - 1)
+        granularity, start, end = parse_series_params(request.query_params)
+        return Response(profit_loss(granularity, start, end))
 
-        orders = Order.objects.filter(order_date__date__gte=one_year_ago)
 
-        monthly_totals = {}  # {"YYYY-MM": Decimal}
+class TopCustomersView(APIView):
+    """
+    Best customers, from the per-customer stats.
+    Query params: ?order_by=revenue|orders|recent (default revenue), ?limit= (default 10)
+    Response example:
+    [
+      {"customer_id": 7, "name": "Asha", "city": "Surat", "order_count": 42,
+       "revenue": 18250.0, "average_basket": 434.52,
+       "first_order_at": "2024-02-01T10:12:00Z", "last_order_at": "2025-06-30T18:40:00Z"}
+    ]
+    """
+    permission_classes = [IsAuthenticated]
 
-        for order in orders:
-            key = order.order_date.strftime("%Y-%m")
-            monthly_totals.setdefault(key, 0)
-            monthly_totals[key] += order.total_amount or 0
+    @cached_response('top-customers')
+    def get(self, request, format=None):
+        return Response(top_customers(**parse_customer_params(request.query_params)))
 
-        result = [
-            {"month": month, "total_sales": float(total)}
-            for month, total in sorted(monthly_totals.items())
-        ]
-        return Response(result)
 
+class CustomerRFMView(APIView):
+    """
+    RFM segments of the customers with orders (see analytics.customer_rfm).
+    Query params: ?segment=champions|loyal|new|promising|at_risk|hibernating
+    to list that segment's customers by revenue, ?limit= (default 20)
+    Response example:
+    {
+      "customers_with_orders": 1840,
+      "thresholds": {"recency": ["2025-01-03T...", ...], "frequency": [1, 2, 3, 6],
+                     "monetary": [450.0, 1200.0, 2600.0, 6100.0]},
+      "segments": [{"segment": "champions", "customers": 301, "revenue": 912000.0}, ...],
+      "customers": [{..., "rfm": {"recency": 5, "frequency": 5, "monetary": 4}}]
+    }
+    """
+    permission_classes = [IsAuthenticated]
 
-class TopProductsView(APIView):
+    @cached_response('customer-rfm')
+    def get(self, request, format=None):
+        return Response(customer_rfm(**parse_rfm_params(request.query_params)))
+
+
+class CustomersByCityView(APIView):
     """
-    Top N products by quantity sold.
-    Query param: ?limit=5 (default 5)
+    Customers and revenue per city, largest first; with ?city=, that
+    city's customers by revenue (rows as in top-customers).
+    Query params: ?city=, ?limit= (default 20)
+    Response example (no ?city=):
+    [{"city": "Surat", "customers": 410, "revenue": 523000.0}]
     """
     permission_classes = [IsAuthenticated]
 
+    @cached_response('customers-by-city')
     def get(self, request, format=None):
-        top_n = int(request.query_params.get("limit", 5))
+        return Response(customers_by_city(
+            request.query_params.get("city"),
+            parse_limit(request.query_params, default=20, maximum=1000),
+        ))
 
-        products = (
-            Product.objects
-            .annotate(total_quantity=Sum('order_items__quantity'))
-            .filter(total_quantity__isnull=False)
-            .order_by('-total_quantity')[:top_n]
-        )
 
-        data = [
-            {
-                "product_id": p.id,
-                "name": p.name,
-                "sku": p.sku,
-                "category": p.category,
-                "total_quantity": int(p.total_quantity or 0),
-            }
-            for p in products
-        ]
+class DashboardView(APIView):
+    """
+    All dashboard panels in one response, computed concurrently.
+    Query params:
+      ?panels=summary,monthly_sales,top_products,expenses,low_stock
+              (default summary,monthly_sales,top_products)
+      ?start=YYYY-MM-DD / ?end=YYYY-MM-DD  window shared by the panels
+      ?granularity=, ?limit=  as for monthly-sales and top-products
+    Per-panel timings are returned under "meta". The panels are cached;
+    "meta" is not, so a cache hit reports no panel timings, and the ETag
+    is weak since "meta" differs between otherwise equal responses.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, format=None):
+        started = time.perf_counter()
+        computed = {}
+        response = self.panels(request, computed)
+        if response.status_code == status.HTTP_200_OK:
+            meta = computed.get('meta') or dashboard.cached_meta(request.query_params, started)
+            response.data = {**response.data, "meta": meta}
+        return response
+
+    @cached_response('dashboard', weak=True)
+    def panels(self, request, computed):
+        data = dashboard.build_dashboard(request.query_params)
+        computed['meta'] = data.pop('meta')
         return Response(data)
 
 
-class ExpensesSummaryView(APIView):
+class AnalyticsCacheStatsView(APIView):
     """
-    Expenses grouped by category.
-    Optional filters:
-      ?start=YYYY-MM-DD
-      ?end=YYYY-MM-DD
+    Hit/miss/304 counters of the analytics response cache (admin only).
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAdminUser]
 
     def get(self, request, format=None):
-        start_str = request.query_params.get("start")
-        end_str = request.query_params.get("end")
+        return Response(cache.stats())
 
-        qs = Expense.objects.all()
 
-        if start_str:
-            qs = qs.filter(date__gte=start_str)
-        if end_str:
-            qs = qs.filter(date__lte=end_str)
+class MetricsView(APIView):
+    """
+    Per-route latency histograms and query counts of this worker process,
+    in the Prometheus text format (admin only).
+    """
+    permission_classes = [IsAdminUser]
 
-        grouped = (
-            qs.values("category")
-            .annotate(total_amount=Sum("amount"))
-            .order_by("-total_amount")
+    def get(self, request, format=None):
+        return HttpResponse(
+            metrics.render_text(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
         )
 
-        return Response(list(grouped))
+
+class ProfileListView(APIView):
+    """
+    Request profiles taken with `X-Profile: 1`, newest first (admin only).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(profiling.list_profiles())
+
+
+class ProfileDetailView(APIView):
+    """
+    Download one stored profile (admin only).
+    Query param: ?file=prof (default, for pstats/snakeviz) | summary
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, profile_id, format=None):
+        kind = request.query_params.get('file', 'prof')
+        if kind not in ('prof', 'summary'):
+            raise ValidationError({"file": "Must be one of: prof, summary."})
+        path = profiling.file_path(profile_id, kind)
+        if path is None:
+            raise NotFound(f"Unknown profile '{profile_id}'.")
+        if kind == 'summary':
+            return FileResponse(open(path, 'rb'), content_type='text/plain; charset=utf-8')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"{profile_id}.prof")
+
+
+# ============================
+# EXPORTS
+# ============================
+
+class ExportView(APIView):
+    """
+    Streams a full dataset as CSV or NDJSON without building it in memory.
+    Under ASGI core.async_views.export serves this route instead.
+    URL: /api/export/<dataset>/ with dataset in orders, order-items, expenses
+    Query params:
+      ?output=csv|ndjson (default csv)
+      ?start=YYYY-MM-DD
+      ?end=YYYY-MM-DD
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, dataset, format=None):
+        output, start, end = exports.parse_export_params(dataset, request.query_params)
+        response = StreamingHttpResponse(
+            exports.iter_export(dataset, output, start, end),
+            content_type=exports.CONTENT_TYPES[output],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+        return response
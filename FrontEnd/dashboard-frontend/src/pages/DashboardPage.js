@@ -13,14 +13,12 @@ export default function DashboardPage() {
     async function fetchData() {
       try {
         setLoading(true);
-        const [summaryRes, monthlyRes, topRes] = await Promise.all([
-          api.get("/analytics/sales-summary/"),
-          api.get("/analytics/monthly-sales/"),
-          api.get("/analytics/top-products/?limit=5"),
-        ]);
-        setSummary(summaryRes.data);
-        setMonthlySales(monthlyRes.data);
-        setTopProducts(topRes.data);
+        const res = await api.get(
+          "/analytics/dashboard/?panels=summary,monthly_sales,top_products&limit=5"
+        );
+        setSummary(res.data.summary);
+        setMonthlySales(res.data.monthly_sales);
+        setTopProducts(res.data.top_products);
       } catch (err) {
         console.error(err);
         setError("Failed to load analytics.");
@@ -4,6 +4,7 @@ import { useToasts } from "../components/ToastContext";
 
 export default function ExpensesPage() {
   const [items, setItems] = useState([]);
+  const [next, setNext] = useState(null);
   const [form, setForm] = useState({
     category: "",
     amount: "",
@@ -21,13 +22,25 @@ export default function ExpensesPage() {
   const load = async () => {
     try {
       const res = await api.get("/expenses/");
-      setItems(res.data);
+      setItems(res.data.results);
+      setNext(res.data.next);
     } catch (err) {
       console.error(err);
       push("Failed to load expenses", "error");
     }
   };
 
+  const loadMore = async () => {
+    try {
+      const res = await api.get(next);
+      setItems(prev => [...prev, ...res.data.results]);
+      setNext(res.data.next);
+    } catch (err) {
+      console.error(err);
+      push("Failed to load more expenses", "error");
+    }
+  };
+
   const createExpense = async (e) => {
     e.preventDefault();
 
@@ -132,6 +145,7 @@ export default function ExpensesPage() {
           </tbody>
         </table>
       )}
+      {next && <button className="secondary" style={{ marginTop: 12 }} onClick={loadMore}>Load more</button>}
     </div>
   );
 }
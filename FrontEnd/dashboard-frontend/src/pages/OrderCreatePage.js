@@ -4,19 +4,48 @@ import api from "../api";
 import { useNavigate } from "react-router-dom";
 import { useToasts } from "../components/ToastContext";
 
+// Dropdowns are filled by server-side prefix search (?search=), one page at a time.
+const SEARCH_PAGE_SIZE = 50;
+const SEARCH_DELAY_MS = 250;
+
 export default function OrderCreatePage() {
   const [products, setProducts] = useState([]);
+  const [knownProducts, setKnownProducts] = useState({});
+  const [productQuery, setProductQuery] = useState("");
   const [customerId, setCustomerId] = useState("");
   const [orderDate, setOrderDate] = useState(new Date().toISOString().slice(0, 16));
   const [items, setItems] = useState([{ product: "", quantity: 1 }]);
   const [customers, setCustomers] = useState([]);
+  const [customerQuery, setCustomerQuery] = useState("");
   const navigate = useNavigate();
   const { push } = useToasts();
 
   useEffect(() => {
-    api.get("/products/").then(res => setProducts(res.data)).catch(() => push("Failed to load products", "error"));
-    api.get("/customers/").then(res => setCustomers(res.data)).catch(() => push("Failed to load customers", "error"));
-  }, [push]);
+    const timer = setTimeout(() => {
+      api.get("/products/", { params: { search: productQuery, page_size: SEARCH_PAGE_SIZE, fields: "id,name,sku,stock" } })
+        .then(res => {
+          setProducts(res.data.results);
+          // Products already picked stay selectable when a new search drops them.
+          setKnownProducts(prev => ({ ...prev, ...Object.fromEntries(res.data.results.map(p => [p.id, p])) }));
+        })
+        .catch(() => push("Failed to load products", "error"));
+    }, SEARCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [productQuery, push]);
+
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      api.get("/customers/", { params: { search: customerQuery, page_size: SEARCH_PAGE_SIZE, fields: "id,name" } })
+        .then(res => setCustomers(res.data.results))
+        .catch(() => push("Failed to load customers", "error"));
+    }, SEARCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [customerQuery, push]);
+
+  const productOptions = (selectedId) => {
+    const selected = knownProducts[Number(selectedId)];
+    return selected && !products.some(p => p.id === selected.id) ? [selected, ...products] : products;
+  };
 
   const addItem = () => setItems([...items, { product: "", quantity: 1 }]);
   const removeItem = (idx) => setItems(items.filter((_, i) => i !== idx));
@@ -32,7 +61,7 @@ export default function OrderCreatePage() {
     for (const it of items) {
       if (!it.product) { push("Select product for all items", "error"); return; }
       if (!it.quantity || Number(it.quantity) <= 0) { push("Quantity must be >= 1", "error"); return; }
-      const prod = products.find(p => p.id === Number(it.product));
+      const prod = knownProducts[Number(it.product)];
       if (prod && Number(it.quantity) > prod.stock) { push(`Not enough stock for ${prod.name}`, "error"); return; }
     }
 
@@ -58,6 +87,7 @@ export default function OrderCreatePage() {
       <form onSubmit={handleSubmit}>
         <div style={{ marginBottom: 10 }}>
           <label className="kv">Customer</label><br />
+          <input placeholder="Search name or phone" value={customerQuery} onChange={(e) => setCustomerQuery(e.target.value)} style={{ marginRight: 8 }} />
           <select value={customerId} onChange={(e) => setCustomerId(e.target.value)}>
             <option value="">-- guest / no customer --</option>
             {customers.map(c => <option key={c.id} value={c.id}>{c.name}</option>)}
@@ -71,11 +101,12 @@ export default function OrderCreatePage() {
 
         <div>
           <h4>Items</h4>
+          <input placeholder="Search products by name or SKU" value={productQuery} onChange={(e) => setProductQuery(e.target.value)} style={{ marginBottom: 8 }} />
           {items.map((it, idx) => (
             <div key={idx} style={{ marginBottom: 8, display:"flex", gap:8, alignItems:"center" }}>
               <select value={it.product} onChange={(e) => updateItem(idx, "product", e.target.value)} required>
                 <option value="">Select product</option>
-                {products.map(p => <option key={p.id} value={p.id}>{p.name} — {p.sku} (Stock: {p.stock})</option>)}
+                {productOptions(it.product).map(p => <option key={p.id} value={p.id}>{p.name} — {p.sku} (Stock: {p.stock})</option>)}
               </select>
               <input type="number" min="1" value={it.quantity} onChange={(e) => updateItem(idx, "quantity", e.target.value)} style={{ width: 100 }} />
               <button type="button" className="secondary" onClick={() => removeItem(idx)}>Remove</button>
@@ -7,6 +7,7 @@ import { useToasts } from "../components/ToastContext";
 
 export default function OrdersPage() {
   const [orders, setOrders] = useState([]);
+  const [next, setNext] = useState(null);
   const [loading, setLoading] = useState(true);
   const [selected, setSelected] = useState(null);
   const { push } = useToasts();
@@ -18,13 +19,25 @@ export default function OrdersPage() {
     setLoading(true);
     try {
       const res = await api.get("/orders/");
-      setOrders(res.data);
+      setOrders(res.data.results);
+      setNext(res.data.next);
     } catch (err) {
       console.error(err);
       push("Failed to load orders", "error");
     } finally { setLoading(false); }
   };
 
+  const loadMore = async () => {
+    try {
+      const res = await api.get(next);
+      setOrders(prev => [...prev, ...res.data.results]);
+      setNext(res.data.next);
+    } catch (err) {
+      console.error(err);
+      push("Failed to load more orders", "error");
+    }
+  };
+
   const openDetails = (order) => setSelected(order);
   const closeDetails = () => setSelected(null);
 
@@ -55,6 +68,7 @@ export default function OrdersPage() {
           </tbody>
         </table>
       )}
+      {next && <button className="secondary" style={{ marginTop: 12 }} onClick={loadMore}>Load more</button>}
 
       <Modal open={!!selected} title={`Order #${selected?.id || ""}`} onClose={closeDetails}>
         {selected ? (
@@ -5,6 +5,7 @@ import { useToasts } from "../components/ToastContext";
 
 export default function ProductsPage() {
   const [products, setProducts] = useState([]);
+  const [next, setNext] = useState(null);
   const [loading, setLoading] = useState(true);
   const [form, setForm] = useState({ name: "", sku: "", category: "", buy_price: "", sell_price: "", stock: 0 });
   const { push } = useToasts();
@@ -16,13 +17,25 @@ export default function ProductsPage() {
     setLoading(true);
     try {
       const res = await api.get("/products/");
-      setProducts(res.data);
+      setProducts(res.data.results);
+      setNext(res.data.next);
     } catch (err) {
       console.error(err);
       push("Failed to load products", "error");
     } finally { setLoading(false); }
   };
 
+  const loadMore = async () => {
+    try {
+      const res = await api.get(next);
+      setProducts(prev => [...prev, ...res.data.results]);
+      setNext(res.data.next);
+    } catch (err) {
+      console.error(err);
+      push("Failed to load more products", "error");
+    }
+  };
+
   const handleCreate = async (e) => {
     e.preventDefault();
     if (!form.name || !form.sku) { push("Name and SKU are required", "error"); return; }
@@ -73,6 +86,7 @@ export default function ProductsPage() {
           ))}
         </tbody>
       </table>
+      {next && <button className="secondary" style={{ marginTop: 12 }} onClick={loadMore}>Load more</button>}
     </div>
   );
 }